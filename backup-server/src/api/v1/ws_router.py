@@ -1,16 +1,70 @@
+import json
 import logging
+from collections import deque
 from multiprocessing import Queue
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
 from src.core.config import settings
-from src.core.signals import VideoChunkEnd
+from src.core.signals import (
+    PreRollEnd,
+    PreRollStart,
+    ReplayEnd,
+    ReplayFrame,
+    ReplayStart,
+    VideoChunkEnd,
+)
 
 logger = logging.getLogger("app")
 logger.setLevel(settings.log_level)
 
 router = APIRouter(prefix="/ws/v1", tags=["stream"])
 
+
+def handle_control_message(text, queue: Queue, client_con_info, replay_timestamps: deque):
+    """
+    텍스트 제어 메시지 처리
+    - {"type": "preroll_start", "count": N, "first_ts": ...}: 화재 확정 전 영상 시작
+    - {"type": "preroll_end"}: 화재 확정 전 영상 종료
+    - {"type": "replay_start", "session": S, "first_ts": ...}: 연결이 끊긴 동안 저장된 영상 재전송 세션 시작
+    - {"type": "replay_segment", "count": N, "timestamps": [...]}: 이어지는 이미지 N장은 재전송 프레임
+    - {"type": "replay_end"}: 재전송 세션 종료
+    replay_timestamps: 아직 받지 않은 재전송 프레임의 캡처 시각 (비어 있으면 이미지는 실시간 프레임)
+    """
+    try:
+        control = json.loads(text)
+    except (TypeError, ValueError):
+        logger.warning(f"알 수 없는 텍스트 메시지: {client_con_info}")
+        return
+
+    kind = control.get("type")
+    if kind == "preroll_start":
+        logger.info(f"preroll 수신 시작 ({control.get('count', 0)}프레임): {client_con_info}")
+        queue.put(PreRollStart(control.get("first_ts"), control.get("count", 0)))
+    elif kind == "preroll_end":
+        queue.put(PreRollEnd())
+    elif kind == "replay_start":
+        logger.info(f"replay 세션 시작 ({control.get('session')}): {client_con_info}")
+        replay_timestamps.clear()
+        queue.put(ReplayStart(control.get("session"), control.get("first_ts")))
+        # 세그먼트 단위로 세션을 여닫던 감지기는 replay_start에 프레임 목록을 함께 보냄
+        if "timestamps" in control or "count" in control:
+            add_replay_segment(control, replay_timestamps)
+    elif kind == "replay_segment":
+        add_replay_segment(control, replay_timestamps)
+    elif kind == "replay_end":
+        replay_timestamps.clear()
+        queue.put(ReplayEnd())
+    else:
+        logger.warning(f"알 수 없는 제어 메시지: {control.get('type')}")
+
+
+def add_replay_segment(control, replay_timestamps: deque):
+    """재전송 세그먼트 헤더: 이어지는 이미지들의 캡처 시각 (없으면 None)"""
+    timestamps = control.get("timestamps") or [None] * int(control.get("count", 0))
+    replay_timestamps.extend(timestamps)
+
+
 @router.websocket("")
 async def websocket_endpoint(websocket: WebSocket):
     """
@@ -21,12 +75,25 @@ async def websocket_endpoint(websocket: WebSocket):
     queue: Queue = websocket.app.state.video_queue
     client_con_info = f"{websocket.client.host}:{websocket.client.port}"
     logger.info(f"Websocket 연결: {client_con_info}")
+    replay_timestamps = deque()
     try:
         while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
             # 이미지를 바이트로 수신
-            data = await websocket.receive_bytes()
-            # 이미지를 Consumer에게 전달
-            queue.put(data)
+            data = message.get("bytes")
+            if data is not None:
+                # 이미지를 Consumer에게 전달 (재전송 세그먼트 안의 이미지는 캡처 시각과 함께)
+                if replay_timestamps:
+                    queue.put(ReplayFrame(data, replay_timestamps.popleft()))
+                else:
+                    queue.put(data)
+                continue
+
+            # 텍스트 메시지는 제어 신호 (pre-roll / 재전송 구간 표시)
+            handle_control_message(message.get("text"), queue, client_con_info, replay_timestamps)
     except WebSocketDisconnect:
         logger.info(f"클라이언트 연결 종료: {client_con_info}")
         queue.put(VideoChunkEnd())
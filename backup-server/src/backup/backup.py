@@ -1,5 +1,7 @@
 import os
 import subprocess
+import time
+import uuid
 from datetime import datetime, timedelta
 from multiprocessing import Queue, current_process
 from queue import Empty
@@ -12,7 +14,16 @@ from sqlalchemy.orm import sessionmaker
 
 from src.core.config import settings
 from src.core.logger import new_logger
-from src.core.signals import VideoChunkEnd
+from src.backup.clips import replay_clip_name
+from src.backup.frames import fit_frame
+from src.core.signals import (
+    PreRollEnd,
+    PreRollStart,
+    ReplayEnd,
+    ReplayFrame,
+    ReplayStart,
+    VideoChunkEnd,
+)
 from src.db.db import get_engine
 from src.db.models.video import Video
 
@@ -30,6 +41,69 @@ if settings.enable_r2:
     )
 
 
+class ReplayClip:
+    """
+    재전송(replay) 영상 하나
+    실시간 영상과 별도의 VideoWriter로 기록하고, 이름은 저장할 때 첫 / 마지막 프레임 캡처 시각으로 정함
+    """
+
+    def __init__(self, session=None, part=1):
+        self.session = session
+        self.part = part
+        self.temp_video_path = os.path.join(workdir, f"temp_replay_{uuid.uuid4().hex}.avi")
+        self.video = None
+        self.video_size = None
+        self.img = None
+        self.frame_written = 0
+        self.first_ts = None
+        self.last_ts = None
+
+    def span(self, timestamp):
+        """첫 프레임부터 timestamp까지의 길이 (초)"""
+        return 0 if self.first_ts is None else timestamp - self.first_ts
+
+    def write(self, img, timestamp, logger):
+        if self.video is None:
+            height, width, _ = img.shape
+            self.video_size = (width, height)
+            self.video = cv2.VideoWriter(
+                self.temp_video_path,
+                cv2.VideoWriter_fourcc(*"MJPG"),
+                30,
+                self.video_size,
+            )
+            if not self.video.isOpened():
+                logger.error("재전송 VideoWriter 초기화 실패!")
+                self.video = None
+                return
+            self.first_ts = timestamp
+        self.img = fit_frame(img, self.video_size)
+        self.video.write(self.img)
+        self.frame_written += 1
+        self.last_ts = timestamp
+
+    def flush(self, SessionLocal, logger):
+        if self.video is None:
+            return
+        pure_name = replay_clip_name(self.first_ts, self.last_ts, self.session, self.part, timezone)
+        video_key = f"videos/blackbox-replay-{pure_name}.mp4"
+        flush_video(
+            pure_name,
+            self.video,
+            os.path.join(workdir, video_key),
+            self.temp_video_path,
+            video_key,
+            self.img,
+            self.frame_written,
+            SessionLocal,
+            logger,
+            "Replay",
+            # 재전송 프레임은 원래 캡처 간격과 다르게 모여 있으므로 캡처 시각으로 길이 계산
+            duration_seconds=self.last_ts - self.first_ts,
+        )
+        self.video = None
+
+
 def video_worker(queue: Queue):
     """
     Queue로부터 이미지들을 consume하여 비디오 생성
@@ -39,21 +113,35 @@ def video_worker(queue: Queue):
     SessionLocal = sessionmaker(bind=engine)
     logger.info(f"가동 시작, PID: {current_process().pid}")
 
+    # pre-roll 시작 신호가 녹화 중에 도착하면, 현재 영상을 저장한 뒤 다음 영상을 pre-roll로 시작
+    # PreRollEnd 전에 영상이 끊기면(대기 시간 / 최대 길이 초과, 재연결) 다음 영상도 이어서 pre-roll로 저장
+    preroll_pending = None
+    # 최대 길이 초과로 쓰지 못한 프레임 (다음 영상의 첫 프레임)
+    carried = None
+    # 재전송 세션: 실시간 영상을 끊지 않고 별도 영상으로 기록
+    replay_start = None
+    replay = None
+
     try:
         while True:
             first = True
             start_time = None
+            preroll = preroll_pending
+            preroll_pending = None
             while True:
-                try:
-                    # 타임아웃 주입하여 중간에 시간 체크
-                    raw = queue.get(timeout=0.1)
-                except Empty:
-                    # 시간이 초과시, 이번 영상은 종료
-                    if start_time is not None and datetime.now(
-                        timezone
-                    ) >= start_time + timedelta(seconds=30):
-                        break
-                    continue
+                if carried is not None:
+                    raw, carried = carried, None
+                else:
+                    try:
+                        # 타임아웃 주입하여 중간에 시간 체크
+                        raw = queue.get(timeout=0.1)
+                    except Empty:
+                        # 시간이 초과시, 이번 영상은 종료
+                        if start_time is not None and datetime.now(
+                            timezone
+                        ) >= start_time + timedelta(seconds=30):
+                            break
+                        continue
 
                 # SIGINT 핸들링(main.py 참고)
                 if raw is None:
@@ -63,8 +151,54 @@ def video_worker(queue: Queue):
                 # 비디오 청크 종료 신호 발생
                 if isinstance(raw, VideoChunkEnd):
                     logger.info("웹소켓 연결 종료 감지, 즉시 저장")
+                    if replay is not None:
+                        replay.flush(SessionLocal, logger)
+                    replay_start = replay = None
+                    break
+
+                # 재전송 세션 시작 / 종료 신호
+                if isinstance(raw, (ReplayStart, ReplayEnd)):
+                    if replay is not None:
+                        replay.flush(SessionLocal, logger)
+                    replay = None
+                    replay_start = raw if isinstance(raw, ReplayStart) else None
+                    if replay_start is not None:
+                        logger.info(f"재전송 세션 시작 ({raw.session})")
+                    continue
+
+                # 재전송 프레임은 실시간 영상과 별도 영상에 기록
+                if isinstance(raw, ReplayFrame):
+                    replay_img = cv2.imdecode(np.frombuffer(raw.data, np.uint8), cv2.IMREAD_COLOR)
+                    if replay_img is None:
+                        logger.error("재전송 이미지 디코딩 실패")
+                        continue
+                    timestamp = raw.timestamp if raw.timestamp is not None else time.time()
+                    # 영상 최대길이(캡처 시각 기준) 초과 시, 다음 영상으로 나눔
+                    if replay is not None and replay.span(timestamp) >= settings.max_video_len:
+                        replay.flush(SessionLocal, logger)
+                        replay = ReplayClip(replay.session, replay.part + 1)
+                    if replay is None:
+                        replay = ReplayClip(replay_start.session if replay_start is not None else None)
+                    replay.write(replay_img, timestamp, logger)
+                    continue
+
+                # 화재 확정 전(pre-roll) 영상 시작 신호
+                if isinstance(raw, PreRollStart):
+                    logger.info(f"pre-roll 영상 수신 시작 ({raw.count}프레임)")
+                    if first:
+                        preroll = raw
+                        continue
+                    preroll_pending = raw
                     break
 
+                # pre-roll 영상 종료 신호, 실시간 영상과 분리하여 즉시 저장
+                if isinstance(raw, PreRollEnd):
+                    ended = preroll is not None and not first
+                    preroll = None
+                    if ended:
+                        break
+                    continue
+
                 # 이미지를 numpy 배열로 디코딩
                 img = cv2.imdecode(np.frombuffer(raw, np.uint8), cv2.IMREAD_COLOR)
                 if img is None:
@@ -74,21 +208,35 @@ def video_worker(queue: Queue):
                 # 첫 이미지 발견 시, 타임스탬프 남기기
                 if first:
                     start_time = datetime.now(timezone)
-                    pure_name = start_time.strftime("%Y%m%d%H%M%S")
-                    video_key = f"videos/blackbox-backup-{pure_name}.mp4"
+                    if preroll is not None:
+                        # pre-roll 영상은 첫 프레임의 캡처 시각으로 이름 지정
+                        if preroll.first_ts is not None:
+                            captured_at = datetime.fromtimestamp(preroll.first_ts, timezone)
+                        else:
+                            captured_at = start_time
+                        pure_name = captured_at.strftime("%Y%m%d%H%M%S")
+                        if preroll.part > 1:
+                            pure_name += f"-{preroll.part}"
+                        video_key = f"videos/blackbox-{preroll.kind}-{pure_name}.mp4"
+                        label = "PreRoll"
+                    else:
+                        pure_name = start_time.strftime("%Y%m%d%H%M%S")
+                        video_key = f"videos/blackbox-backup-{pure_name}.mp4"
+                        label = "Backup"
 
                     # 임시 파일 (AVI)
-                    temp_video_path = os.path.join(workdir, f"temp_{pure_name}.avi")
+                    temp_video_path = os.path.join(workdir, f"temp_{label.lower()}_{pure_name}.avi")
                     final_video_path = os.path.join(workdir, video_key)
 
                     height, width, _ = img.shape
+                    video_size = (width, height)
 
                     # 임시로 AVI 저장
                     video = cv2.VideoWriter(
                         temp_video_path,
                         cv2.VideoWriter_fourcc(*"MJPG"),  # Motion JPEG
                         30,
-                        (width, height),
+                        video_size,
                     )
 
                     if not video.isOpened():
@@ -98,28 +246,37 @@ def video_worker(queue: Queue):
                     first = False
                     frame_written = 0
 
-                # 영상 최대길이 초과 시, 중단
+                # 영상 최대길이 초과 시, 중단 (이번 프레임은 다음 영상에 기록)
                 if datetime.now(timezone) >= start_time + timedelta(
                     seconds=settings.max_video_len
                 ):
+                    if frame_written:
+                        carried = raw
                     break
 
-                # 프레임 추가 및 카운트 증가
+                # 프레임 추가 및 카운트 증가 (크기가 다른 프레임은 영상 크기로 맞춤, 그대로 쓰면 버려짐)
+                img = fit_frame(img, video_size)
                 video.write(img)
                 frame_written += 1
 
-            # 비디오 저장 및 업로드
-            flush_video(
-                pure_name,
-                video,
-                final_video_path,
-                temp_video_path,
-                video_key,
-                img,
-                frame_written,
-                SessionLocal,
-                logger,
-            )
+            # PreRollEnd 없이 끊긴 pre-roll은 다음 영상으로 이어서 저장
+            if preroll is not None and preroll_pending is None:
+                preroll_pending = preroll if first else preroll.next_part()
+
+            # 비디오 저장 및 업로드 (프레임 없이 끝났으면 저장할 영상 없음)
+            if not first:
+                flush_video(
+                    pure_name,
+                    video,
+                    final_video_path,
+                    temp_video_path,
+                    video_key,
+                    img,
+                    frame_written,
+                    SessionLocal,
+                    logger,
+                    label,
+                )
 
     # SIGINT stacktrace 방지
     except KeyboardInterrupt:
@@ -127,17 +284,21 @@ def video_worker(queue: Queue):
     finally:
         try:
             # 혹시 찍던게 있으면 마저 저장..
-            flush_video(
-                pure_name,
-                video,
-                final_video_path,
-                temp_video_path,
-                video_key,
-                img,
-                frame_written,
-                SessionLocal,
-                logger,
-            )
+            if replay is not None:
+                replay.flush(SessionLocal, logger)
+            if not first:
+                flush_video(
+                    pure_name,
+                    video,
+                    final_video_path,
+                    temp_video_path,
+                    video_key,
+                    img,
+                    frame_written,
+                    SessionLocal,
+                    logger,
+                    label,
+                )
         except Exception:
             logger.warning("아무 video도 저장한 적 없음..")
         finally:
@@ -197,13 +358,18 @@ def flush_video(
     frame_written,
     SessionLocal,
     logger,
+    label="Backup",
+    duration_seconds=None,
 ):
     """
     영상 파일 Flush(로컬 저장 + 클라우드 업로드)
+    label: DB 영상 이름 접두어 ("Backup", "PreRoll" 또는 "Replay")
+    duration_seconds: 영상 길이 (없으면 30fps 기준 프레임 수로 계산)
     """
     if video is not None:
         logger.info("데이터 저장 시도..")
-        duration_seconds = frame_written / 30
+        if duration_seconds is None:
+            duration_seconds = frame_written / 30
         video_time = timedelta(seconds=int(round(duration_seconds)))
 
         # 1. OpenCV 비디오 저장
@@ -232,7 +398,12 @@ def flush_video(
                 return
 
         # 3. 썸네일 저장
-        thumb_key = f"thumbs/blackbox-thumb-{pure_name}.jpeg"
+        if label == "PreRoll":
+            thumb_key = f"thumbs/blackbox-preroll-thumb-{pure_name}.jpeg"
+        elif label == "Replay":
+            thumb_key = f"thumbs/blackbox-replay-thumb-{pure_name}.jpeg"
+        else:
+            thumb_key = f"thumbs/blackbox-thumb-{pure_name}.jpeg"
         thumbnail_path = os.path.join(workdir, thumb_key)
         cv2.imwrite(thumbnail_path, img)
         logger.info(f"썸네일 저장: {thumbnail_path}")
@@ -265,7 +436,7 @@ def flush_video(
         try:
             with SessionLocal() as s:
                 new_video = Video(
-                    name="[Backup] " + pure_name,
+                    name=f"[{label}] " + pure_name,
                     thumbnail_path=thumb_key,
                     file_path=video_key,
                     file_size=f"{(float(os.path.getsize(final_video_path)) / (1024*1024)):.2f} MB",
@@ -0,0 +1,24 @@
+"""
+재전송(replay) 영상 이름
+
+재전송 영상은 연결이 끊긴 동안의 프레임을 나중에 받아 저장하므로 수신 시각이 아니라
+첫 / 마지막 프레임의 캡처 시각과 세션 번호로 이름을 정합니다.
+(같은 초에 시작한 세그먼트나 다른 세션과 이름이 겹치지 않도록)
+"""
+from datetime import datetime
+
+
+def replay_clip_name(first_ts, last_ts, session=None, part=1, tz=None):
+    """
+    재전송 영상 이름: {첫 프레임 시각}-{마지막 프레임 시각}[-s{세션}][-{part}]
+    first_ts, last_ts: 캡처 시각 (unix timestamp)
+    part: 영상 최대 길이를 넘어 나뉜 경우 몇 번째 영상인지 (1부터)
+    """
+    first = datetime.fromtimestamp(first_ts, tz).strftime("%Y%m%d%H%M%S")
+    last = datetime.fromtimestamp(last_ts, tz).strftime("%Y%m%d%H%M%S")
+    name = f"{first}-{last}"
+    if session is not None:
+        name += f"-s{session}"
+    if part > 1:
+        name += f"-{part}"
+    return name
@@ -0,0 +1,21 @@
+"""
+영상 프레임 크기 맞춤
+
+cv2.VideoWriter는 처음 연 크기와 다른 프레임을 오류 없이 버리므로("Failed to write frame"),
+감지기가 링크 상태에 따라 해상도를 바꾸거나 pre-roll / 실시간 프레임 크기가 섞여도
+한 영상 안에서는 첫 프레임 크기로 맞춰서 기록합니다.
+"""
+import cv2
+
+
+def fit_frame(img, size):
+    """
+    프레임을 영상 크기(width, height)로 맞춤 (같으면 그대로 반환)
+    축소는 INTER_AREA, 확대는 INTER_LINEAR
+    """
+    width, height = size
+    h, w = img.shape[:2]
+    if (w, h) == (width, height):
+        return img
+    interpolation = cv2.INTER_AREA if w * h > width * height else cv2.INTER_LINEAR
+    return cv2.resize(img, (width, height), interpolation=interpolation)
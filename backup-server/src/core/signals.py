@@ -5,3 +5,56 @@ class VideoChunkEnd:
 
     pass
 
+
+class PreRollStart:
+    """
+    화재 확정 전(pre-roll) 영상 시작 알림용 객체
+    이후 PreRollEnd까지 수신한 이미지는 별도 pre-roll 영상으로 저장
+    """
+
+    def __init__(self, first_ts=None, count=0, kind="preroll", part=1):
+        self.first_ts = first_ts  # 첫 프레임 캡처 시각 (unix timestamp)
+        self.count = count
+        self.kind = kind
+        self.part = part  # 영상 길이 제한 / 대기 시간 초과로 나뉜 경우 몇 번째 영상인지 (1부터)
+
+    def next_part(self):
+        """PreRollEnd 전에 영상이 나뉘었을 때, 이어지는 영상용 신호"""
+        return PreRollStart(self.first_ts, self.count, self.kind, self.part + 1)
+
+
+class PreRollEnd:
+    """
+    pre-roll 영상 종료 알림용 객체
+    """
+
+    pass
+
+
+class ReplayStart:
+    """
+    재전송(replay) 세션 시작 알림용 객체
+    연결이 끊긴 동안 감지기에 저장되었다가 재전송된 영상은 실시간 영상과 별도 영상으로 저장
+    """
+
+    def __init__(self, session=None, first_ts=None):
+        self.session = session  # 세션 번호 (감지기 스풀의 첫 세그먼트 번호)
+        self.first_ts = first_ts  # 첫 프레임 캡처 시각 (unix timestamp)
+
+
+class ReplayFrame:
+    """
+    재전송 프레임 (JPEG 바이트 + 원래 캡처 시각)
+    """
+
+    def __init__(self, data, timestamp=None):
+        self.data = data
+        self.timestamp = timestamp
+
+
+class ReplayEnd:
+    """
+    재전송 세션 종료 알림용 객체
+    """
+
+    pass
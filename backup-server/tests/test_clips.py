@@ -0,0 +1,23 @@
+from datetime import datetime, timezone
+
+from src.backup.clips import replay_clip_name
+
+FIRST = datetime(2024, 1, 1, 9, 0, 0, tzinfo=timezone.utc).timestamp()
+
+
+def test_replay_clip_name_uses_first_and_last_capture_time():
+    name = replay_clip_name(FIRST + 0.4, FIRST + 75.9, session=12, tz=timezone.utc)
+    assert name == "20240101090000-20240101090115-s12"
+
+
+def test_replay_clip_name_differs_for_segments_starting_in_same_second():
+    a = replay_clip_name(FIRST + 0.1, FIRST + 4.0, session=3, tz=timezone.utc)
+    b = replay_clip_name(FIRST + 0.6, FIRST + 4.0, session=4, tz=timezone.utc)
+    c = replay_clip_name(FIRST + 0.6, FIRST + 9.0, session=3, tz=timezone.utc)
+    assert len({a, b, c}) == 3
+
+
+def test_replay_clip_name_numbers_split_parts():
+    first = replay_clip_name(FIRST, FIRST + 60, session=3, tz=timezone.utc)
+    second = replay_clip_name(FIRST, FIRST + 60, session=3, part=2, tz=timezone.utc)
+    assert second == first + "-2"
@@ -0,0 +1,47 @@
+import cv2
+import numpy as np
+
+from src.backup.frames import fit_frame
+
+
+def _write_video(path, frames, size):
+    video = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 30, size)
+    assert video.isOpened()
+    for img in frames:
+        video.write(fit_frame(img, size))
+    video.release()
+
+
+def _read_frames(path):
+    cap = cv2.VideoCapture(str(path))
+    frames = []
+    while True:
+        ret, img = cap.read()
+        if not ret:
+            break
+        frames.append(img)
+    cap.release()
+    return frames
+
+
+def test_fit_frame_keeps_matching_size():
+    img = np.zeros((48, 64, 3), np.uint8)
+    assert fit_frame(img, (64, 48)) is img
+
+
+def test_fit_frame_resizes_to_video_size():
+    assert fit_frame(np.zeros((24, 32, 3), np.uint8), (64, 48)).shape == (48, 64, 3)
+    assert fit_frame(np.zeros((96, 128, 3), np.uint8), (64, 48)).shape == (48, 64, 3)
+
+
+def test_mixed_size_frames_are_all_written(tmp_path):
+    # 전체 해상도 -> 0.75 / 0.5 축소 (적응형 품질) -> 다시 전체 해상도
+    sizes = [(64, 48)] * 3 + [(48, 36)] * 3 + [(32, 24)] * 3 + [(64, 48)] * 3
+    frames = [np.full((h, w, 3), i * 20, np.uint8) for i, (w, h) in enumerate(sizes)]
+    path = tmp_path / "mixed.avi"
+
+    _write_video(path, frames, (64, 48))
+
+    written = _read_frames(path)
+    assert len(written) == len(frames)
+    assert all(img.shape == (48, 64, 3) for img in written)
@@ -4,14 +4,21 @@
 TCP 기반 타입 프로토콜: 
  [4 bytes: size of payload][1 byte: type][payload]
  - 0x01: 이미지 프레임(JPEG)
- - 0x02: 동물 이벤트 (JSON)
+ - 0x02: 화재 이벤트 (JSON)
  - 0x03: 동물 이벤트 (JSON)
  - 0x04: Gemini 분석 결과 (JSON)
+ - 0x05: v2 협상 응답 (JSON)
+ - 0x06: v2 프레임 ([헤더][감지 레코드 x N][JPEG], model_develop/protocol.py 참고)
+ - 0x07: 설정 변경 요청 (UI -> 감지기, JSON)
+ - 0x08: 감지기에 적용된 설정 (JSON)
+
+연결 직후 HELLO_V2를 보내 v2 프레임(순번, 캡처 시각, 감지 결과 포함)을 받습니다.
 """
 import json
 import os
 import queue
 import socket
+import struct
 import sys
 import threading
 import time
@@ -25,10 +32,29 @@ MSG_TYPE_FRAME = 0x01
 MSG_TYPE_FIRE_EVENT = 0x02
 MSG_TYPE_ANIMAL_EVENT = 0x03
 MSG_TYPE_GEMINI_RESULT = 0x04
+MSG_TYPE_HELLO = 0x05
+MSG_TYPE_FRAME_V2 = 0x06
+MSG_TYPE_CONTROL = 0x07
+MSG_TYPE_CONFIG = 0x08
+
+# 프로토콜 v2 (model_develop/protocol.py와 동일해야 함)
+HELLO_V2 = b"FDP\x02"
+FRAME_V2_HEADER = struct.Struct(">BBIIddHHH")
+DETECTION_V2_DTYPE = np.dtype([
+    ("kind", "u1"),  # 0: 화재, 1: 동물
+    ("cls", ">u2"),
+    ("conf", ">f4"),
+    ("track_id", ">i4"),
+    ("x1", ">i2"),
+    ("y1", ">i2"),
+    ("x2", ">i2"),
+    ("y2", ">i2"),
+])
 
 # 전역 설정
 HOST = os.getenv("YOLO_SERVER")
 PORT = os.getenv("YOLO_PORT")
+CONTROL_TOKEN = os.getenv("CONTROL_TOKEN")  # 감지기 설정 변경 권한 (감지기의 CONTROL_TOKEN과 같은 값)
 QUEUE_SIZE = 2
 FIRE_ACTIVE_THRESHOLD = 30  # 화재 활성 판정 임계값 (초)
 
@@ -36,12 +62,19 @@ FIRE_ACTIVE_THRESHOLD = 30  # 화재 활성 판정 임계값 (초)
 frame_queue = queue.Queue(maxsize=QUEUE_SIZE)
 connection_status = {"status": "연결 중..."}
 receiver_thread_ref = {"thread": None}
+socket_ref = {"socket": None}  # 제어 메시지 전송용 (수신 스레드가 연결할 때 갱신)
+_send_lock = threading.Lock()
 
 # --- TCP로 수신한 이벤트 데이터 저(thread-safe) ---
 _data_lock = threading.Lock()
 _latest_fire_event = None
 _latest_animal_event = None
 _latest_gemini_result = None
+_latest_detections = None  # v2 프레임의 감지 레코드 (DETECTION_V2_DTYPE 배열)
+_detector_config = None  # 감지기가 마지막으로 알려준 적용 설정 (0x08)
+
+# v2 스트림 지표 (지연 / 손실)
+stream_stats = {"version": 1, "frames": 0, "lost": 0, "latency_ms": 0.0, "last_seq": None}
 
 
 def debug_log(msg):
@@ -81,6 +114,58 @@ def _process_frame(payload):
         debug_log(f"프레 처리 오류: {e}")
 
 
+def _process_frame_v2(payload):
+    """v2 프레임 처리: 헤더로 지연 / 손실 집계, 감지 레코드 보관 후 JPEG 처리"""
+    global _latest_detections
+    try:
+        (_, camera_id, seq, frame_id, capture_ts, _, width, height,
+         count) = FRAME_V2_HEADER.unpack_from(payload)
+        offset = FRAME_V2_HEADER.size
+        detections = np.frombuffer(payload, dtype=DETECTION_V2_DTYPE, count=count, offset=offset)
+        offset += count * DETECTION_V2_DTYPE.itemsize
+
+        with _data_lock:
+            last_seq = stream_stats["last_seq"]
+            if last_seq is not None and seq > last_seq + 1:
+                stream_stats["lost"] += seq - last_seq - 1
+            stream_stats["last_seq"] = seq
+            stream_stats["frames"] += 1
+            # 감지기와 시계가 맞춰져 있다는 가정의 캡처 ~ 수신 지연
+            stream_stats["latency_ms"] = (time.time() - capture_ts) * 1000
+            _latest_detections = detections
+    except Exception as e:
+        debug_log(f"v2 프레임 헤더 처리 오류: {e}")
+        return
+    _process_frame(payload[offset:])
+
+
+def _process_hello(payload):
+    """v2 협상 응답 처리"""
+    try:
+        hello = json.loads(payload.decode("utf-8"))
+        with _data_lock:
+            stream_stats["version"] = hello.get("version", 1)
+            stream_stats["last_seq"] = None
+        debug_log(f"프로토콜 v{hello.get('version')} 사용 (camera {hello.get('camera_id')})")
+    except Exception as e:
+        debug_log(f"협상 응답 처리 오류: {e}")
+
+
+def _process_config(payload):
+    """감지기 설정 응답 처리"""
+    global _detector_config
+    try:
+        reply = json.loads(payload.decode("utf-8"))
+        reply["received_at"] = time.time()
+        with _data_lock:
+            _detector_config = reply
+        if reply.get("errors"):
+            debug_log(f"설정 변경 오류: {reply['errors']}")
+        debug_log(f"⚙️ 감지기 설정 v{reply.get('version')} 수신 (변경: {reply.get('applied')})")
+    except Exception as e:
+        debug_log(f"설정 응답 처리 오류: {e}")
+
+
 def _process_fire_event(payload):
     """화재 이벤트 처리"""
     global _latest_fire_event
@@ -126,7 +211,11 @@ def receive_frames():
         try:
             debug_log(f"소켓 연결 시도: {HOST}:{PORT}")
             client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            client_socket.connect((HOST, PORT))
+            client_socket.connect((HOST, int(PORT)))
+            # v2 프레임 요청 (v2를 모르는 감지기는 무시하고 v1로 전송)
+            client_socket.sendall(HELLO_V2)
+            socket_ref["socket"] = client_socket
+            send_control({})  # 현재 설정 조회
             connection_status["status"] = "✓ 연결됨"
             debug_log("소켓 연결 성공")
 
@@ -134,14 +223,20 @@ def receive_frames():
                 try:
                     # 프레임 크기 수신 (4 + 1(size + type) 바이트)
                     header = _recv_n_bytes(client_socket, 5)
-                    payload_size = struct.unpack(">I", header[:4][0])
+                    payload_size = struct.unpack(">I", header[:4])[0]
                     msg_type = header[4]
 
                     # payload 수신
                     payload = _recv_n_bytes(client_socket, payload_size)
 
-                    if msg_type == MSG_TYPE_FRAME:
+                    if msg_type == MSG_TYPE_FRAME_V2:
+                        _process_frame_v2(payload)
+                    elif msg_type == MSG_TYPE_FRAME:
                         _process_frame(payload)
+                    elif msg_type == MSG_TYPE_HELLO:
+                        _process_hello(payload)
+                    elif msg_type == MSG_TYPE_CONFIG:
+                        _process_config(payload)
                     elif msg_type == MSG_TYPE_FIRE_EVENT:
                         _process_fire_event(payload)
                     elif msg_type == MSG_TYPE_ANIMAL_EVENT:
@@ -160,6 +255,8 @@ def receive_frames():
                     connection_status["status"] = f"⚠️ 오류: {error_msg}"
                     debug_log(f"프레임 수신 오류: {error_msg}")
                     break
+            socket_ref["socket"] = None
+            client_socket.close()
 
         except ConnectionRefusedError:
             connection_status["status"] = "❌ 서버 연결 불가"
@@ -204,6 +301,51 @@ def get_latest_gemini_result():
         return _latest_gemini_result.copy() if _latest_gemini_result else None
 
 
+def send_control(changes):
+    """
+    감지기 설정 변경 요청 (적용 결과는 get_detector_config()로 확인)
+    Args:
+        changes: {항목: 값} - 빈 dict이면 현재 설정만 조회
+    Returns:
+        전송 성공 여부
+    """
+    sock = socket_ref["socket"]
+    if sock is None:
+        return False
+    request = {"set": changes}
+    if CONTROL_TOKEN:
+        request["token"] = CONTROL_TOKEN
+    payload = json.dumps(request, ensure_ascii=False).encode("utf-8")
+    try:
+        with _send_lock:
+            sock.sendall(struct.pack(">IB", len(payload), MSG_TYPE_CONTROL) + payload)
+        return True
+    except OSError as e:
+        debug_log(f"설정 전송 오류: {e}")
+        return False
+
+
+def get_detector_config():
+    """
+    감지기에 적용된 설정 응답 반환 ({"version", "config", "applied", "errors", "writable", "received_at"}, 없으면 None)
+    writable이 False면 이 연결로는 설정을 조회만 할 수 있음
+    """
+    with _data_lock:
+        return dict(_detector_config) if _detector_config else None
+
+
+def get_latest_detections():
+    """최신 v2 프레임의 감지 레코드 반환 (v1 연결이면 None)"""
+    with _data_lock:
+        return _latest_detections
+
+
+def get_stream_stats():
+    """수신 스트림 지표 (프로토콜 버전, 수신 / 손실 프레임 수, 캡처 ~ 수신 지연)"""
+    with _data_lock:
+        return dict(stream_stats)
+
+
 def check_fire_event():
     """화재 감지 이벤트 확인"""
     return get_latest_fire_event()
@@ -1,10 +1,14 @@
 """
 설정 페이지
+- 감지기(model_develop/main.py)에 TCP 제어 메시지로 설정을 보내 재시작 없이 반영
+- helpers.py의 send_control / get_detector_config 함수 사용
 """
 
 import os
+import time
+
 import streamlit as st
-from helpers import start_receiver_thread, debug_log
+from helpers import debug_log, get_detector_config, send_control, start_receiver_thread
 
 debug_log("settings.py 페이지 로드")
 
@@ -15,13 +19,76 @@ start_receiver_thread()
 
 st.markdown("---")
 
-# 감지 설정
-st.subheader("🔥 화재 감지 설정")
-confidence_threshold = st.slider("신뢰도 임계값", 0.0, 1.0, 0.5, 0.05)
-alert_cooldown = st.slider("알림 쿨다운 (초)", 10, 300, 30, 10)
+reply = get_detector_config()
+if reply is None:
+    st.warning("감지기 설정을 아직 받지 못했습니다. 감지기 연결 후 새로고침해주세요.")
+    config = {}
+else:
+    config = reply["config"]
+    st.caption(f"감지기 설정 버전: v{reply['version']}")
+
+# 감지기가 이 연결의 변경 권한을 알려줌 (writable이 없는 이전 버전 감지기는 변경 가능으로 간주)
+read_only = reply is not None and not reply.get("writable", True)
+if read_only:
+    st.info("🔒 읽기 전용: 이 연결에는 설정 변경 권한이 없습니다. "
+            "감지기와 이 페이지의 `.env`에 같은 `CONTROL_TOKEN`을 설정하거나, "
+            "감지기의 `CONTROL_ALLOWED_HOSTS`에 이 서버 주소를 추가하세요.")
+
+# 감지 설정 (현재 감지기에 적용된 값을 초기값으로 사용)
+with st.form("detector_settings"):
+    st.subheader("🔥 화재 감지 설정")
+    fire_conf = st.slider("화재 신뢰도 임계값", 0.05, 1.0, float(config.get("fire_conf", 0.25)), 0.05)
+    fire_classes = st.text_input("화재 클래스 (쉼표 구분)", ", ".join(config.get("fire_classes", ["fire", "smoke"])))
+    alert_cooldown = st.slider("알림 쿨다운 (초)", 10, 300, int(config.get("alert_cooldown", 30)), 10)
+
+    st.subheader("🐾 동물 감지 설정")
+    animal_conf = st.slider("동물 신뢰도 임계값", 0.05, 1.0, float(config.get("animal_conf", 0.25)), 0.05)
+    animal_classes = st.text_input(
+        "동물 클래스 (쉼표 구분)", ", ".join(config.get("animal_classes", ["dog", "cat", "bird", "person"]))
+    )
+    animal_skip = st.slider("동물 감지 간격 (프레임)", 1, 30, int(config.get("animal_skip", 6)))
+
+    st.subheader("🎞️ 성능 설정")
+    imgsz_options = sorted({320, 416, 480, 640, 800, 960, 1280, int(config.get("imgsz", 640))})
+    imgsz = st.select_slider("모델 입력 크기", imgsz_options, int(config.get("imgsz", 640)))
+    jpeg_quality = st.slider("전송 JPEG 품질", 30, 100, int(config.get("jpeg_quality", 80)), 5)
+    target_fps = st.slider("목표 FPS (0: 제한 없음)", 0, 60, int(config.get("target_fps", 0)))
+
+    submitted = st.form_submit_button("감지기에 적용", disabled=read_only)
+
+if submitted:
+    changes = {
+        "fire_conf": fire_conf,
+        "fire_classes": fire_classes,
+        "alert_cooldown": alert_cooldown,
+        "animal_conf": animal_conf,
+        "animal_classes": animal_classes,
+        "animal_skip": animal_skip,
+        "imgsz": imgsz,
+        "jpeg_quality": jpeg_quality,
+        "target_fps": target_fps,
+    }
+    sent_at = time.time()
+    if not send_control(changes):
+        st.error("감지기에 연결되어 있지 않아 설정을 보낼 수 없습니다.")
+    else:
+        # 적용 응답 대기 (최대 2초)
+        deadline = time.time() + 2
+        result = get_detector_config()
+        while time.time() < deadline and (result is None or result["received_at"] < sent_at):
+            time.sleep(0.1)
+            result = get_detector_config()
 
-st.write(f"현재 신뢰도 임계값: {confidence_threshold:.2f}")
-st.write(f"현재 알림 쿨다운: {alert_cooldown}초")
+        if result is None or result["received_at"] < sent_at:
+            st.error("감지기 응답이 없습니다.")
+        else:
+            if result["applied"]:
+                st.success(f"적용됨 (v{result['version']}): {', '.join(result['applied'])}")
+            else:
+                st.info("변경된 설정이 없습니다.")
+            for name, error in result.get("errors", {}).items():
+                st.error(f"{name}: {error}")
+            st.json(result["config"])
 
 st.markdown("---")
 
@@ -0,0 +1,88 @@
+"""
+출력별 적응형 JPEG 품질 / 크기 제어
+
+출력(TCP 클라이언트, 백업 WebSocket)마다 전송 대기량(backlog)과 전송 지연을 보고
+링크가 밀리면 JPEG 품질을 먼저 낮추고, 최저 품질에 닿으면 해상도를 줄입니다.
+한동안 여유가 있으면 반대 순서(해상도 -> 품질)로 되돌립니다.
+한 번 바꾼 뒤에는 hold 동안 다시 바꾸지 않아 품질이 진동하지 않습니다.
+"""
+import threading
+import time
+
+
+class AdaptiveQuality:
+    """
+    Args:
+        min_quality: 최저 JPEG 품질 (백업처럼 증거 화질이 필요한 출력은 높게)
+        min_scale: 최저 해상도 비율
+        high_backlog: 이 이상 대기 중이면 혼잡
+        high_delay: 전송 지연(초)이 이보다 크면 혼잡
+        low_delay: 대기 없이 지연이 이보다 작으면 여유
+        hold: 변경 후 다음 변경까지 최소 간격 (초)
+        recover_after: 여유 상태가 이만큼 이어지면 한 단계 올림 (초)
+    """
+
+    def __init__(self, min_quality=40, min_scale=0.5, quality_step=10, scale_step=0.25,
+                 high_backlog=2, high_delay=0.3, low_delay=0.1, hold=1.0, recover_after=3.0):
+        self.min_quality = min_quality
+        self.min_scale = min_scale
+        self.quality_step = quality_step
+        self.scale_step = scale_step
+        self.high_backlog = high_backlog
+        self.high_delay = high_delay
+        self.low_delay = low_delay
+        self.hold = hold
+        self.recover_after = recover_after
+
+        self.quality = 100  # 실제 품질은 min(quality, 인코딩 기본 품질)
+        self.scale = 1.0
+        self._last_change = 0.0
+        self._clear_since = None
+        self._lock = threading.Lock()
+
+        self.downgrades = 0
+        self.upgrades = 0
+
+    def observe(self, backlog, delay, max_quality, now=None):
+        """
+        현재 전송 대기량 / 지연을 반영해 이번 프레임의 (품질, 해상도 비율) 결정
+        max_quality: 인코딩 기본 품질 (실행 중 설정 jpeg_quality)
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            quality = min(self.quality, max_quality)
+            congested = backlog >= self.high_backlog or delay > self.high_delay
+            clear = backlog == 0 and delay < self.low_delay
+            can_change = now - self._last_change >= self.hold
+
+            if congested:
+                self._clear_since = None
+                if can_change and (quality > self.min_quality or self.scale > self.min_scale):
+                    if quality > self.min_quality:
+                        self.quality = max(self.min_quality, quality - self.quality_step)
+                    else:
+                        self.scale = max(self.min_scale, self.scale - self.scale_step)
+                    self._last_change = now
+                    self.downgrades += 1
+            elif clear:
+                if self._clear_since is None:
+                    self._clear_since = now
+                elif (now - self._clear_since >= self.recover_after and can_change
+                      and (self.scale < 1.0 or quality < max_quality)):
+                    if self.scale < 1.0:
+                        self.scale = min(1.0, self.scale + self.scale_step)
+                    else:
+                        self.quality = min(max_quality, quality + self.quality_step)
+                    self._last_change = now
+                    self._clear_since = now
+                    self.upgrades += 1
+            else:
+                self._clear_since = None
+
+            return min(self.quality, max_quality), self.scale
+
+    def format_state(self):
+        with self._lock:
+            quality = "max" if self.quality >= 100 else self.quality
+            return (f"q{quality} x{self.scale:.2f}"
+                    f" (down {self.downgrades} / up {self.upgrades})")
@@ -0,0 +1,284 @@
+"""
+YOLO 추론 백엔드 선택 (PyTorch / ONNX Runtime / OpenVINO)
+
+GPU가 없는 엣지 장비에서는 PyTorch 기본 경로보다 ONNX Runtime / OpenVINO가 빠른 경우가 많습니다.
+.pt 가중치를 선택한 백엔드 형식으로 내보내고(이미 내보낸 파일이 최신이면 재사용)
+ultralytics YOLO로 불러오므로, 추론 결과 형식(result.boxes 등)은 백엔드와 관계없이 같습니다.
+
+INT8 양자화:
+- ONNX: onnxruntime.quantization 정적 양자화 (보정 이미지로 활성값 범위 측정)
+- OpenVINO: ultralytics 내보내기 (NNCF, 보정 이미지 사용)
+
+백엔드별 지연 시간 / 정확도 비교:
+    python backends.py calib_images/ --model fire --backends pytorch onnx openvino --int8
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from detector import ANIMAL_CLASSES, TARGET_CLASS
+from postprocess import box_iou, build_class_mask, extract_detections
+from preprocess import letterbox_batch
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+DEFAULT_IMGSZ = 640
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+CALIBRATION_MAX_IMAGES = 300  # 양자화 보정에 사용할 최대 이미지 수
+
+
+def exported_path(weights, backend, int8=False):
+    """백엔드별 내보낸 모델 경로 (ultralytics 내보내기 이름 규칙과 동일)"""
+    stem = os.path.splitext(weights)[0]
+    suffix = "_int8" if int8 else ""
+    if backend == "onnx":
+        return f"{stem}{suffix}.onnx"
+    if backend == "openvino":
+        return f"{stem}{suffix}_openvino_model"
+    return weights
+
+
+def _is_stale(src, dst):
+    # 내보낸 모델이 없거나 원본 가중치보다 오래되었으면 다시 내보냄
+    return not os.path.exists(dst) or os.path.getmtime(dst) < os.path.getmtime(src)
+
+
+def list_images(folder, limit=None):
+    files = sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+    if limit is not None:
+        files = files[:limit]
+    return [os.path.join(folder, f) for f in files]
+
+
+# 백엔드별 추론에 필요한 패키지 (requirements.txt에 포함)
+BACKEND_PACKAGES = {"onnx": "onnxruntime", "openvino": "openvino"}
+
+
+def require_backend(backend):
+    """백엔드 패키지가 없으면 내보내기 / 로딩 전에 설치할 패키지 이름과 함께 오류"""
+    package = BACKEND_PACKAGES.get(backend)
+    if package is None:
+        return
+    try:
+        __import__(package)
+    except ImportError as e:
+        raise RuntimeError(f"{backend} 백엔드에는 {package} 패키지가 필요합니다: pip install {package}") from e
+
+
+def _quantize_onnx(src, dst, calibration, imgsz):
+    """ONNX 모델 정적 INT8 양자화 (보정 이미지 폴더 필요)"""
+    try:
+        import onnxruntime as ort
+        from onnxruntime.quantization import (CalibrationDataReader, QuantFormat,
+                                              QuantType, quantize_static)
+    except ImportError as e:
+        raise RuntimeError("ONNX INT8 양자화에는 onnxruntime 패키지가 필요합니다.") from e
+
+    input_name = ort.InferenceSession(src, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    paths = list_images(calibration, CALIBRATION_MAX_IMAGES)
+    if not paths:
+        raise RuntimeError(f"보정 이미지가 없습니다: {calibration}")
+
+    class ImageReader(CalibrationDataReader):
+        def __init__(self):
+            self._paths = iter(paths)
+
+        def get_next(self):
+            for path in self._paths:
+                image = cv2.imread(path)
+                if image is not None:
+                    # 감지 루프와 같은 전처리 (패딩 값 / 크기 계산 동일)
+                    return {input_name: letterbox_batch([image], imgsz)[0].numpy()}
+            return None
+
+    quantize_static(
+        src, dst, ImageReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+
+
+def _calibration_yaml(calibration, names):
+    """이미지 폴더를 ultralytics 데이터셋 yaml로 감싸기 (OpenVINO INT8 보정용, 라벨 불필요)"""
+    folder = os.path.abspath(calibration)
+    if isinstance(names, dict):
+        names = [names[i] for i in sorted(names)]
+    fd, path = tempfile.mkstemp(suffix=".yaml", prefix="calib_")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"path": folder, "train": folder, "val": folder, "names": list(names)}, f)
+    return path
+
+
+def export_model(weights, backend, int8=False, calibration=None, imgsz=DEFAULT_IMGSZ):
+    """
+    .pt 가중치를 백엔드 형식으로 내보냄 (이미 최신이면 재사용)
+    Returns:
+        내보낸 모델 경로
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"지원하지 않는 백엔드: {backend} (가능: {', '.join(BACKENDS)})")
+    if backend == "pytorch":
+        return weights
+    require_backend(backend)
+    if int8 and not calibration:
+        raise ValueError("INT8 양자화에는 보정 이미지 폴더(calibration)가 필요합니다.")
+
+    target = exported_path(weights, backend, int8)
+    if not _is_stale(weights, target):
+        return target
+
+    print(f"모델 내보내기: {weights} -> {target}")
+    model = YOLO(weights)
+    # 카메라 수에 따라 배치 크기가 달라지므로 dynamic 입력으로 내보냄
+    if backend == "onnx":
+        fp32 = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if int8:
+            _quantize_onnx(fp32, target, calibration, imgsz)
+        return target
+
+    data = _calibration_yaml(calibration, model.names) if int8 else None
+    try:
+        kwargs = {"int8": True, "data": data} if int8 else {}
+        return model.export(format="openvino", imgsz=imgsz, dynamic=True, **kwargs)
+    finally:
+        if data is not None:
+            os.remove(data)
+
+
+def load_model(weights, backend="pytorch", int8=False, calibration=None, imgsz=DEFAULT_IMGSZ):
+    """백엔드 형식으로 내보낸(또는 원본) 모델을 YOLO로 불러오기"""
+    path = export_model(weights, backend, int8, calibration, imgsz)
+    return YOLO(path, task="detect")
+
+
+def warm_up(model, runs=2, shape=(480, 640, 3), batch=None, imgsz=DEFAULT_IMGSZ):
+    """
+    첫 추론의 초기화 비용(세션 생성, 메모리 할당)을 시작 시점에 미리 치름
+    batch: 감지 루프와 같은 공유 전처리 텐서(letterbox_batch, 카메라 수만큼)로 워밍업
+           (None이면 이미지 한 장 - 입력 경로 / 크기가 달라 첫 배치 추론에서 다시 초기화될 수 있음)
+    Returns:
+        마지막 워밍업 추론 시간 (초)
+    """
+    dummy = np.zeros(shape, dtype=np.uint8)
+    inputs = letterbox_batch([dummy] * batch, imgsz)[0] if batch else dummy
+    elapsed = 0.0
+    for _ in range(runs):
+        start = time.perf_counter()
+        model(inputs, verbose=False)
+        elapsed = time.perf_counter() - start
+    return elapsed
+
+
+# === 백엔드 비교 ===
+def compare_detections(reference, candidate, iou_threshold=0.5):
+    """
+    기준(PyTorch) 감지 대비 후보 백엔드 감지 비교
+    Returns:
+        (기준 박스 중 찾은 수, 기준 박스 수, 일치한 박스의 신뢰도 차이 합)
+    """
+    if len(reference) == 0 or len(candidate) == 0:
+        return 0, len(reference), 0.0
+    iou = box_iou(reference, candidate)
+    same_cls = reference["cls"][:, None] == candidate["cls"][None, :]
+    iou = np.where(same_cls, iou, 0.0)
+    best = iou.argmax(axis=1)
+    matched = iou[np.arange(len(reference)), best] >= iou_threshold
+    conf_delta = np.abs(reference["conf"][matched] - candidate["conf"][best[matched]]).sum()
+    return int(matched.sum()), len(reference), float(conf_delta)
+
+
+def benchmark(args):
+    targets = TARGET_CLASS if args.model == "fire" else ANIMAL_CLASSES
+    weights = args.weights or ("fireModel/best.pt" if args.model == "fire" else "fireModel/yolov8s.pt")
+    images = [(p, cv2.imread(p)) for p in list_images(args.images, args.limit)]
+    images = [(p, img) for p, img in images if img is not None]
+    if not images:
+        raise SystemExit(f"이미지가 없습니다: {args.images}")
+
+    configs = [(backend, False) for backend in args.backends]
+    if args.int8:
+        configs += [(backend, True) for backend in args.backends if backend != "pytorch"]
+
+    reference = None
+    reports = []
+    for backend, int8 in configs:
+        name = f"{backend}{'-int8' if int8 else ''}"
+        model = load_model(weights, backend, int8, args.images if int8 else None, args.imgsz)
+        warm_up(model)
+        class_mask = build_class_mask(model.names, targets)
+
+        times = []
+        detections = []
+        for _, image in images:
+            start = time.perf_counter()
+            result = model(image, verbose=False)[0]
+            times.append(time.perf_counter() - start)
+            detections.append(extract_detections(result, class_mask))
+
+        # 첫 번째 설정(기본: pytorch)이 정확도 비교 기준
+        if reference is None:
+            reference = detections
+
+        found = total = 0
+        conf_delta = 0.0
+        missed_images = 0
+        for ref, cand in zip(reference, detections):
+            f, t, d = compare_detections(ref, cand)
+            found, total, conf_delta = found + f, total + t, conf_delta + d
+            if len(ref) > 0 and len(cand) == 0:
+                missed_images += 1
+
+        ms = np.asarray(times) * 1000
+        reports.append({
+            "backend": name,
+            "mean_ms": float(ms.mean()),
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p90_ms": float(np.percentile(ms, 90)),
+            "recall_vs_reference": found / total if total else 1.0,
+            "mean_conf_delta": conf_delta / found if found else 0.0,
+            "missed_images": missed_images,
+            "images_with_target": sum(len(r) > 0 for r in reference),
+        })
+    return {"weights": weights, "images": len(images), "backends": reports}
+
+
+def print_benchmark(report):
+    print("=" * 72)
+    print(f"백엔드 비교: {report['weights']} ({report['images']}장, 기준: {report['backends'][0]['backend']})")
+    print("=" * 72)
+    print(f"{'backend':<16} {'mean':>8} {'p50':>8} {'p90':>8}  {'recall':>7} {'Δconf':>7} {'missed':>7}")
+    for r in report["backends"]:
+        print(f"{r['backend']:<16} {r['mean_ms']:8.1f} {r['p50_ms']:8.1f} {r['p90_ms']:8.1f}"
+              f"  {r['recall_vs_reference'] * 100:6.1f}% {r['mean_conf_delta']:7.3f}"
+              f" {r['missed_images']:>3}/{r['images_with_target']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLO 추론 백엔드 지연 시간 / 정확도 비교")
+    parser.add_argument("images", help="평가 이미지 폴더 (INT8 보정에도 사용)")
+    parser.add_argument("--model", choices=("fire", "animal"), default="fire")
+    parser.add_argument("--weights", help="가중치 경로 (기본: --model에 따라 fireModel/ 아래)")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--int8", action="store_true", help="ONNX / OpenVINO INT8 양자화 모델도 비교")
+    parser.add_argument("--imgsz", type=int, default=DEFAULT_IMGSZ)
+    parser.add_argument("--limit", type=int, help="사용할 최대 이미지 수")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    report = benchmark(args)
+    print_benchmark(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+"""
+다중 클라이언트 TCP 브로드캐스트 서버
+
+기존 TCP 프로토콜([4 bytes: size][1 byte: type][payload])을 그대로 사용하며,
+접속한 모든 클라이언트에 프레임/이벤트를 non-blocking으로 전송합니다.
+연결 직후 HELLO_V2를 보낸 클라이언트에는 프레임을 v2 형식(순번, 캡처 시각, 감지 블록 포함)으로 보냅니다.
+클라이언트가 보낸 메시지(설정 변경 0x07 등)는 on_message 콜백으로 넘기고, 응답은 그 클라이언트에만 보냅니다.
+quality_factory가 있으면 클라이언트마다 적응형 품질 제어기를 두고, 전송 대기량 / 지연에 맞춰
+JPEG 품질과 해상도를 클라이언트별로 낮추거나 올립니다.
+
+- 클라이언트마다 크기가 제한된 전송 큐 보유
+- 큐가 가득 차면 가장 오래된 '프레임'을 버림 (이벤트 메시지 0x02~0x05는 버리지 않음)
+- 느린 클라이언트가 감지 루프나 다른 클라이언트를 막지 않음
+"""
+import hmac
+import ipaddress
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+
+from metrics import REGISTRY
+from protocol import (FRAME_MSG_TYPES, HEADER, HELLO_V2, MAX_CONTROL_SIZE, MSG_TYPE_FRAME,
+                      MSG_TYPE_HELLO, PROTOCOL_VERSION, pack_frame_v2, pack_json_message)
+
+# 이벤트가 이만큼 쌓이면 더 이상 따라오지 못하는 클라이언트로 보고 연결 종료
+MAX_PENDING_EVENTS = 256
+
+# 지표 (metrics.py): 출력(sink)별 프레임 전송 지연 / 버린 프레임 - 백업 WebSocket도 같은 지표에 기록
+SEND_SECONDS = REGISTRY.histogram(
+    "firedetector_send_seconds", "프레임을 출력에 넘긴 뒤 소켓에 다 쓸 때까지 걸린 시간 (큐 대기 포함)", ("sink",))
+FRAMES_DROPPED = REGISTRY.counter(
+    "firedetector_frames_dropped_total", "전송이 밀려 버린 프레임 수", ("sink",))
+
+
+def _client_ip(addr):
+    """소켓 주소의 IP (IPv4-mapped IPv6는 IPv4로), 해석할 수 없으면 None"""
+    try:
+        ip = ipaddress.ip_address(addr[0])
+    except (ValueError, IndexError, TypeError):
+        return None
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip
+
+
+class ControlAccess:
+    """
+    설정 변경(0x07) 권한 확인
+    허용 주소 목록에 있는 클라이언트이거나, 제어 메시지의 token이 공유 토큰과 같으면 허용
+    Args:
+        allowed_hosts: 허용 주소 / 대역 목록 (예: "127.0.0.1", "192.168.0.0/24", "*"는 모든 주소)
+        token: 공유 토큰 (빈 값이면 토큰으로는 허용하지 않음)
+    """
+
+    def __init__(self, allowed_hosts=("127.0.0.1", "::1"), token=None):
+        hosts = [host.strip() for host in allowed_hosts if host.strip()]
+        self.allow_all = "*" in hosts
+        self.networks = [ipaddress.ip_network(host, strict=False) for host in hosts if host != "*"]
+        self.token = token.encode("utf-8") if token else None
+
+    def allows(self, addr, token=None):
+        if self.token is not None and isinstance(token, str):
+            if hmac.compare_digest(token.encode("utf-8"), self.token):
+                return True
+        if self.allow_all:
+            return True
+        ip = _client_ip(addr)
+        return ip is not None and any(ip in network for network in self.networks)
+
+
+class ClientConnection:
+    """연결된 클라이언트 하나의 전송 큐와 지표"""
+
+    def __init__(self, sock, addr, max_frames, quality=None):
+        self.sock = sock
+        self.addr = addr
+        self.max_frames = max_frames
+        self.quality = quality  # AdaptiveQuality (없으면 항상 기본 품질)
+        self.connected_at = time.time()
+        self.version = 1  # HELLO_V2를 받으면 2
+        self.inbound = b""  # 클라이언트 -> 서버 수신 버퍼
+        self.handshake_done = False  # HELLO_V2는 연결 직후 첫 4바이트로만 인정
+
+        # (msg_type, packet, 큐에 넣은 시각)
+        self.queue = deque()
+        self.queued_frames = 0
+        # 전송 중인 메시지 (일부만 전송된 메시지는 절대 버리지 않음)
+        self.current = None
+        self.current_offset = 0
+        self.current_enqueued = 0.0
+
+        self.frames_sent = 0
+        self.events_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+        self.last_lag = 0.0  # 마지막으로 전송 완료된 메시지의 큐 대기 시간
+
+    def enqueue(self, msg_type, packet):
+        """메시지 추가. 이벤트가 너무 많이 밀리면 False"""
+        now = time.monotonic()
+        if msg_type in FRAME_MSG_TYPES:
+            if self.queued_frames >= self.max_frames:
+                self._drop_oldest_frame()
+            self.queued_frames += 1
+        elif len(self.queue) - self.queued_frames >= MAX_PENDING_EVENTS:
+            return False
+        self.queue.append((msg_type, packet, now))
+        return True
+
+    def _drop_oldest_frame(self):
+        for i, (msg_type, _, _) in enumerate(self.queue):
+            if msg_type in FRAME_MSG_TYPES:
+                del self.queue[i]
+                self.queued_frames -= 1
+                self.frames_dropped += 1
+                FRAMES_DROPPED.inc(sink="tcp")
+                return
+
+    def has_pending(self):
+        return self.current is not None or bool(self.queue)
+
+    def lag(self):
+        """현재 큐에서 가장 오래 기다린 메시지의 대기 시간 (초)"""
+        if self.current is not None:
+            return time.monotonic() - self.current_enqueued
+        if self.queue:
+            return time.monotonic() - self.queue[0][2]
+        return 0.0
+
+    def flush(self):
+        """
+        소켓 버퍼가 허용하는 만큼 전송 (non-blocking)
+        연결이 끊어졌으면 ConnectionError 발생
+        """
+        while True:
+            if self.current is None:
+                if not self.queue:
+                    return
+                msg_type, packet, enqueued = self.queue.popleft()
+                if msg_type in FRAME_MSG_TYPES:
+                    self.queued_frames -= 1
+                self.current = (msg_type, memoryview(packet))
+                self.current_offset = 0
+                self.current_enqueued = enqueued
+
+            msg_type, view = self.current
+            try:
+                sent = self.sock.send(view[self.current_offset:])
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                raise ConnectionError(e)
+            if sent == 0:
+                raise ConnectionError("연결 종료됨")
+
+            self.current_offset += sent
+            self.bytes_sent += sent
+            if self.current_offset < len(view):
+                return
+
+            # 메시지 하나 전송 완료
+            self.last_lag = time.monotonic() - self.current_enqueued
+            if msg_type in FRAME_MSG_TYPES:
+                self.frames_sent += 1
+                SEND_SECONDS.observe(self.last_lag, sink="tcp")
+            else:
+                self.events_sent += 1
+            self.current = None
+
+    def stats(self):
+        return {
+            "addr": f"{self.addr[0]}:{self.addr[1]}",
+            "version": self.version,
+            "connected_sec": time.time() - self.connected_at,
+            "queued": len(self.queue) + (1 if self.current is not None else 0),
+            "frames_sent": self.frames_sent,
+            "events_sent": self.events_sent,
+            "frames_dropped": self.frames_dropped,
+            "bytes_sent": self.bytes_sent,
+            "lag_ms": self.lag() * 1000,
+            "last_lag_ms": self.last_lag * 1000,
+            "quality": self.quality.format_state() if self.quality is not None else None,
+        }
+
+
+class FrameBroadcastServer:
+    """
+    non-blocking 팬아웃 서버
+    broadcast()는 어느 스레드에서 호출해도 즉시 반환되며, 실제 전송은 서버 스레드가 담당합니다.
+    """
+
+    def __init__(self, host, port, max_queued_frames=2, camera_id=0, on_message=None, quality_factory=None):
+        self.host = host
+        self.port = port
+        self.max_queued_frames = max_queued_frames
+        self.camera_id = camera_id  # v2 프레임 헤더에 기록
+        # 클라이언트 메시지 처리: on_message(msg_type, payload, addr) -> (응답 타입, 응답 패킷) 또는 None (서버 스레드에서 호출)
+        self.on_message = on_message
+        self.quality_factory = quality_factory  # 클라이언트별 AdaptiveQuality 생성 함수
+        self.frame_seq = 0  # v2 프레임 송신 순번
+
+        self._selector = selectors.DefaultSelector()
+        self._clients = {}  # sock -> ClientConnection
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((host, port))
+        self.server_socket.listen()
+        self.server_socket.setblocking(False)
+
+        # 다른 스레드에서 selector를 깨우기 위한 소켓 쌍
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+
+    def start(self):
+        self._selector.register(self.server_socket, selectors.EVENT_READ, "accept")
+        self._selector.register(self._wake_r, selectors.EVENT_READ, "wake")
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, name="tcp-broadcast", daemon=True)
+        self._thread.start()
+        print(f"✓ 소켓 서버 대기 중: {self.host}:{self.port}")
+        return self
+
+    def has_clients(self):
+        return bool(self._clients)
+
+    def client_count(self):
+        return len(self._clients)
+
+    def broadcast(self, msg_type, packet):
+        """모든 클라이언트의 전송 큐에 패킷 추가 (non-blocking)"""
+        if not self._clients:
+            return
+        slow_clients = []
+        with self._lock:
+            for client in self._clients.values():
+                if not client.enqueue(msg_type, packet):
+                    slow_clients.append(client)
+        for client in slow_clients:
+            print(f"클라이언트 응답 지연으로 연결 종료: {client.addr}")
+            self._close_client(client)
+        self._wake()
+
+    def broadcast_frame(self, encoded):
+        """
+        인코딩된 프레임을 클라이언트 버전 / 품질에 맞는 형식으로 전송 (non-blocking)
+        패킷은 (버전, 품질, 해상도) 조합마다 프레임당 한 번만 만들어 같은 조합의 클라이언트끼리 공유
+        """
+        if not self._clients:
+            return
+        self.frame_seq += 1
+        with self._lock:
+            plans = []
+            for client in self._clients.values():
+                profile = (encoded.quality, 1.0)
+                if client.quality is not None:
+                    profile = client.quality.observe(client.queued_frames, client.lag(), encoded.quality)
+                plans.append((client, client.version, profile))
+
+        # 재인코딩은 서버 스레드의 전송을 막지 않도록 잠금 밖에서
+        packets = {}
+        for _, version, profile in plans:
+            if (version, profile) not in packets:
+                variant = encoded.variant(*profile)
+                if version >= 2:
+                    packets[(version, profile)] = pack_frame_v2(self.camera_id, self.frame_seq, variant)
+                else:
+                    packets[(version, profile)] = variant.tcp_packet(MSG_TYPE_FRAME)
+
+        slow_clients = []
+        with self._lock:
+            for client, version, profile in plans:
+                if client.sock not in self._clients:
+                    continue
+                if not client.enqueue(MSG_TYPE_FRAME, packets[(version, profile)]):
+                    slow_clients.append(client)
+        for client in slow_clients:
+            print(f"클라이언트 응답 지연으로 연결 종료: {client.addr}")
+            self._close_client(client)
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b"\0")
+        except (BlockingIOError, OSError):
+            # 이미 깨우기 신호가 쌓여 있음
+            pass
+
+    def _serve(self):
+        while self._running:
+            # 보낼 데이터가 있는 클라이언트만 쓰기 이벤트 감시
+            with self._lock:
+                for client in list(self._clients.values()):
+                    events = selectors.EVENT_READ
+                    if client.has_pending():
+                        events |= selectors.EVENT_WRITE
+                    try:
+                        self._selector.modify(client.sock, events, client)
+                    except (KeyError, ValueError):
+                        pass
+
+            for key, mask in self._selector.select(timeout=0.5):
+                if key.data == "accept":
+                    self._accept()
+                elif key.data == "wake":
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                else:
+                    client = key.data
+                    if mask & selectors.EVENT_READ:
+                        self._on_readable(client)
+                    if mask & selectors.EVENT_WRITE and client.sock in self._clients:
+                        try:
+                            with self._lock:
+                                client.flush()
+                        except ConnectionError:
+                            print(f"클라이언트 연결 해제됨: {client.addr}")
+                            self._close_client(client)
+
+    def _accept(self):
+        try:
+            sock, addr = self.server_socket.accept()
+        except (BlockingIOError, OSError):
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        quality = self.quality_factory() if self.quality_factory is not None else None
+        client = ClientConnection(sock, addr, self.max_queued_frames, quality)
+        with self._lock:
+            self._clients[sock] = client
+            self._selector.register(sock, selectors.EVENT_READ, client)
+        print(f"✓ 클라이언트 연결됨: {addr} (총 {len(self._clients)}명)")
+
+    def _on_readable(self, client):
+        """클라이언트 수신 데이터 처리 (v2 협상 요청 및 연결 종료 감지)"""
+        try:
+            data = client.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            print(f"클라이언트 연결 해제됨: {client.addr}")
+            self._close_client(client)
+            return
+
+        client.inbound += data
+        if not client.handshake_done:
+            prefix = client.inbound[:len(HELLO_V2)]
+            if prefix != HELLO_V2[:len(prefix)]:
+                client.handshake_done = True  # v1 클라이언트
+            elif len(prefix) < len(HELLO_V2):
+                return
+            else:
+                client.handshake_done = True
+                client.inbound = client.inbound[len(HELLO_V2):]
+                with self._lock:
+                    client.version = PROTOCOL_VERSION
+                    client.enqueue(MSG_TYPE_HELLO, pack_json_message(MSG_TYPE_HELLO, {
+                        "version": PROTOCOL_VERSION,
+                        "camera_id": self.camera_id,
+                    }))
+                print(f"✓ 클라이언트 프로토콜 v{PROTOCOL_VERSION}: {client.addr}")
+
+        # [size][type][payload] 메시지 단위로 처리
+        while len(client.inbound) >= HEADER.size:
+            size, msg_type = HEADER.unpack_from(client.inbound)
+            if size > MAX_CONTROL_SIZE:
+                print(f"잘못된 클라이언트 메시지로 연결 종료: {client.addr}")
+                self._close_client(client)
+                return
+            end = HEADER.size + size
+            if len(client.inbound) < end:
+                return
+            payload = client.inbound[HEADER.size:end]
+            client.inbound = client.inbound[end:]
+            self._handle_message(client, msg_type, payload)
+
+    def _handle_message(self, client, msg_type, payload):
+        if self.on_message is None:
+            return
+        try:
+            reply = self.on_message(msg_type, payload, client.addr)
+        except Exception as e:
+            print(f"클라이언트 메시지 처리 오류 ({client.addr}): {e}")
+            return
+        if reply is not None:
+            reply_type, packet = reply
+            with self._lock:
+                client.enqueue(reply_type, packet)
+
+    def _close_client(self, client):
+        with self._lock:
+            if self._clients.pop(client.sock, None) is None:
+                return
+            try:
+                self._selector.unregister(client.sock)
+            except (KeyError, ValueError):
+                pass
+        try:
+            client.sock.close()
+        except OSError:
+            pass
+
+    def stats(self):
+        """클라이언트별 지표 목록"""
+        with self._lock:
+            return [client.stats() for client in self._clients.values()]
+
+    def format_stats(self):
+        lines = []
+        for s in self.stats():
+            line = (f"  client {s['addr']:<21} v{s['version']} | queued {s['queued']} | lag {s['lag_ms']:6.1f}ms"
+                    f" | sent {s['frames_sent']} | drop {s['frames_dropped']}")
+            if s["quality"] is not None:
+                line += f" | {s['quality']}"
+            lines.append(line)
+        if not lines:
+            lines.append("  client       (연결 없음)")
+        return "\n".join(lines)
+
+    def close(self):
+        self._running = False
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        with self._lock:
+            clients = list(self._clients.values())
+        for client in clients:
+            self._close_client(client)
+        self._selector.close()
+        self.server_socket.close()
+        self._wake_r.close()
+        self._wake_w.close()
@@ -0,0 +1,197 @@
+"""
+최신 프레임 전용 카메라 리더
+
+cv2.VideoCapture를 별도 스레드에서 계속 읽어 내부 버퍼를 비우고,
+감지 루프에는 가장 최근 프레임만 전달합니다.
+(루프가 카메라 FPS보다 느릴 때 OpenCV 버퍼에 쌓인 오래된 프레임을 받는 문제 방지)
+"""
+import threading
+import time
+
+import cv2
+
+
+class CapturedFrame:
+    """캡처된 프레임 + 메타데이터"""
+
+    __slots__ = ("frame", "timestamp", "monotonic", "frame_id", "dropped")
+
+    def __init__(self, frame, timestamp, monotonic, frame_id, dropped):
+        self.frame = frame
+        self.timestamp = timestamp  # 캡처 시각 (time.time())
+        self.monotonic = monotonic  # 캡처 시각 (time.monotonic(), 지연 측정용)
+        self.frame_id = frame_id  # 카메라에서 읽은 순번
+        self.dropped = dropped  # 지금까지 소비되지 못하고 버려진 프레임 수
+
+    def age(self):
+        """캡처 후 경과 시간 (초)"""
+        return time.monotonic() - self.monotonic
+
+
+class LatestFrameCamera:
+    """
+    카메라를 백그라운드 스레드에서 계속 읽고 최신 프레임만 보관
+    read()는 이전에 반환한 것보다 새로운 프레임이 들어올 때까지 대기합니다.
+    카메라 열기(스트림 연결 등 수 초가 걸릴 수 있음)도 읽기 스레드에서 하므로
+    start()는 바로 반환하고, 여러 카메라 / 모델 로딩과 동시에 진행됩니다.
+    """
+
+    def __init__(self, source=0, buffer_size=1, notify=None, on_open=None):
+        self.source = source
+        self.buffer_size = buffer_size
+        self.notify = notify  # 새 프레임이 들어올 때마다 set 되는 threading.Event (CameraGroup용)
+        self.on_open = on_open  # 열기 완료 시 on_open(source, 소요 시간, 성공 여부) 호출 (시작 시간 측정용)
+        self.cap = None
+
+        self.frames_read = 0
+        self.dropped = 0
+        self.fps = 0.0  # 캡처 FPS (프레임 간격의 지수 이동 평균)
+        self._last_read = None
+        self._latest = None
+        self._last_returned_id = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._failed = False
+        self._thread = None
+
+    def is_opened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    @property
+    def failed(self):
+        return self._failed
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._reader, name="camera-reader", daemon=True)
+        self._thread.start()
+        return self
+
+    def _open(self):
+        start = time.perf_counter()
+        cap = cv2.VideoCapture(self.source)
+        # 지원하는 백엔드에서는 드라이버 버퍼도 최소화
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+        if self.on_open is not None:
+            self.on_open(self.source, time.perf_counter() - start, cap.isOpened())
+        return cap
+
+    def _reader(self):
+        cap = self._open()
+        with self._cond:
+            if not self._running:  # 여는 동안 release() 됨
+                cap.release()
+                return
+            self.cap = cap
+
+        while self._running:
+            ret, frame = cap.read()
+            if not ret:
+                print("카메라를 읽을 수 없습니다.")
+                with self._cond:
+                    self._failed = True
+                    self._cond.notify_all()
+                if self.notify is not None:
+                    self.notify.set()
+                break
+
+            now, mono = time.time(), time.monotonic()
+            with self._cond:
+                self.frames_read += 1
+                if self._last_read is not None and mono > self._last_read:
+                    rate = 1.0 / (mono - self._last_read)
+                    self.fps = rate if self.fps == 0.0 else self.fps * 0.9 + rate * 0.1
+                self._last_read = mono
+                # 이전 최신 프레임이 소비되지 않았다면 버려진 것으로 집계
+                if self._latest is not None and self._latest.frame_id > self._last_returned_id:
+                    self.dropped += 1
+                self._latest = CapturedFrame(frame, now, mono, self.frames_read, self.dropped)
+                self._cond.notify_all()
+            if self.notify is not None:
+                self.notify.set()
+
+    def read(self, timeout=None):
+        """
+        아직 반환하지 않은 최신 프레임 반환 (timeout이 None이면 새 프레임이 올 때까지 대기)
+        Returns:
+            CapturedFrame, 카메라 오류/종료/타임아웃 시 None
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._latest is None or self._latest.frame_id <= self._last_returned_id:
+                if self._failed or not self._running:
+                    return None
+                if deadline is None:
+                    self._cond.wait()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            self._last_returned_id = self._latest.frame_id
+            return self._latest
+
+    def stats(self):
+        with self._cond:
+            return {"frames_read": self.frames_read, "dropped": self.dropped, "fps": self.fps}
+
+    def release(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        with self._cond:
+            cap, self.cap = self.cap, None
+        if cap is not None:
+            cap.release()
+
+
+class CameraGroup:
+    """
+    여러 카메라를 묶어 배치 단위로 최신 프레임을 가져옴
+    read_batch()는 새 프레임이 있는 카메라들의 프레임을 한 번에 반환합니다.
+    """
+
+    def __init__(self, sources, on_open=None):
+        self._new_frame = threading.Event()
+        self.cameras = [LatestFrameCamera(src, notify=self._new_frame, on_open=on_open) for src in sources]
+
+    def __len__(self):
+        return len(self.cameras)
+
+    def start(self):
+        for cam in self.cameras:
+            cam.start()
+        return self
+
+    def read_batch(self, timeout=None):
+        """
+        새 프레임이 있는 카메라들의 (카메라 index, CapturedFrame) 목록
+        Returns:
+            목록, 모든 카메라가 실패했으면 None
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._new_frame.clear()
+            batch = []
+            for i, cam in enumerate(self.cameras):
+                captured = cam.read(timeout=0)
+                if captured is not None:
+                    batch.append((i, captured))
+            if batch:
+                return batch
+            if all(cam.failed for cam in self.cameras):
+                return None
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return []
+            self._new_frame.wait(remaining)
+
+    def stats(self):
+        return [cam.stats() for cam in self.cameras]
+
+    def release(self):
+        for cam in self.cameras:
+            cam.release()
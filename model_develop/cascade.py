@@ -0,0 +1,171 @@
+"""
+2단계 화재 감지 캐스케이드 (저해상도 선별 -> 고해상도 확인)
+
+1단계: 매 프레임 화재 모델을 작은 입력 크기(screen_imgsz)로 실행하고 낮은 신뢰도 기준으로 후보를 찾습니다.
+2단계: 후보가 있는 프레임만 다시 확인합니다.
+  - full: 프레임 전체를 큰 입력 크기(confirm_imgsz)로 재추론
+  - tile: 후보 박스 주변을 원본 해상도로 잘라(tile) 추론 - 멀리 있는 작은 불꽃에 유리
+후보가 없는 대부분의 프레임은 저해상도 추론 비용만 듭니다.
+"""
+import time
+
+import numpy as np
+
+from pipeline import StageStats
+from postprocess import EMPTY_DETECTIONS, box_iou, build_class_mask, extract_detections
+from preprocess import letterbox_batch
+
+CASCADE_MODES = ("full", "tile")
+
+
+def _tile_around(det, frame_w, frame_h, tile_size, margin):
+    """후보 박스 중심의 정사각 영역 (박스가 크면 박스 + 여백 크기), 프레임 안으로 맞춤"""
+    bw, bh = det["x2"] - det["x1"], det["y2"] - det["y1"]
+    size = int(min(max(tile_size, max(bw, bh) * (1 + margin)), frame_w, frame_h))
+    cx, cy = (det["x1"] + det["x2"]) // 2, (det["y1"] + det["y2"]) // 2
+    x1 = int(np.clip(cx - size // 2, 0, frame_w - size))
+    y1 = int(np.clip(cy - size // 2, 0, frame_h - size))
+    return x1, y1, size
+
+
+def suppress_duplicates(dets, iou_threshold=0.5):
+    """타일이 겹쳐 같은 불꽃이 두 번 잡힌 경우 신뢰도가 높은 박스만 유지"""
+    if len(dets) <= 1:
+        return dets
+    dets = dets[np.argsort(-dets["conf"])]
+    iou = box_iou(dets, dets)
+    keep = np.ones(len(dets), dtype=bool)
+    for i in range(len(dets)):
+        if keep[i]:
+            dup = (iou[i] > iou_threshold) & (dets["cls"] == dets["cls"][i])
+            dup[:i + 1] = False
+            keep[dup] = False
+    return dets[keep]
+
+
+class FireCascade:
+    """
+    Args:
+        target_classes: 후보로 볼 클래스 이름 (fire, smoke)
+        screen_imgsz: 1단계 입력 크기
+        confirm_imgsz: 2단계 입력 크기 (full 모드) / 타일 입력 크기 (tile 모드)
+        screen_conf: 1단계 후보 신뢰도 기준 (낮을수록 민감, 2단계 호출 증가)
+        confirm_conf: 2단계 확정 신뢰도 기준
+        mode: "full" 또는 "tile"
+        tile_size: 타일 한 변 크기 (원본 픽셀)
+        max_tiles: 프레임당 최대 타일 수 (신뢰도 높은 후보부터)
+    """
+
+    def __init__(self, target_classes, screen_imgsz=320, confirm_imgsz=640, screen_conf=0.15,
+                 confirm_conf=0.25, mode="full", tile_size=640, tile_margin=0.5, max_tiles=4):
+        if mode not in CASCADE_MODES:
+            raise ValueError(f"지원하지 않는 캐스케이드 모드: {mode} (가능: {', '.join(CASCADE_MODES)})")
+        self.target_classes = target_classes
+        self.screen_imgsz = screen_imgsz
+        self.confirm_imgsz = confirm_imgsz
+        self.screen_conf = screen_conf
+        self.confirm_conf = confirm_conf
+        self.mode = mode
+        self.tile_size = tile_size
+        self.tile_margin = tile_margin
+        self.max_tiles = max_tiles
+        self._class_mask = None
+
+        self.screen_stats = StageStats("screen")
+        self.confirm_stats = StageStats("confirm")
+        self.frames = 0
+        self.candidates = 0  # 1단계에서 후보가 나온 프레임 수
+        self.confirmed = 0  # 2단계에서도 감지된 프레임 수
+
+    def run(self, fire_model, frames):
+        """
+        프레임 목록에 캐스케이드 적용
+        Returns:
+            프레임별 대상 클래스 감지 레코드 배열 (원본 프레임 좌표)
+        """
+        if self._class_mask is None:
+            self._class_mask = build_class_mask(fire_model.names, self.target_classes)
+
+        # 1단계: 저해상도 선별
+        start = time.perf_counter()
+        tensor, geometries = letterbox_batch(frames, self.screen_imgsz)
+        results = fire_model(tensor, conf=self.screen_conf, verbose=False)
+        screened = [extract_detections(r, self._class_mask, g) for r, g in zip(results, geometries)]
+        self.screen_stats.record(time.perf_counter() - start)
+        self.frames += len(frames)
+
+        final = [EMPTY_DETECTIONS] * len(frames)
+        candidate_idx = [i for i, dets in enumerate(screened) if len(dets) > 0]
+        if not candidate_idx:
+            return final
+        self.candidates += len(candidate_idx)
+
+        # 2단계: 후보 프레임만 고해상도 확인
+        start = time.perf_counter()
+        if self.mode == "full":
+            confirmed = self._confirm_full([frames[i] for i in candidate_idx], fire_model)
+        else:
+            confirmed = self._confirm_tiles([(frames[i], screened[i]) for i in candidate_idx], fire_model)
+        self.confirm_stats.record(time.perf_counter() - start)
+
+        for i, dets in zip(candidate_idx, confirmed):
+            final[i] = dets
+            if len(dets) > 0:
+                self.confirmed += 1
+        return final
+
+    def _confirm_full(self, frames, fire_model):
+        tensor, geometries = letterbox_batch(frames, self.confirm_imgsz)
+        results = fire_model(tensor, conf=self.confirm_conf, verbose=False)
+        return [extract_detections(r, self._class_mask, g) for r, g in zip(results, geometries)]
+
+    def _confirm_tiles(self, items, fire_model):
+        # 모든 후보 프레임의 타일을 한 번에 배치 추론
+        tiles = []
+        owners = []
+        for n, (frame, candidates) in enumerate(items):
+            h, w = frame.shape[:2]
+            for det in candidates[np.argsort(-candidates["conf"])][:self.max_tiles]:
+                x1, y1, size = _tile_around(det, w, h, self.tile_size, self.tile_margin)
+                tiles.append(frame[y1:y1 + size, x1:x1 + size])
+                owners.append((n, x1, y1))
+
+        tensor, geometries = letterbox_batch(tiles, self.confirm_imgsz)
+        results = fire_model(tensor, conf=self.confirm_conf, verbose=False)
+
+        per_frame = [[] for _ in items]
+        for r, g, (n, x1, y1) in zip(results, geometries, owners):
+            dets = extract_detections(r, self._class_mask, g)
+            if len(dets) == 0:
+                continue
+            dets = dets.copy()
+            dets["x1"] += x1
+            dets["x2"] += x1
+            dets["y1"] += y1
+            dets["y2"] += y1
+            per_frame[n].append(dets)
+
+        return [
+            suppress_duplicates(np.concatenate(parts)) if parts else EMPTY_DETECTIONS
+            for parts in per_frame
+        ]
+
+    def stats(self):
+        screen = self.screen_stats.snapshot()
+        confirm = self.confirm_stats.snapshot()
+        return {
+            "mode": self.mode,
+            "frames": self.frames,
+            "candidates": self.candidates,
+            "confirmed": self.confirmed,
+            "candidate_ratio": self.candidates / self.frames if self.frames else 0.0,
+            "confirm_ratio": self.confirmed / self.candidates if self.candidates else 0.0,
+            "screen_avg_ms": screen["avg_ms"],
+            "confirm_avg_ms": confirm["avg_ms"],
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"  cascade      screen {s['screen_avg_ms']:6.1f}ms | confirm({s['mode']}) {s['confirm_avg_ms']:6.1f}ms"
+                f" | candidates {s['candidates']}/{s['frames']} ({s['candidate_ratio'] * 100:.0f}%)"
+                f" | confirmed {s['confirmed']} ({s['confirm_ratio'] * 100:.0f}%)")
@@ -0,0 +1,420 @@
+"""
+카메라별 감지 결과 처리
+
+YOLO 추론 결과를 받아 박스를 그리고, 화재 확정 상태 머신을 갱신하며,
+이벤트와 인코딩된 프레임을 출력(DetectorOutputs)으로 내보냅니다.
+카메라마다 CameraDetector 인스턴스를 하나씩 가지므로 여러 카메라의 상태가 섞이지 않습니다.
+"""
+import queue
+import time
+from datetime import datetime
+
+from encoding import JPEG_QUALITY, encode_frame
+from metrics import REGISTRY
+from preprocess import letterbox_batch
+from postprocess import (build_class_mask, build_label_table, draw_detections,
+                         extract_detections, round_confidence)
+from protocol import MSG_TYPE_ANIMAL_EVENT, MSG_TYPE_FIRE_EVENT, pack_detections
+from runtime_config import RuntimeConfig
+from tracker import IoUTracker
+
+ALERT_COOLDOWN = 30
+
+# Gemini 분석 설정
+GEMINI_CHECK_INTERVAL = 30  # 30초마다 확인
+FIRE_CHECK_DELAY = 10  # 화재 감지 후 10초 뒤에 재확인
+
+FIRE_RESET_INTERVAL = 60  # 화재가 60초 이상 감지되지 않으면 모니터링 종료
+FIRE_LOG_INTERVAL = 3  # 화재 감지 로그 출력 간격 (초)
+
+TARGET_CLASS = ['fire','smoke']  # 감지할 화재 클래스
+
+# 동물 클래스 리스트 (YOLO coco 데이터셋의 동물 클래스)
+ANIMAL_CLASSES = ['dog', 'cat', 'bird','person']
+
+# 성능 최적화: 프레임 스킵 설정
+# 감지하지 않는 프레임은 추적기가 박스를 이어 그리므로 간격을 넓혀도 깜빡이지 않음
+ANIMAL_DETECTION_SKIP = 6  # 매 6프레임마다 동물 감지 (더 빠름)
+
+# 동물 추적 설정
+TRACK_IOU_THRESHOLD = 0.3  # 감지와 트랙을 같은 개체로 볼 최소 IoU
+TRACK_MAX_MISSES = 2  # 동물 감지를 연속 이 횟수보다 많이 놓치면 트랙 종료 (시간이 아닌 감지 횟수 기준)
+
+# 지표 (metrics.py)
+INFERENCE_SECONDS = REGISTRY.histogram(
+    "firedetector_inference_seconds", "모델별 추론 호출 시간 (배치 한 번)", ("model",))
+FRAMES_PROCESSED = REGISTRY.counter(
+    "firedetector_frames_processed_total", "후처리 / 전송까지 마친 프레임 수", ("camera",))
+FIRE_TRANSITIONS = REGISTRY.counter(
+    "firedetector_fire_transitions_total", "화재 확정 상태 전이 횟수", ("camera", "transition"))
+
+
+def default_runtime_config(**overrides):
+    """이 모듈의 상수를 초기값으로 하는 실행 중 변경 가능 설정"""
+    values = {
+        "fire_classes": TARGET_CLASS,
+        "animal_classes": ANIMAL_CLASSES,
+        "animal_skip": ANIMAL_DETECTION_SKIP,
+        "alert_cooldown": ALERT_COOLDOWN,
+        "jpeg_quality": JPEG_QUALITY,
+    }
+    values.update(overrides)
+    return RuntimeConfig(**values)
+
+
+class FireConfirmation:
+    """
+    화재 확정 상태 머신
+    1. 최초 감지 -> FIRE_CHECK_DELAY 동안 대기
+    2. 대기 후에도 감지되면 확정 -> 모니터링 시작 (Gemini 즉시 분석)
+    3. 모니터링 중에는 GEMINI_CHECK_INTERVAL 마다 재분석
+    4. FIRE_RESET_INTERVAL 동안 감지되지 않으면 모니터링 종료
+    """
+
+    def __init__(self, label="", camera_id=0):
+        self.label = label  # 로그 구분용 (예: "[cam1] ")
+        self.camera_id = camera_id  # 지표 라벨
+        self.pending_fire_check_time = None  # 재확인 대기 시작 시간
+        self.is_monitoring_fire = False
+        self.last_fire_detection_time = 0
+        self.last_gemini_check_time = 0
+
+    def state(self):
+        """현재 상태: idle / pending (재확인 대기) / monitoring"""
+        if self.is_monitoring_fire:
+            return "monitoring"
+        return "pending" if self.pending_fire_check_time is not None else "idle"
+
+    def update(self, fire_detected, current_time):
+        """
+        현재 프레임의 화재 감지 여부로 상태 갱신
+        Returns:
+            "confirmed": 화재 확정 (알림 + Gemini 분석)
+            "recheck": 모니터링 중 주기적 Gemini 재분석
+            None: 별도 동작 없음
+        """
+        # 화재 감지 시간 업데이트
+        if fire_detected:
+            self.last_fire_detection_time = current_time
+
+        # 화재가 일정 시간 이상 감지되지 않으면 모니터링 종료
+        if self.is_monitoring_fire and (current_time - self.last_fire_detection_time > FIRE_RESET_INTERVAL):
+            print(f"{self.label}--- 화재 소실 확인. 모니터링 종료 ---")
+            FIRE_TRANSITIONS.inc(camera=self.camera_id, transition="reset")
+            self.is_monitoring_fire = False
+            self.pending_fire_check_time = None
+
+        if not fire_detected:
+            # 현재 프레임에서 화재 없음
+            if self.pending_fire_check_time is not None:
+                # 재확인 대기 중이었는데 화재가 사라짐 -> 취소
+                print(f"{self.label}재확인 중 화재 소실. 대기 취소.")
+                FIRE_TRANSITIONS.inc(camera=self.camera_id, transition="cancelled")
+                self.pending_fire_check_time = None
+            return None
+
+        if self.is_monitoring_fire:
+            # 모니터링 중에는 pending 타이머 불필요
+            self.pending_fire_check_time = None
+
+            # 이미 모니터링 중 (GEMINI_CHECK_INTERVAL 마다 재확인)
+            if current_time - self.last_gemini_check_time > GEMINI_CHECK_INTERVAL:
+                print(f"{self.label}--- 화재 모니터링 업데이트 ({GEMINI_CHECK_INTERVAL}초 경과) ---")
+                self.last_gemini_check_time = current_time
+                FIRE_TRANSITIONS.inc(camera=self.camera_id, transition="recheck")
+                return "recheck"
+            return None
+
+        # 새로운 화재 감지 (모니터링 시작 전)
+        if self.pending_fire_check_time is None:
+            self.pending_fire_check_time = current_time
+            print(f"{self.label}화재 최초 감지. {FIRE_CHECK_DELAY}초 뒤 재확인합니다.")
+            FIRE_TRANSITIONS.inc(camera=self.camera_id, transition="pending")
+            return None
+
+        if current_time - self.pending_fire_check_time >= FIRE_CHECK_DELAY:
+            # 대기 후에도 화재가 감지됨 -> 확정
+            print(f"{self.label}--- 화재 확정. Gemini 분석 및 모니터링 시작 ---")
+            self.is_monitoring_fire = True
+            self.pending_fire_check_time = None
+            self.last_gemini_check_time = current_time
+            FIRE_TRANSITIONS.inc(camera=self.camera_id, transition="confirmed")
+            return "confirmed"
+        return None
+
+
+class DetectorOutputs:
+    """
+    감지 결과 출력 인터페이스
+    실행 환경(실시간 서버, 리플레이 등)에 맞게 상속하여 구현합니다.
+    """
+
+    def wants_frame(self):
+        """인코딩된 프레임을 받을 곳이 있는지 (없으면 인코딩 생략)"""
+        return False
+
+    def send_frame(self, encoded):
+        pass
+
+    def send_event(self, msg_type, event_data):
+        pass
+
+    def notify_fire(self, camera_id):
+        """화재 확정 알림"""
+        pass
+
+    def request_gemini(self, camera_id, encoded, frame, force_refresh=False):
+        """
+        Gemini 분석 요청
+        force_refresh: 화재 확정 시 True (캐시된 이전 결과 대신 반드시 새로 분석)
+        """
+        pass
+
+
+class CameraDetector:
+    """
+    카메라 하나의 추론 계획, 후처리, 화재 확정, 출력 담당
+    config: 실행 중 변경 가능한 설정 (RuntimeConfig, 여러 카메라가 공유 가능)
+    animal_names: 동물 모델을 아직 불러오는 중이면 None (준비되면 set_animal_names로 연결,
+                  그 전까지는 화재 감지만 실행)
+    """
+
+    def __init__(self, camera_id, fire_names, animal_names, outputs, motion_gate=None, config=None):
+        self.camera_id = camera_id
+        self.fire_names = fire_names
+        self.animal_names = animal_names
+        self.outputs = outputs
+        self.motion_gate = motion_gate
+        self.config = config if config is not None else default_runtime_config()
+
+        self.fire_state = FireConfirmation(f"[cam{camera_id}] ", camera_id)
+        self.frame_count = 0
+        self.last_fire_dets = None  # 추론을 생략한 프레임에서 재사용할 화재 감지 결과
+        self.animal_tracker = IoUTracker(TRACK_IOU_THRESHOLD, TRACK_MAX_MISSES)  # 동물 감지 사이 프레임 보간
+        self.last_alert_time = 0
+        self.last_fire_log_time = 0
+        self.last_frame_latency = 0.0  # 캡처 ~ 전송 완료까지 지연 시간
+
+        # 후처리 -> 전송 단계로 넘길 이벤트 (프레임은 버려져도 이벤트는 유지)
+        self.pending_events = queue.Queue()
+
+        # 클래스 id 기반 마스크/라벨은 한 번만 계산 (대상 클래스 설정이 바뀌면 다시 계산)
+        self._mask_classes = None
+        self._fire_mask = self._animal_mask = None
+        self._update_class_masks(self.config.current())
+        self._fire_labels = build_label_table(fire_names)
+        self._animal_labels = build_label_table(animal_names) if animal_names is not None else None
+
+    def set_animal_names(self, animal_names):
+        """늦게 준비된 동물 모델 연결 (마스크는 다음 후처리에서 다시 계산)"""
+        self._animal_labels = build_label_table(animal_names)
+        self.animal_names = animal_names
+
+    def _update_class_masks(self, settings):
+        classes = (settings.fire_classes, settings.animal_classes, self.animal_names is not None)
+        if classes != self._mask_classes:
+            self._mask_classes = classes
+            self._fire_mask = build_class_mask(self.fire_names, settings.fire_classes)
+            if self.animal_names is not None:
+                self._animal_mask = build_class_mask(self.animal_names, settings.animal_classes)
+
+    def plan(self, captured):
+        """
+        이번 프레임에서 실행할 추론 결정
+        Returns:
+            (화재 모델 실행 여부, 동물 모델 실행 여부)
+        """
+        # 장면 변화가 없으면 추론 생략: 직전 화재 결과를 그대로 사용
+        if self.motion_gate is not None:
+            run, _ = self.motion_gate.should_infer(captured.frame, captured.monotonic)
+            if not run:
+                return False, False
+
+        # 동물 감지는 성능 최적화를 위해 프레임 스킵 (동물 모델 준비 전에는 화재만)
+        run_animal = self.animal_names is not None and self.frame_count % self.config.current().animal_skip == 0
+        self.frame_count += 1
+        return True, run_animal
+
+    def process(self, captured, fire_result, animal_result, geometry=None):
+        """
+        감지 결과 분석, 박스 그리기, 화재 확정 로직 (후처리 단계)
+        fire_result가 None이면 직전 결과 재사용, animal_result가 None이면 동물 분석 생략
+        geometry: 공유 전처리 텐서의 좌표 변환 정보 (박스를 원본 프레임 좌표로 복원)
+        Returns:
+            (captured, encoded) - 출력할 곳이 없으면 encoded는 None
+        """
+        frame = captured.frame
+        settings = self.config.current()
+        self._update_class_masks(settings)
+
+        # 1. 화재 감지 결과 분석 (매 프레임, 추론을 생략했으면 직전 결과 재사용)
+        if fire_result is None:
+            fire_dets = self.last_fire_dets
+        else:
+            fire_dets = extract_detections(fire_result, self._fire_mask, geometry)
+            fire_dets = fire_dets[fire_dets["conf"] >= settings.fire_conf]
+            self.last_fire_dets = fire_dets
+
+        fire_detected_in_frame = fire_dets is not None and len(fire_dets) > 0
+        max_fire_confidence = 0.0
+        if fire_detected_in_frame:
+            # 화재 감지: 파란색 박스
+            draw_detections(frame, fire_dets, self._fire_labels, (255, 0, 0))
+            max_fire_confidence = float(round_confidence(fire_dets["conf"].max()))
+
+        # 2. 화재 확정 상태 갱신 (처리 시각이 아닌 캡처 시각 기준)
+        current_time = captured.timestamp
+        action = self.fire_state.update(fire_detected_in_frame, current_time)
+        if action == "confirmed":
+            # 백엔드에 화재 알림 전송
+            self.outputs.notify_fire(self.camera_id)
+        gemini_requested = action is not None
+
+        # 3. 동물 감지 결과로 추적 갱신 (스킵되지 않은 프레임에서만), 스킵된 프레임은 예측 위치 사용
+        new_tracks = []
+        if animal_result is not None:
+            animal_dets = extract_detections(animal_result, self._animal_mask, geometry)
+            animal_dets = animal_dets[animal_dets["conf"] >= settings.animal_conf]
+            new_tracks = self.animal_tracker.update(animal_dets, current_time)
+        tracked_dets, track_ids = self.animal_tracker.active(current_time)
+        if len(tracked_dets) > 0:
+            # 동물 감지: 초록색 박스 + 트랙 id
+            draw_detections(frame, tracked_dets, self._animal_labels, (0, 255, 0), track_ids)
+
+        # 4. 화재 감지 이벤트
+        if fire_detected_in_frame:
+            # 로그 출력 간격 확인
+            if current_time - self.last_fire_log_time >= FIRE_LOG_INTERVAL:
+                self.last_fire_log_time = current_time
+                print(f"[{time.ctime()}] 🔥 화재 감지 !!! (cam{self.camera_id})")
+
+                self.pending_events.put((MSG_TYPE_FIRE_EVENT, {
+                    "event_type": "fire_detected",
+                    "camera_id": self.camera_id,
+                    "timestamp": datetime.now().isoformat(),
+                    "unix_timestamp": current_time,
+                    "confidence": max_fire_confidence,
+                    "message": "🔥 화재가 감지되었습니다!"
+                }))
+
+            if (current_time - self.last_alert_time) > settings.alert_cooldown:
+                print(">>> 화재 알림 조건 충족!")
+                self.last_alert_time = current_time
+
+        # 5. 동물 감지 이벤트 (새로 나타난 개체마다 한 번)
+        for track in new_tracks:
+            animal = self.animal_names[track.cls]
+            print(f"[{time.ctime()}] 🐾 동물 감지: {animal} #{track.track_id} (cam{self.camera_id})")
+
+            self.pending_events.put((MSG_TYPE_ANIMAL_EVENT, {
+                "event_type": "animal_detected",
+                "camera_id": self.camera_id,
+                "track_id": track.track_id,
+                "timestamp": datetime.now().isoformat(),
+                "unix_timestamp": current_time,
+                "detected_animals": [animal],
+                "confidence": float(round_confidence(track.conf)),
+                "message": f"🐾 {animal}이(가) 감지되었습니다!"
+            }))
+
+        # 6. 주석이 모두 그려진 프레임을 한 번만 인코딩하여 모든 출력에서 공유
+        encoded = None
+        if self.outputs.wants_frame() or gemini_requested:
+            encoded = encode_frame(frame, captured.timestamp, captured.frame_id,
+                                   settings.jpeg_quality, monotonic=captured.monotonic)
+            # v2 클라이언트가 JSON 없이 오버레이를 그릴 수 있도록 감지 결과를 프레임에 첨부
+            if encoded is not None:
+                encoded.detections = pack_detections(fire_dets, tracked_dets, track_ids)
+                encoded.source = frame  # 출력별 저품질 / 축소 인코딩용 (전송 후 해제)
+
+        if gemini_requested and encoded is not None:
+            self.outputs.request_gemini(self.camera_id, encoded, frame,
+                                        force_refresh=(action == "confirmed"))
+
+        return captured, encoded
+
+    def fan_out(self, item):
+        """프레임과 쌓인 이벤트를 출력으로 송신 (전송 단계)"""
+        captured, encoded = item
+
+        if encoded is not None:
+            self.outputs.send_frame(encoded)
+            encoded.release_source()
+
+        while True:
+            try:
+                msg_type, event_data = self.pending_events.get_nowait()
+            except queue.Empty:
+                break
+            self.outputs.send_event(msg_type, event_data)
+
+        self.last_frame_latency = captured.age()
+        FRAMES_PROCESSED.inc(camera=self.camera_id)
+        return captured
+
+
+def infer_batch(fire_model, animal_model, batch, cascade=None):
+    """
+    여러 카메라의 프레임을 모델별로 묶어 한 번에 YOLO 추론
+    입력 텐서(레터박스 + 정규화)는 프레임당 한 번만 만들어 두 모델이 함께 사용
+    cascade(FireCascade)가 있으면 화재 모델은 저해상도 선별 -> 후보만 고해상도 확인으로 실행
+    입력 크기 / 신뢰도 기준은 첫 감지기의 실행 중 설정(RuntimeConfig)을 사용
+    animal_model이 None이면(아직 로딩 중) 화재 모델만 실행
+    Args:
+        batch: [(CameraDetector, CapturedFrame), ...]
+    Returns:
+        [(CameraDetector, CapturedFrame, 화재 결과 또는 None, 동물 결과 또는 None, FrameGeometry 또는 None), ...]
+        캐스케이드 사용 시 화재 결과는 원본 좌표의 감지 레코드 배열
+    """
+    plans = [detector.plan(captured) for detector, captured in batch]
+    if animal_model is None:
+        plans = [(run_fire, False) for run_fire, _ in plans]
+    settings = batch[0][0].config.current() if batch else None
+
+    fire_results = [None] * len(batch)
+    if cascade is not None:
+        fire_idx = [i for i, (run_fire, _) in enumerate(plans) if run_fire]
+        if fire_idx:
+            start = time.perf_counter()
+            fire_dets = cascade.run(fire_model, [batch[i][1].frame for i in fire_idx])
+            INFERENCE_SECONDS.observe(time.perf_counter() - start, model="fire")
+            for i, dets in zip(fire_idx, fire_dets):
+                fire_results[i] = dets
+        # 공유 텐서는 동물 모델만 사용
+        plans = [(False, run_animal) for _, run_animal in plans]
+
+    # 어느 모델이든 추론할 프레임만 한 번 전처리
+    infer_idx = [i for i, (run_fire, run_animal) in enumerate(plans) if run_fire or run_animal]
+    geometries = [None] * len(batch)
+    animal_results = [None] * len(batch)
+    if infer_idx:
+        tensor, infer_geometries = letterbox_batch([batch[i][1].frame for i in infer_idx], settings.imgsz)
+        row = {}
+        for r, (i, geometry) in enumerate(zip(infer_idx, infer_geometries)):
+            geometries[i] = geometry
+            row[i] = r
+
+        fire_idx = [i for i in infer_idx if plans[i][0]]
+        if fire_idx:
+            rows = [row[i] for i in fire_idx]
+            start = time.perf_counter()
+            results = fire_model(tensor if len(rows) == len(infer_idx) else tensor[rows],
+                                 conf=settings.fire_conf, verbose=False)
+            INFERENCE_SECONDS.observe(time.perf_counter() - start, model="fire")
+            for i, r in zip(fire_idx, results):
+                fire_results[i] = r
+
+        animal_idx = [i for i in infer_idx if plans[i][1]]
+        if animal_idx:
+            rows = [row[i] for i in animal_idx]
+            start = time.perf_counter()
+            results = animal_model(tensor if len(rows) == len(infer_idx) else tensor[rows],
+                                   conf=settings.animal_conf, verbose=False)
+            INFERENCE_SECONDS.observe(time.perf_counter() - start, model="animal")
+            for i, r in zip(animal_idx, results):
+                animal_results[i] = r
+
+    return [
+        (detector, captured, fire_results[i], animal_results[i], geometries[i])
+        for i, (detector, captured) in enumerate(batch)
+    ]
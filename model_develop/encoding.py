@@ -0,0 +1,128 @@
+"""
+프레임 JPEG 인코딩 (프레임당 1회)
+
+주석이 그려진 프레임을 한 번만 JPEG로 압축하고, 그 결과를
+TCP 클라이언트 / WebSocket / Gemini 분석 등 모든 출력에서 공유합니다.
+링크 상태에 따라 더 낮은 품질 / 크기가 필요한 출력은 variant()로 조합별 한 번만 다시 인코딩합니다.
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from metrics import REGISTRY
+from pipeline import StageStats
+from protocol import pack_message
+
+JPEG_QUALITY = 80
+
+# 인코딩 시간 통계 (모든 스레드 공용)
+encode_stats = StageStats("encode")
+ENCODE_SECONDS = REGISTRY.histogram("firedetector_encode_seconds", "JPEG 인코딩 시간 (출력별 재인코딩 포함)")
+
+
+class EncodedFrame:
+    """
+    JPEG로 인코딩된 프레임 (읽기 전용으로 공유)
+    data: JPEG 바이트, timestamp/monotonic/frame_id: 원본 프레임의 캡처 정보
+    detections: 프로토콜 v2 감지 블록 (protocol.pack_detections, 없으면 None)
+    source: 다른 품질 / 크기로 다시 인코딩할 때 쓰는 원본 프레임 (전송 단계가 끝나면 release_source)
+    """
+
+    __slots__ = ("data", "timestamp", "monotonic", "frame_id", "width", "height", "quality",
+                 "detections", "source", "_variants", "_packets", "_lock")
+
+    def __init__(self, data, timestamp, frame_id, width, height, quality, monotonic=None):
+        self.data = data
+        self.timestamp = timestamp
+        self.monotonic = monotonic
+        self.frame_id = frame_id
+        self.width = width
+        self.height = height
+        self.quality = quality
+        self.detections = None
+        self.source = None
+        self._variants = {}
+        self._packets = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.data)
+
+    def tcp_packet(self, msg_type):
+        """
+        [4 bytes: size][1 byte: type][JPEG] 형태의 TCP 패킷
+        클라이언트가 여러 명이어도 헤더 결합은 한 번만 수행 (결과 캐시)
+        """
+        with self._lock:
+            packet = self._packets.get(msg_type)
+            if packet is None:
+                packet = pack_message(msg_type, self.data)
+                self._packets[msg_type] = packet
+            return packet
+
+    def variant(self, quality, scale=1.0):
+        """
+        같은 프레임을 더 낮은 품질 / 크기로 인코딩한 EncodedFrame (조합별 한 번만 인코딩해 출력끼리 공유)
+        요청이 현재 품질 / 크기 이상이거나 원본 프레임을 이미 놓았으면 self 반환
+        """
+        quality = min(int(quality), self.quality)
+        scale = round(min(float(scale), 1.0), 2)
+        if quality == self.quality and scale == 1.0:
+            return self
+        key = (quality, scale)
+        with self._lock:
+            variant = self._variants.get(key)
+            if variant is not None:
+                return variant
+            source = self.source
+            if source is None:
+                return self
+            if scale < 1.0:
+                source = cv2.resize(source, (max(1, int(self.width * scale)), max(1, int(self.height * scale))),
+                                    interpolation=cv2.INTER_AREA)
+            variant = encode_frame(source, self.timestamp, self.frame_id, quality, self.monotonic)
+            if variant is None:
+                return self
+            if self.detections is not None and scale < 1.0:
+                # 감지 박스도 축소한 프레임 좌표로 변환
+                dets = self.detections.copy()
+                for name in ("x1", "y1", "x2", "y2"):
+                    dets[name] = np.round(dets[name] * scale)
+                variant.detections = dets
+            else:
+                variant.detections = self.detections
+            self._variants[key] = variant
+            return variant
+
+    def release_source(self):
+        """원본 프레임 참조 해제 (pre-roll 등에 오래 보관될 때 메모리 절약)"""
+        self.source = None
+
+
+def encode_frame(frame, timestamp=None, frame_id=0, quality=JPEG_QUALITY, monotonic=None):
+    """
+    BGR 프레임을 JPEG로 인코딩
+    Returns:
+        EncodedFrame, 실패 시 None
+    """
+    start = time.perf_counter()
+    ret, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ret:
+        encode_stats.errors += 1
+        return None
+    height, width = frame.shape[:2]
+    result = EncodedFrame(
+        encoded.tobytes(),
+        timestamp if timestamp is not None else time.time(),
+        frame_id,
+        width,
+        height,
+        quality,
+        monotonic,
+    )
+    elapsed = time.perf_counter() - start
+    encode_stats.record(elapsed)
+    ENCODE_SECONDS.observe(elapsed)
+    return result
@@ -0,0 +1,105 @@
+"""
+Gemini 분석 결과 캐시 (perceptual hash)
+
+화재 모니터링 중 주기적으로 분석하는 프레임은 대부분 거의 같은 장면입니다.
+프레임의 dHash(difference hash)를 키로 직전 분석 결과를 보관하고,
+해시 간 해밍 거리가 임계값 이하인 프레임은 API 호출 없이 이전 결과를 재사용합니다.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+HASH_SIZE = 8  # 8x8 = 64비트 해시
+
+
+def dhash(frame, hash_size=HASH_SIZE):
+    """
+    BGR 프레임의 difference hash (가로로 인접한 픽셀 밝기 비교)
+    Returns:
+        hash_size * hash_size 비트 정수
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class GeminiResultCache:
+    """
+    Args:
+        max_distance: 같은 장면으로 볼 최대 해밍 거리 (64비트 중)
+        ttl: 결과 유효 시간 (초), 지나면 장면이 같아도 다시 분석
+        max_entries: 보관할 최대 결과 수 (초과 시 가장 오래 사용하지 않은 항목 제거)
+    """
+
+    def __init__(self, max_distance=6, ttl=120.0, max_entries=32):
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (camera_id, hash) -> (result, 저장 시각)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.expired = 0
+
+    def lookup(self, camera_id, frame_hash, now=None):
+        """
+        같은 카메라에서 해밍 거리 이내의 유효한 결과 검색
+        Returns:
+            캐시된 결과 문자열, 없으면 None
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            best_key = None
+            best_distance = self.max_distance + 1
+            for key, (_, stored_at) in list(self._entries.items()):
+                if now - stored_at > self.ttl:
+                    del self._entries[key]
+                    self.expired += 1
+                    continue
+                if key[0] != camera_id:
+                    continue
+                distance = hamming(key[1], frame_hash)
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return self._entries[best_key][0]
+
+    def store(self, camera_id, frame_hash, result, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            key = (camera_id, frame_hash)
+            self._entries[key] = (result, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_refresh(self):
+        """캐시를 건너뛰고 강제로 다시 분석한 횟수 (화재 확정 등)"""
+        with self._lock:
+            self.refreshes += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "refreshes": self.refreshes,
+                "expired": self.expired,
+            }
@@ -0,0 +1,290 @@
+"""
+Gemini 분석 요청 실행기 (스레드 수 / 대기 요청 / 호출 시간 제한)
+
+화재 확정과 모니터링 주기마다 스레드를 새로 만들지 않고, 분석 워커 하나가 요청을 처리합니다.
+- 카메라별 대기 요청은 1개만 유지: 새 요청이 오면 아직 시작하지 않은 이전 요청을 대체 (coalescing)
+- 동시 API 호출 수 제한 (max_in_flight): 제한 시간을 넘긴 호출이 끝나지 않아도 스레드가 쌓이지 않음
+- 호출별 제한 시간 (deadline): 초과 시 결과를 버리고 실패로 처리
+- 서킷 브레이커: 연속 실패 시 일정 시간 요청을 거절하여 장애 중인 API를 반복 호출하지 않음
+- 이미지는 축소한 JPEG로 전송 (전송용 JPEG가 이미 작으면 그대로 재사용)
+- (선택) 결과 캐시: 거의 같은 장면이면 API 호출 없이 이전 결과 재사용 (gemini_cache.py)
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+
+from encoding import encode_frame
+from gemini_cache import dhash
+from metrics import REGISTRY
+from pipeline import StageStats
+
+GEMINI_MAX_WIDTH = 640  # Gemini로 보낼 이미지 최대 가로 크기
+GEMINI_JPEG_QUALITY = 85
+
+# 지표 (metrics.py)
+GEMINI_SECONDS = REGISTRY.histogram(
+    "firedetector_gemini_seconds", "Gemini 분석 호출 시간 (결과별)", ("outcome",))
+GEMINI_REQUESTS = REGISTRY.counter(
+    "firedetector_gemini_requests_total",
+    "Gemini 분석 요청 결과 (ok / error / timeout / cached / rejected / coalesced)", ("outcome",))
+
+
+class GeminiJob:
+    """
+    분석 요청 하나
+    encoded: 전송용 EncodedFrame, frame: 주석이 그려진 원본 프레임 (축소가 필요할 때만 사용)
+    """
+
+    __slots__ = ("camera_id", "encoded", "frame", "on_result", "submitted", "frame_hash", "cached")
+
+    def __init__(self, camera_id, encoded, frame, on_result, frame_hash=None):
+        self.camera_id = camera_id
+        self.encoded = encoded
+        self.frame = frame
+        self.on_result = on_result  # on_result(job, result_text, ok)
+        self.submitted = time.monotonic()
+        self.frame_hash = frame_hash  # 결과 캐시 키 (캐시 미사용 시 None)
+        self.cached = False  # 캐시된 결과로 응답했는지
+
+
+class _Call:
+    """워커가 기다리는 API 호출 하나의 결과 보관"""
+
+    __slots__ = ("done", "result", "error", "abandoned")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.abandoned = False  # 제한 시간 초과로 워커가 더 이상 기다리지 않음
+
+
+class GeminiExecutor:
+    """
+    Args:
+        analyze: analyze(jpeg_bytes, timeout) -> 결과 문자열, 실패 시 예외 발생
+        max_in_flight: 동시에 진행 중일 수 있는 API 호출 수 (제한 시간을 넘긴 호출 포함)
+        deadline: 호출별 제한 시간 (초)
+        failure_threshold: 서킷을 여는 연속 실패 횟수
+        cooldown: 서킷이 열린 뒤 다시 호출을 시도하기까지의 시간 (초)
+        max_width: 전송 이미지 최대 가로 크기
+        cache: GeminiResultCache (None이면 캐시 미사용)
+    """
+
+    def __init__(self, analyze, max_in_flight=2, deadline=15.0,
+                 failure_threshold=3, cooldown=60.0, max_width=GEMINI_MAX_WIDTH, cache=None):
+        self.analyze = analyze
+        self.cache = cache
+        self.max_in_flight = max_in_flight
+        self.deadline = deadline
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_width = max_width
+
+        self._pending = OrderedDict()  # camera_id -> GeminiJob (카메라별 최신 요청 1개)
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._closed = False
+        self._thread = None
+
+        # 서킷 브레이커 상태
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+
+        self.latency = StageStats("gemini")
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.late_results = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="gemini-worker", daemon=True)
+        self._thread.start()
+        return self
+
+    # --- 요청 ---
+    def circuit_open(self):
+        return time.monotonic() < self._open_until
+
+    def submit(self, camera_id, encoded, frame, on_result, force_refresh=False):
+        """
+        분석 요청 등록. 같은 카메라의 대기 요청이 있으면 대체
+        캐시에 거의 같은 장면의 결과가 있으면 API 호출 없이 바로 on_result 호출
+        Args:
+            force_refresh: 캐시를 건너뛰고 반드시 새로 분석 (화재 확정 등 상황이 바뀐 경우)
+        Returns:
+            등록 여부 (서킷이 열려 있거나 종료된 경우 False)
+        """
+        frame_hash = None
+        if self.cache is not None and frame is not None:
+            frame_hash = dhash(frame)
+            if force_refresh:
+                self.cache.record_refresh()
+            else:
+                cached = self.cache.lookup(camera_id, frame_hash)
+                if cached is not None:
+                    job = GeminiJob(camera_id, encoded, frame, on_result, frame_hash)
+                    job.cached = True
+                    GEMINI_REQUESTS.inc(outcome="cached")
+                    on_result(job, cached, True)
+                    return True
+
+        with self._cond:
+            if self._closed:
+                return False
+            if self.circuit_open():
+                self.rejected += 1
+                GEMINI_REQUESTS.inc(outcome="rejected")
+                return False
+            if camera_id in self._pending:
+                self.coalesced += 1
+                GEMINI_REQUESTS.inc(outcome="coalesced")
+            self._pending[camera_id] = GeminiJob(camera_id, encoded, frame, on_result, frame_hash)
+            self.submitted += 1
+            self._cond.notify_all()
+            return True
+
+    # --- 워커 ---
+    def _next_job(self):
+        """대기 요청이 있고 호출 수에 여유가 생길 때까지 대기 후 가장 오래된 요청을 꺼냄"""
+        with self._cond:
+            while not self._closed and (not self._pending or self._in_flight >= self.max_in_flight):
+                self._cond.wait()
+            if self._closed:
+                return None
+            _, job = self._pending.popitem(last=False)
+            self._in_flight += 1
+            return job
+
+    def _prepare_jpeg(self, job):
+        """전송용 JPEG가 충분히 작으면 그대로, 크면 축소하여 한 번 인코딩"""
+        encoded = job.encoded
+        if encoded.width <= self.max_width or job.frame is None:
+            return encoded.data
+        scale = self.max_width / encoded.width
+        small = cv2.resize(job.frame, (self.max_width, int(encoded.height * scale)),
+                           interpolation=cv2.INTER_AREA)
+        resized = encode_frame(small, encoded.timestamp, encoded.frame_id, GEMINI_JPEG_QUALITY)
+        return resized.data if resized is not None else encoded.data
+
+    def _call(self, jpeg_bytes, call):
+        try:
+            call.result = self.analyze(jpeg_bytes, self.deadline)
+        except Exception as e:
+            call.error = e
+        finally:
+            call.done.set()
+            with self._cond:
+                self._in_flight -= 1
+                if call.abandoned:
+                    # 제한 시간을 넘겨 도착한 결과는 버리고 개수만 기록
+                    self.late_results += 1
+                self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            try:
+                jpeg_bytes = self._prepare_jpeg(job)
+            except Exception as e:
+                with self._cond:
+                    self._in_flight -= 1
+                self._finish(job, None, e, time.perf_counter())
+                continue
+
+            # 호출은 별도 스레드에서 실행하고 워커는 제한 시간까지만 기다림
+            call = _Call()
+            start = time.perf_counter()
+            threading.Thread(target=self._call, args=(jpeg_bytes, call),
+                             name="gemini-call", daemon=True).start()
+            if not call.done.wait(self.deadline):
+                with self._cond:
+                    call.abandoned = not call.done.is_set()
+                self.timeouts += 1
+                self._finish(job, None, TimeoutError(f"{self.deadline:g}초 내 응답 없음"), start)
+                continue
+            self._finish(job, call.result, call.error, start)
+
+    def _finish(self, job, result, error, start):
+        elapsed = time.perf_counter() - start
+        self.latency.record(elapsed)
+        outcome = "ok" if error is None else "timeout" if isinstance(error, TimeoutError) else "error"
+        GEMINI_SECONDS.observe(elapsed, outcome=outcome)
+        GEMINI_REQUESTS.inc(outcome=outcome)
+        with self._cond:
+            if error is None:
+                self.succeeded += 1
+                self._consecutive_failures = 0
+            else:
+                self.failed += 1
+                self.latency.errors += 1
+                self._consecutive_failures += 1
+                if self._consecutive_failures >= self.failure_threshold:
+                    self._open_until = time.monotonic() + self.cooldown
+                    self._consecutive_failures = 0
+                    # 서킷이 열려 있는 동안 대기 요청도 보내지 않음
+                    self.rejected += len(self._pending)
+                    if self._pending:
+                        GEMINI_REQUESTS.inc(len(self._pending), outcome="rejected")
+                    self._pending.clear()
+                    print(f"✗ Gemini 연속 {self.failure_threshold}회 실패, {self.cooldown:g}초간 분석 중단")
+
+        try:
+            if error is None:
+                if self.cache is not None and job.frame_hash is not None:
+                    self.cache.store(job.camera_id, job.frame_hash, result)
+                job.on_result(job, result, True)
+            else:
+                job.on_result(job, f"Gemini Analysis Error: {error}", False)
+        except Exception as e:
+            print(f"Gemini 결과 처리 오류: {e}")
+
+    # --- 통계 / 종료 ---
+    def stats(self):
+        with self._cond:
+            pending = len(self._pending)
+            in_flight = self._in_flight
+        lat = self.latency.snapshot()
+        return {
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "late_results": self.late_results,
+            "pending": pending,
+            "in_flight": in_flight,
+            "circuit_open": self.circuit_open(),
+            "avg_ms": lat["avg_ms"],
+            "max_ms": lat["max_ms"],
+            "threads": threading.active_count(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        state = "OPEN" if s["circuit_open"] else "closed"
+        line = (f"  gemini       avg {s['avg_ms']:6.0f}ms | max {s['max_ms']:6.0f}ms"
+                f" | ok {s['succeeded']} | fail {s['failed']} (timeout {s['timeouts']})"
+                f" | coalesced {s['coalesced']} | in-flight {s['in_flight']} | circuit {state}"
+                f" | threads {s['threads']}")
+        if s["cache"] is not None:
+            c = s["cache"]
+            line += (f"\n  gemini cache hit {c['hits']} | miss {c['misses']} ({c['hit_ratio'] * 100:.0f}%)"
+                     f" | refresh {c['refreshes']} | entries {c['entries']}")
+        return line
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._cond.notify_all()
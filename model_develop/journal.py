@@ -0,0 +1,350 @@
+"""
+이벤트 저널 (append-only JSONL, 배치 기록 + 주기적 fsync)
+
+화재 / 동물 감지, 화재 확정, Gemini 분석 결과를 TCP 클라이언트에 보내는 것과 별개로 디스크에 남깁니다.
+감지 루프는 append()로 메모리 큐에 넣기만 하고(가득 차면 버리고 개수만 기록, 절대 대기하지 않음)
+백그라운드 기록 스레드가 모아서 한 번에 쓰고 fsync 합니다.
+
+- 세그먼트: events-YYYYMMDD-NNNN.jsonl (한 줄에 이벤트 하나, "ts"(unix timestamp)와 "kind" 포함)
+- 크기가 상한을 넘거나 날짜가 바뀌면 새 세그먼트로 넘어가고, 닫힌 세그먼트는 gzip으로 압축
+- index.jsonl: 닫힌 세그먼트마다 {"file", "first_ts", "last_ts", "count", "bytes"} 한 줄
+  시간 범위를 읽을 때 범위가 겹치는 세그먼트만 엽니다 (read_events)
+- 비정상 종료로 닫히지 못한 세그먼트는 다음 시작 시 닫아서(압축 + 색인) 이어서 기록
+
+시간 범위 조회:
+    python journal.py event_journal --since "2025-12-18 01:00" --until "2025-12-18 02:00" --kind fire
+"""
+import argparse
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+INDEX_FILE = "index.jsonl"
+SEGMENT_PREFIX = "events-"
+SEGMENT_SUFFIX = ".jsonl"
+
+
+def _fsync_append(path, line):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _open_segment(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _iter_segment(path):
+    """세그먼트의 이벤트 (기록 중 종료되어 잘린 줄은 무시)"""
+    try:
+        with _open_segment(path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+    except (OSError, EOFError):
+        return
+
+
+def _segment_summary(path):
+    """세그먼트 내용으로 색인 항목 계산 (비정상 종료 후 복구용)"""
+    first_ts = last_ts = None
+    count = 0
+    for event in _iter_segment(path):
+        ts = event.get("ts")
+        if ts is None:
+            continue
+        first_ts = ts if first_ts is None else min(first_ts, ts)
+        last_ts = ts if last_ts is None else max(last_ts, ts)
+        count += 1
+    return first_ts, last_ts, count
+
+
+def read_index(directory):
+    path = os.path.join(directory, INDEX_FILE)
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    return entries
+
+
+def read_events(directory, start=None, end=None, kinds=None):
+    """
+    시간 범위의 이벤트 (저널 폴더만 있으면 기록 중인 프로세스 없이도 사용 가능)
+    색인으로 범위가 겹치는 닫힌 세그먼트만 열고, 아직 색인되지 않은(기록 중) 세그먼트는 모두 확인
+    Args:
+        start, end: unix timestamp 범위 (None이면 제한 없음, 양 끝 포함)
+        kinds: 이벤트 종류 목록 (예: ["fire", "gemini"], None이면 전체)
+    Yields:
+        이벤트 dict (세그먼트 순서, 세그먼트 안에서는 기록 순서)
+    """
+    indexed = set()
+    paths = []
+    for entry in read_index(directory):
+        indexed.add(entry["file"])
+        if entry.get("count", 0) == 0:
+            continue
+        if start is not None and entry["last_ts"] < start:
+            continue
+        if end is not None and entry["first_ts"] > end:
+            continue
+        paths.append(entry["file"])
+    paths += sorted(
+        name for name in os.listdir(directory)
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX) and name not in indexed
+    )
+
+    for name in paths:
+        for event in _iter_segment(os.path.join(directory, name)):
+            ts = event.get("ts")
+            if ts is None:
+                continue
+            if (start is not None and ts < start) or (end is not None and ts > end):
+                continue
+            if kinds is not None and event.get("kind") not in kinds:
+                continue
+            yield event
+
+
+class _Segment:
+    __slots__ = ("name", "path", "day", "file", "bytes", "count", "first_ts", "last_ts")
+
+    def __init__(self, name, path, day, file):
+        self.name = name
+        self.path = path
+        self.day = day
+        self.file = file
+        self.bytes = 0
+        self.count = 0
+        self.first_ts = None
+        self.last_ts = None
+
+
+class EventJournal:
+    """
+    Args:
+        directory: 저널 폴더
+        max_segment_bytes: 세그먼트 최대 크기 (넘으면 새 세그먼트)
+        flush_interval: 모아서 기록 + fsync 하는 간격 (초)
+        max_batch: 이만큼 쌓이면 간격을 기다리지 않고 기록
+        max_pending: 기록 대기 이벤트 상한 (넘으면 새 이벤트를 버림 - 디스크가 막혀도 감지 루프는 대기하지 않음)
+        compress: 닫힌 세그먼트 gzip 압축
+    """
+
+    def __init__(self, directory, max_segment_bytes=16 * 1024 * 1024, flush_interval=1.0,
+                 max_batch=256, max_pending=10000, compress=True):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.compress = compress
+        os.makedirs(directory, exist_ok=True)
+
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+        self._segment = None  # 기록 중인 세그먼트 (기록 스레드만 접근)
+
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.sealed = 0
+        self.fsyncs = 0
+
+        self._recover()
+
+    # --- 요청 (어느 스레드에서나, 대기 없음) ---
+    def append(self, kind, record, ts=None):
+        """
+        이벤트 기록 요청 (메모리 큐에 넣고 바로 반환, 직렬화 / 기록은 기록 스레드에서)
+        record는 넘긴 뒤 수정하지 않아야 함
+        ts: 이벤트 시각 (없으면 record의 unix_timestamp, 그것도 없으면 현재 시각)
+        Returns:
+            큐에 넣었는지 여부 (가득 찼거나 종료된 경우 False)
+        """
+        if ts is None:
+            ts = record.get("unix_timestamp") or time.time()
+        with self._cond:
+            if self._closed or len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending.append((ts, kind, record))
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify()
+            return True
+
+    # --- 기록 스레드 ---
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="event-journal", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._pending) < self.max_batch:
+                    self._cond.wait(self.flush_interval)
+                batch, self._pending = self._pending, deque()
+                closed = self._closed
+            if batch:
+                self._write(batch)
+            if closed:
+                self._seal()
+                return
+
+    def _write(self, batch):
+        try:
+            for ts, kind, record in batch:
+                line = json.dumps({"ts": ts, "kind": kind, **record}, ensure_ascii=False) + "\n"
+                data = line.encode("utf-8")
+                # 날짜는 기록 시각 기준 (늦게 도착한 이벤트 때문에 세그먼트가 오가지 않도록)
+                day = time.strftime("%Y%m%d")
+                segment = self._segment
+                if segment is None or segment.day != day or segment.bytes >= self.max_segment_bytes:
+                    self._seal()
+                    segment = self._open(day)
+                segment.file.write(data)
+                segment.bytes += len(data)
+                segment.count += 1
+                segment.first_ts = ts if segment.first_ts is None else min(segment.first_ts, ts)
+                segment.last_ts = ts if segment.last_ts is None else max(segment.last_ts, ts)
+                self.written += 1
+            if self._segment is not None:
+                self._segment.file.flush()
+                os.fsync(self._segment.file.fileno())
+                self.fsyncs += 1
+        except (OSError, TypeError, ValueError) as e:
+            self.errors += 1
+            print(f"이벤트 저널 기록 오류: {e}")
+
+    def _open(self, day):
+        prefix = f"{SEGMENT_PREFIX}{day}-"
+        seq = 0
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix):
+                try:
+                    seq = max(seq, int(name[len(prefix):].split(".", 1)[0]) + 1)
+                except ValueError:
+                    pass
+        name = f"{prefix}{seq:04d}{SEGMENT_SUFFIX}"
+        path = os.path.join(self.directory, name)
+        self._segment = _Segment(name, path, day, open(path, "ab"))
+        return self._segment
+
+    def _seal(self):
+        """기록 중인 세그먼트를 닫고 압축 + 색인"""
+        segment, self._segment = self._segment, None
+        if segment is None:
+            return
+        try:
+            segment.file.close()
+            self._finish(segment.path, segment.first_ts, segment.last_ts, segment.count)
+        except OSError as e:
+            self.errors += 1
+            print(f"이벤트 저널 세그먼트 정리 오류: {e}")
+
+    def _finish(self, path, first_ts, last_ts, count):
+        name = os.path.basename(path)
+        if count == 0:
+            os.remove(path)
+            return
+        if self.compress:
+            with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            with open(path + ".gz", "rb") as f:
+                os.fsync(f.fileno())
+            os.remove(path)
+            name += ".gz"
+        entry = {"file": name, "first_ts": first_ts, "last_ts": last_ts, "count": count,
+                 "bytes": os.path.getsize(os.path.join(self.directory, name))}
+        _fsync_append(os.path.join(self.directory, INDEX_FILE), json.dumps(entry) + "\n")
+        self.sealed += 1
+
+    def _recover(self):
+        """비정상 종료로 닫히지 못한(색인되지 않은) 세그먼트 정리"""
+        indexed = {entry["file"] for entry in read_index(self.directory)}
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)):
+                continue
+            path = os.path.join(self.directory, name)
+            if name + ".gz" in indexed:
+                # 압축은 끝났는데 원본 삭제 전에 종료됨
+                os.remove(path)
+                continue
+            try:
+                self._finish(path, *_segment_summary(path))
+                print(f"이벤트 저널: 닫히지 않은 세그먼트 복구 ({name})")
+            except OSError as e:
+                self.errors += 1
+                print(f"이벤트 저널 복구 오류 ({name}): {e}")
+
+    # --- 조회 / 통계 / 종료 ---
+    def read(self, start=None, end=None, kinds=None):
+        """시간 범위의 이벤트 (read_events 참고, 아직 기록 대기 중인 이벤트는 포함되지 않음)"""
+        return read_events(self.directory, start, end, kinds)
+
+    def stats(self):
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "sealed": self.sealed,
+            "fsyncs": self.fsyncs,
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"  journal      written {s['written']} | pending {s['pending']} | drop {s['dropped']}"
+                f" | segments {s['sealed']} | errors {s['errors']}")
+
+    def close(self, timeout=3.0):
+        """남은 이벤트를 기록하고 세그먼트를 닫음"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def _parse_time(value):
+    """unix timestamp 또는 ISO 형식 날짜 / 시각 (로컬 시간)"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이벤트 저널 시간 범위 조회 (JSONL 출력)")
+    parser.add_argument("directory", help="저널 폴더 (EVENT_JOURNAL_DIR)")
+    parser.add_argument("--since", type=_parse_time, help='시작 시각 (예: "2025-12-18 01:00" 또는 unix timestamp)')
+    parser.add_argument("--until", type=_parse_time, help="끝 시각")
+    parser.add_argument("--kind", action="append", help="이벤트 종류 (fire, fire_confirmed, animal, gemini, 여러 번 지정 가능)")
+    args = parser.parse_args()
+
+    for event in read_events(args.directory, args.since, args.until, args.kind):
+        print(json.dumps(event, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,112 +1,236 @@
 import asyncio
-import os
 import json
-import math
-import socket
-import struct
+import os
+import signal
 import threading
 import time
 from datetime import datetime
 
 import cv2
-import requests
 import websockets
-from PIL import Image
-from ultralytics import YOLO
 
-from gemini_analyzer import analyze_frame_with_gemini
+from adaptive import AdaptiveQuality
+from broadcast import FRAMES_DROPPED, SEND_SECONDS, ControlAccess, FrameBroadcastServer
+from cascade import FireCascade
+from camera import CameraGroup
+from detector import (ANIMAL_CLASSES, ANIMAL_DETECTION_SKIP, GEMINI_CHECK_INTERVAL,
+                      TARGET_CLASS, CameraDetector, DetectorOutputs, default_runtime_config,
+                      infer_batch)
+from encoding import EncodedFrame, encode_stats
+from gemini_analyzer import jpeg_part, request_analysis
+from gemini_cache import GeminiResultCache
+from gemini_executor import GeminiExecutor
+from journal import EventJournal
+from metrics import REGISTRY, MetricsServer
+from motion_gate import MotionGate
+from multiproc import MultiProcessInference
+from notifier import NotificationDispatcher
+from pacing import FramePacer
+from pipeline import LatestQueue, Pipeline
+from preroll import PreEventBuffer
+from protocol import (MSG_TYPE_ANIMAL_EVENT, MSG_TYPE_CONFIG, MSG_TYPE_CONTROL, MSG_TYPE_FIRE_EVENT,
+                      MSG_TYPE_GEMINI_RESULT, pack_json_message)
+from spool import FrameSpool
+from startup import ModelLoader, StartupTimeline
+
+# 시작 단계별 소요 시간 (재시작 시간 = 감지 중단 시간이므로 단계마다 기록)
+timeline = StartupTimeline()
 
 # --- 설정 ---
-fire_model = YOLO("fireModel/best.pt")  # 화재 감지 모델 (매 프레임)
-animal_model = YOLO("fireModel/yolov8s.pt")  # 동물 감지 모델
+# 추론 백엔드: pytorch(기본) / onnx / openvino (GPU 없는 장비는 onnx, openvino 권장)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "pytorch")
+INFERENCE_INT8 = os.getenv("INFERENCE_INT8", "0") == "1"  # onnx/openvino INT8 양자화
+INFERENCE_CALIBRATION = os.getenv("INFERENCE_CALIBRATION")  # INT8 보정 이미지 폴더
+
+FIRE_WEIGHTS = "fireModel/best.pt"  # 화재 감지 모델 (매 프레임)
+ANIMAL_WEIGHTS = "fireModel/yolov8s.pt"  # 동물 감지 모델
+
+# 멀티 프로세스 모드: 화재 / 동물 모델을 각자 워커 프로세스(코어)에서 실행, 프레임은 공유 메모리로 전달
+PROCESS_MODE = os.getenv("PROCESS_MODE", "0") == "1"
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "0"))  # 워커별 추론 스레드 수 (0이면 코어 수 / 워커 수)
+
+# 카메라 소스 목록 (쉼표 구분, 숫자는 장치 번호 / 그 외는 파일·스트림 주소)
+# 예: CAMERA_SOURCES="0,1,rtsp://192.168.0.10/stream"
+CAMERA_SOURCES = [
+    int(src) if src.strip().isdigit() else src.strip()
+    for src in os.getenv("CAMERA_SOURCES", "0").split(",")
+]
+
+# 모델 로딩 + 워밍업은 두 모델을 동시에 백그라운드에서 진행 (카메라 열기, 서버 시작과도 동시에)
+# 감지 루프는 화재 모델만 준비되면 시작하고 동물 모델은 준비되는 대로 연결 (아래 attach_animal_model)
+detectors = []
+fire_model = animal_model = None
+fire_loader = animal_loader = None
+
+
+def handle_worker_ready(role, names, load_sec, warm_sec):
+    """모델 워커 준비 완료 (멀티 프로세스 모드, 늦게 준비된 동물 워커는 감지 중에 연결)"""
+    timeline.mark(f"{role} 모델 준비 (로딩 {load_sec:.2f}s + 워밍업 {warm_sec:.2f}s)")
+    runtime_config.set_model_names(f"{role}_classes", names)
+    if role == "animal" and detectors:
+        for detector in detectors:
+            detector.set_animal_names(names)
+        print(f"✓ 동물 감지 시작 (시작 후 {timeline.elapsed():.1f}초)")
+
+
+if PROCESS_MODE:
+    # 워커는 fork로 만들므로 카메라 / 네트워크 스레드보다 먼저 시작 (준비는 감지기 생성 직전에 대기)
+    inference_workers = MultiProcessInference({
+        "fire": (FIRE_WEIGHTS, INFERENCE_BACKEND, INFERENCE_INT8, INFERENCE_CALIBRATION, TARGET_CLASS),
+        "animal": (ANIMAL_WEIGHTS, INFERENCE_BACKEND, INFERENCE_INT8, INFERENCE_CALIBRATION, ANIMAL_CLASSES),
+    }, warm_up_batch=len(CAMERA_SOURCES), on_ready=handle_worker_ready, threads=WORKER_THREADS or None)
+else:
+    inference_workers = None
+    fire_loader = ModelLoader("fire", FIRE_WEIGHTS, INFERENCE_BACKEND, INFERENCE_INT8, INFERENCE_CALIBRATION,
+                              warm_up_batch=len(CAMERA_SOURCES), timeline=timeline).start()
+    animal_loader = ModelLoader("animal", ANIMAL_WEIGHTS, INFERENCE_BACKEND, INFERENCE_INT8, INFERENCE_CALIBRATION,
+                                warm_up_batch=len(CAMERA_SOURCES), timeline=timeline).start()
 WEBSOCKET_URI = f"ws://{os.getenv("FASTAPI_SERVER")}/ws/v1/"  # 실제 서버 주소로 변경
 NOTIFY_API_URL = f"http://{os.getenv("FASTAPI_SERVER")}/api/v1/notify"
-cap = cv2.VideoCapture(0)
 
-ALERT_COOLDOWN = 30
-last_alert_time = 0
 
-# Gemini 분석 설정
-GEMINI_CHECK_INTERVAL = 30  # 30초마다 확인
-last_gemini_check_time = 0
-FIRE_CHECK_DELAY = 10  # 화재 감지 후 10초 뒤에 재확인
-pending_fire_check_time = None  # 재확인 대기 시작 시간
+def handle_camera_open(source, elapsed, ok):
+    timeline.mark(f"카메라 {source} {'열림' if ok else '열기 실패'}", elapsed)
+
+
+cameras = CameraGroup(CAMERA_SOURCES, on_open=handle_camera_open).start()  # 카메라별 스레드에서 열고 최신 프레임만 유지
+
+# 화재 확정/이벤트 관련 설정(TARGET_CLASS, FIRE_CHECK_DELAY 등)은 detector.py 참고
+
+# Gemini 분석 실행 설정: 분석 워커 1개, 동시 API 호출 수 / 호출 시간 제한 / 연속 실패 시 일시 중단
+GEMINI_MAX_IN_FLIGHT = 2  # 제한 시간을 넘겨 아직 끝나지 않은 호출 포함
+GEMINI_DEADLINE = 15.0  # 호출별 제한 시간 (초)
+GEMINI_FAILURE_THRESHOLD = 3  # 연속 실패 횟수
+GEMINI_COOLDOWN = 60.0  # 서킷 차단 시간 (초)
+
+# Gemini 결과 캐시: 모니터링 중 거의 같은 장면이면 이전 분석 결과 재사용 (화재 확정 시에는 항상 새로 분석)
+GEMINI_CACHE_ENABLED = os.getenv("GEMINI_CACHE", "1") == "1"
+GEMINI_CACHE_MAX_DISTANCE = 6  # 64비트 dHash 해밍 거리 임계값
+GEMINI_CACHE_TTL = 120.0  # 결과 유효 시간 (초)
+GEMINI_CACHE_MAX_ENTRIES = 32
+
+# 화재 알림 전송 설정 (백그라운드 스레드, 연결 재사용)
+NOTIFY_TIMEOUT = (3.05, 5.0)  # (연결, 응답) 제한 시간 (초)
+NOTIFY_MAX_RETRIES = 3  # 실패 시 재시도 횟수 (1초, 2초, 4초 간격)
+NOTIFY_BACKOFF = 1.0
+NOTIFY_DEDUPE_WINDOW = 30.0  # 이 시간 안에 반복된 알림은 한 번만 전송 (여러 카메라 동시 확정 등)
+
+# 이벤트 저널: 화재 / 동물 감지, 화재 확정, Gemini 결과를 JSONL 세그먼트로 기록 (빈 값이면 사용 안 함)
+# 백그라운드 스레드가 모아서 기록 + fsync, 크기 / 날짜별로 세그먼트를 나누고 닫힌 세그먼트는 gzip 압축
+EVENT_JOURNAL_DIR = os.getenv("EVENT_JOURNAL_DIR", "event_journal")
+EVENT_JOURNAL_SEGMENT_BYTES = int(os.getenv("EVENT_JOURNAL_SEGMENT_MB", "16")) * 1024 * 1024
+EVENT_JOURNAL_FLUSH_INTERVAL = 1.0  # 기록 + fsync 간격 (초)
+
+# 움직임 게이트: 장면 변화가 없으면 YOLO 추론 생략 (직전 결과 재사용)
+MOTION_GATE_ENABLED = os.getenv("MOTION_GATE", "0") == "1"
+MOTION_PIXEL_THRESHOLD = 25  # 픽셀 밝기 차이 임계값
+MOTION_RATIO_THRESHOLD = 0.005  # 변화 픽셀 비율이 이 이상이면 추론
+MOTION_MAX_SKIP_INTERVAL = 1.0  # 변화가 없어도 최소 1초마다 추론 (느린 연기 대비)
+
+# 화재 확정 시 백업 서버로 먼저 보낼 확정 전(pre-roll) 영상 길이 (0이면 사용 안 함)
+# FIRE_CHECK_DELAY(10초) 대기 구간 + 발화 직전 장면을 포함하도록 여유 있게 설정
+PREROLL_SECONDS = float(os.getenv("PREROLL_SECONDS", "15"))
+PREROLL_MAX_BYTES = 32 * 1024 * 1024  # pre-roll 버퍼 메모리 상한
+
+# 백업 서버 전송: WebSocket 대기 프레임 상한 (넘으면 전송이 밀린 것으로 보고 스풀에 기록)
+WEBSOCKET_MAX_BACKLOG = 30
+# 백업 스풀: 연결이 끊기거나 밀리는 동안 프레임을 디스크에 기록하고 재연결 후 다시 전송 (빈 값이면 사용 안 함)
+BACKUP_SPOOL_DIR = os.getenv("BACKUP_SPOOL_DIR", "backup_spool")
+BACKUP_SPOOL_MAX_BYTES = int(os.getenv("BACKUP_SPOOL_MAX_MB", "512")) * 1024 * 1024  # 디스크 사용 상한
+BACKUP_SPOOL_SEGMENT_BYTES = 2 * 1024 * 1024  # 세그먼트 크기 (재전송 단위)
+BACKUP_SPOOL_REPLAY_RATE = 1024 * 1024  # 재전송 속도 (bytes/s), 실시간 프레임이 대기 중이면 재전송하지 않음
+
+# 적응형 JPEG 품질 / 해상도: 출력별 전송 대기량과 지연을 보고 품질 -> 해상도 순으로 낮춤 (여유가 생기면 복구)
+ADAPTIVE_QUALITY = os.getenv("ADAPTIVE_QUALITY", "1") == "1"
+TCP_MIN_JPEG_QUALITY = 40  # TCP 뷰어 최저 품질
+TCP_MIN_SCALE = 0.5  # TCP 뷰어 최저 해상도 비율
+BACKUP_MIN_JPEG_QUALITY = int(os.getenv("BACKUP_MIN_JPEG_QUALITY", "65"))  # 백업 영상(증거) 최저 품질
+BACKUP_MIN_SCALE = 1.0  # 백업 영상은 해상도를 바꾸지 않고 품질만 조절 (증거 영상, 영상 파일 하나는 한 해상도)
+BACKUP_HIGH_BACKLOG = 5  # 백업 WebSocket 대기 프레임이 이 이상이면 혼잡
+
+# 화재 감지 캐스케이드: 매 프레임 저해상도로 선별하고, 후보가 있을 때만 고해상도 / 원본 타일로 확인
+FIRE_CASCADE = os.getenv("FIRE_CASCADE", "0") == "1"
+FIRE_CASCADE_MODE = os.getenv("FIRE_CASCADE_MODE", "full")  # full: 전체 재추론, tile: 후보 주변 원본 타일
+CASCADE_SCREEN_IMGSZ = 320  # 1단계 입력 크기
+CASCADE_CONFIRM_IMGSZ = 640  # 2단계 입력 크기
+CASCADE_SCREEN_CONF = 0.15  # 1단계 후보 신뢰도 기준 (작은 불꽃도 놓치지 않도록 낮게)
+CASCADE_CONFIRM_CONF = 0.25  # 2단계 확정 신뢰도 기준
+CASCADE_TILE_SIZE = 640  # tile 모드 타일 크기 (원본 픽셀)
+
+# 파이프라인 모드: 캡처/추론/후처리/전송을 별도 스레드로 분리 실행
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "0") == "1"
+PIPELINE_QUEUE_SIZE = 1  # 단계 사이 큐 크기 (가득 차면 오래된 프레임을 버림)
+PIPELINE_STATS_INTERVAL = 10  # 단계별 처리 시간 출력 간격 (초)
+
+# 헤드리스 모드: 화면(X) 없는 장비용. GUI 호출 없이 실행하고 SIGINT / SIGTERM으로 종료
+HEADLESS = os.getenv("HEADLESS", "0") == "1"
+# 목표 FPS: monotonic 시계 기준으로 루프 간격을 맞춤 (0이면 제한 없음 - 카메라 속도)
+TARGET_FPS = float(os.getenv("TARGET_FPS", "0"))
+CAPTURE_POLL_INTERVAL = 0.5  # 새 프레임 대기 중 종료 요청을 확인하는 간격 (초)
+
+# 지표 HTTP 서버: GET /metrics (Prometheus 텍스트), GET /metrics.json (빈 값이면 사용 안 함)
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 0)
+
+print(f"추론 백엔드: {INFERENCE_BACKEND}{' (INT8)' if INFERENCE_INT8 else ''}")
+print(f"화재 감지 모델 클래스: {TARGET_CLASS}")
+print(f"동물 감지 모델 클래스: {ANIMAL_CLASSES}")
+print(f"성능 최적화: 매 {ANIMAL_DETECTION_SKIP}프레임마다 동물 감지")
+print(f"Gemini 분석: 매 {GEMINI_CHECK_INTERVAL}초마다 실행")
+print(f"카메라: {len(CAMERA_SOURCES)}대 {CAMERA_SOURCES}")
+print(f"화면 표시: {'사용 안 함 (헤드리스)' if HEADLESS else '사용'} | 목표 FPS: {TARGET_FPS or '제한 없음'}")
 
-# 모니터링 상태 변수
-is_monitoring_fire = False
-last_fire_detection_time = 0
-FIRE_RESET_INTERVAL = 60  # 화재가 60초 이상 감지되지 않으면 모니터링 종료
-FIRE_LOG_INTERVAL = 3  # 화재 감지 로그 출력 간격 (초)
-last_fire_log_time = 0
+# 백업 서버 전송용 디스크 스풀
+backup_spool = FrameSpool(
+    BACKUP_SPOOL_DIR,
+    max_bytes=BACKUP_SPOOL_MAX_BYTES,
+    segment_bytes=BACKUP_SPOOL_SEGMENT_BYTES,
+) if BACKUP_SPOOL_DIR else None
+websocket_backlog_dropped = 0  # 스풀 없이 전송이 밀려 버린 프레임 수
+# 큐에 대기 중인 실시간 프레임 수 = 넣은 수 - 꺼낸 수
+# (pre-roll / 종료 신호는 세지 않음: pre-roll 묶음이 들어와도 실시간 프레임이 스풀로 밀리거나 품질이 떨어지지 않도록)
+# 넣기는 감지 스레드, 꺼내기는 WebSocket 스레드에서만 증가
+live_frames_queued = 0
+live_frames_taken = 0
 
-TARGET_CLASS = ['fire','smoke']  # 감지할 화재 클래스
 
-# 동물 클래스 리스트 (YOLO coco 데이터셋의 동물 클래스)
-ANIMAL_CLASSES = ['dog', 'cat', 'bird','person']
+def live_backlog():
+    """WebSocket 큐에 대기 중인 실시간 프레임 수"""
+    return live_frames_queued - live_frames_taken
 
-# 이벤트 로그 파일
-FIRE_EVENT_LOG_FILE = "fire_events.json"
-ANIMAL_EVENT_LOG_FILE = "animal_events.json"
-GEMINI_LOG_FILE = "gemini_analysis_log.txt"
+# 이벤트 저널 (감지 루프는 메모리 큐에 넣기만 함)
+event_journal = EventJournal(
+    EVENT_JOURNAL_DIR,
+    max_segment_bytes=EVENT_JOURNAL_SEGMENT_BYTES,
+    flush_interval=EVENT_JOURNAL_FLUSH_INTERVAL,
+).start() if EVENT_JOURNAL_DIR else None
+JOURNAL_KINDS = {MSG_TYPE_FIRE_EVENT: "fire", MSG_TYPE_ANIMAL_EVENT: "animal"}
 
-# 성능 최적화: 프레임 스킵 설정
-ANIMAL_DETECTION_SKIP = 3  # 매 3프레임마다 동물 감지 (더 빠름)
-frame_count = 0
 
-# --- TCP 프로토콜 메시지 타입
-MSG_TYPE_FRAME = 0x01
-MSG_TYPE_FIRE_EVENT = 0x02
-MSG_TYPE_ANIMAL_EVENT = 0x03
-MSG_TYPE_GEMINI_RESULT = 0x04
+def journal_event(kind, record, ts=None):
+    if event_journal is not None:
+        event_journal.append(kind, record, ts)
 
-print(f"화재 감지 모델 클래스: {TARGET_CLASS}")
-print(f"동물 감지 모델 클래스: {ANIMAL_CLASSES}")
-print(f"성능 최적화: 매 {ANIMAL_DETECTION_SKIP}프레임마다 동물 감지")
-print(f"Gemini 분석: 매 {GEMINI_CHECK_INTERVAL}초마다 실행")
-print("--- 실시간 화재 + 동물 감지를 시작합니다 ---")
 
-# === TCP 전송 함수 ===
-def send_tcp_message(sock, msg_type: int, payload: bytes):
+# === WebSocket 관련 함수 ===
+async def send_spooled_segment(ws, segment):
     """
-    TCP로 타입 기반 메시지 전송
-    Protocol: [4 bytes: size of payload][1 byte: type][payload]
+    스풀 세그먼트 하나를 원래 캡처 시각과 함께 전송 (재전송 세션 안에서)
+    [텍스트: replay_segment] [JPEG 바이너리 x N] 순서로 전송, 세그먼트 사이에는 실시간 프레임이 끼어들 수 있음
     """
-    if sock is None:
-        return False
-    try:
-        header = struct.pack('>I', len(payload)) + struct.pack('B', msg_type)
-        sock.sendall(header + payload)
-        return True
-    except Exception as e:
-        print(f"TCP 전송 오류: {e}")
-        return False
-
-def send_frame(sock, frame):
-    """이미지 프레임 전송 (타입: 0x01)"""
-    ret, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-    if not ret:
-        return False
-    return send_tcp_message(sock, MSG_TYPE_FRAME, encoded.tobytes())
-
-def send_fire_event(sock, event_data: dict):
-    """화재 이벤트 전송 (타입: 0x02)"""
-    payload = json.dumps(event_data, ensure_ascii=False).encode('utf-8')
-    return send_tcp_message(sock, MSG_TYPE_FIRE_EVENT, payload)
-
-def send_animal_event(sock, event_data: dict):
-    """동물 이벤트 전송 (타입: 0x03)"""
-    payload = json.dumps(event_data, ensure_ascii=False).encode('utf-8')
-    return send_tcp_message(sock, MSG_TYPE_ANIMAL_EVENT, payload)
-
-def send_gemini_result(sock, event_data: dict):
-    """Gemini 분석 결과 전송(타입: 0x04)"""
-    payload = json.dumps(event_data, ensure_ascii=False).encode('utf-8')
-    return send_tcp_message(sock, MSG_TYPE_GEMINI_RESULT, payload)
+    frames = segment.frames
+    await ws.send(json.dumps({
+        "type": "replay_segment",
+        "count": len(frames),
+        "timestamps": [f.timestamp for f in frames],
+    }))
+    for spooled in frames:
+        await ws.send(spooled.data)
+
 
-# === WebSocket 관련 함수 ===
 async def websocket_sender(frame_queue: asyncio.Queue):
     """WebSocket으로 프레임을 전송하는 비동기 함수"""
-    global websocket_connection, websocket_connected
+    global websocket_connection, websocket_connected, live_frames_taken
+    loop = asyncio.get_running_loop()
     
     while True:
         try:
@@ -114,19 +238,58 @@ async def websocket_sender(frame_queue: asyncio.Queue):
                 websocket_connection = ws
                 websocket_connected = True
                 print(f"✓ WebSocket 연결됨: {WEBSOCKET_URI}")
+                next_replay = loop.time()
+                # 진행 중인 재전송 세션 번호 (밀린 세그먼트를 모두 보낼 때까지 replay_start ~ replay_end 하나로 묶음)
+                replay_session = None
                 
                 while True:
-                    # 큐에서 프레임 데이터 가져오기
-                    frame_data = await frame_queue.get()
-                    if frame_data is None:  # 종료 신호
+                    if replay_session is not None and not backup_spool.pending():
+                        await ws.send(json.dumps({"type": "replay_end"}))
+                        print(f"✓ 스풀 재전송 세션 {replay_session} 완료")
+                        replay_session = None
+                    # 실시간 프레임이 없을 때만 스풀 세그먼트를 재전송 속도에 맞춰 전송
+                    if backup_spool is not None and frame_queue.empty() and backup_spool.pending():
+                        wait = next_replay - loop.time()
+                        if wait <= 0:
+                            segment = await asyncio.to_thread(backup_spool.read_oldest)
+                            if segment is not None and segment.frames:
+                                if replay_session is None:
+                                    replay_session = segment.seq
+                                    await ws.send(json.dumps({
+                                        "type": "replay_start",
+                                        "session": replay_session,
+                                        "first_ts": segment.frames[0].timestamp,
+                                    }))
+                                await send_spooled_segment(ws, segment)
+                                print(f"✓ 스풀 {len(segment.frames)}프레임 재전송")
+                            if segment is not None:
+                                backup_spool.remove(segment)
+                                next_replay = loop.time() + segment.size / BACKUP_SPOOL_REPLAY_RATE
+                            continue
+                        try:
+                            item = await asyncio.wait_for(frame_queue.get(), wait)
+                        except asyncio.TimeoutError:
+                            continue
+                    else:
+                        # 큐에서 프레임 데이터 가져오기
+                        item = await frame_queue.get()
+                    if item is None:  # 종료 신호
                         break
+                    queued_at = None
+                    if isinstance(item, tuple):  # 실시간 프레임 (EncodedFrame, 큐에 넣은 시각)
+                        item, queued_at = item
+                        live_frames_taken += 1
                     
                     try:
-                        await ws.send(frame_data)
+                        await ws.send(item.data if isinstance(item, EncodedFrame) else item)
                     except websockets.exceptions.ConnectionClosed:
                         print("WebSocket 연결이 닫혔습니다. 재연결 시도...")
                         websocket_connected = False
+                        if backup_spool is not None and isinstance(item, EncodedFrame):
+                            backup_spool.append(item)
                         break
+                    if queued_at is not None:
+                        SEND_SECONDS.observe(time.monotonic() - queued_at, sink="backup")
                         
         except (websockets.exceptions.ConnectionClosedError, 
                 websockets.exceptions.InvalidStatusCode,
@@ -148,6 +311,8 @@ def run_websocket_thread(frame_queue: asyncio.Queue, loop: asyncio.AbstractEvent
 
 
 # WebSocket용 asyncio 이벤트 루프와 큐 생성
+websocket_connected = False
+websocket_connection = None
 websocket_loop = asyncio.new_event_loop()
 frame_queue = asyncio.Queue()
 
@@ -160,271 +325,598 @@ websocket_thread = threading.Thread(
 websocket_thread.start()
 
 
-def send_frame_via_websocket(frame):
-    """프레임을 WebSocket 큐에 추가"""
+def send_frame_via_websocket(encoded):
+    """
+    인코딩된 프레임을 WebSocket 큐에 추가
+    (전송 실패 시 스풀에 기록할 수 있도록 EncodedFrame 그대로, 전송 지연 측정용으로 넣은 시각과 함께)
+    """
+    global live_frames_queued
     try:
-        # JPEG로 압축
-        ret_encode, frame_encoded = cv2.imencode(
-            '.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-        if ret_encode:
-            data = frame_encoded.tobytes()
-            # 스레드 안전하게 큐에 추가
-            websocket_loop.call_soon_threadsafe(frame_queue.put_nowait, data)
-            return True
+        # 스레드 안전하게 큐에 추가
+        websocket_loop.call_soon_threadsafe(frame_queue.put_nowait, (encoded, time.monotonic()))
+        live_frames_queued += 1
+        return True
     except Exception as e:
-        print(f"프레임 인코딩 오류: {e}")
+        print(f"WebSocket 큐 추가 오류: {e}")
     return False
 
 
-def send_fire_notification():
-    """화재 감지 시 백엔드 서버에 POST 요청"""
+# 백업 스트림 적응형 품질 (증거 영상이므로 TCP 뷰어보다 높은 최저 품질)
+backup_quality = AdaptiveQuality(
+    min_quality=BACKUP_MIN_JPEG_QUALITY,
+    min_scale=BACKUP_MIN_SCALE,
+    high_backlog=BACKUP_HIGH_BACKLOG,
+) if ADAPTIVE_QUALITY else None
+
+
+def backup_variant(encoded):
+    """백업 링크 상태(대기 중인 실시간 프레임 수, WebSocket ping 지연)에 맞는 품질의 프레임"""
+    if backup_quality is None or not websocket_connected:
+        # 연결이 끊긴 동안 스풀에 기록하는 프레임은 원래 품질 유지
+        return encoded
+    latency = getattr(websocket_connection, "latency", 0.0) or 0.0
+    return encoded.variant(*backup_quality.observe(live_backlog(), latency, encoded.quality))
+
+
+def backup_frame(encoded):
+    """
+    백업 서버로 프레임 전송
+    연결이 끊겼거나 대기 중인 실시간 프레임이 WEBSOCKET_MAX_BACKLOG를 넘으면 스풀에 기록 (스풀이 없으면 버림)
+    pre-roll 프레임은 세지 않음 (화재 확정 시점에 한꺼번에 들어와도 실시간 프레임을 밀어내지 않도록)
+    """
+    global websocket_backlog_dropped
+    if websocket_connected and live_backlog() < WEBSOCKET_MAX_BACKLOG:
+        return send_frame_via_websocket(encoded)
+    if backup_spool is not None:
+        return backup_spool.append(encoded)
+    if websocket_connected:
+        websocket_backlog_dropped += 1
+        FRAMES_DROPPED.inc(sink="backup")
+    return False
+
+
+def send_preroll_via_websocket(frames):
+    """
+    pre-roll 프레임을 라이브 프레임보다 먼저 WebSocket 큐에 추가
+    [텍스트: preroll_start] [JPEG 바이너리 x N] [텍스트: preroll_end] 순서로 전송
+    이미 대기 중인 실시간 프레임은 pre-roll 뒤로 옮김 (앞서 넣은 pre-roll / 종료 신호의 순서는 유지)
+    """
+    start = json.dumps({
+        "type": "preroll_start",
+        "count": len(frames),
+        "first_ts": frames[0].timestamp,
+        "last_ts": frames[-1].timestamp,
+    })
+    end = json.dumps({"type": "preroll_end"})
+
+    def enqueue():
+        pending = []
+        while not frame_queue.empty():
+            pending.append(frame_queue.get_nowait())
+        # 마지막 비실시간 항목(pre-roll / 종료 신호) 뒤, 그 이후의 실시간 프레임 앞에 끼워 넣음
+        split = max((i + 1 for i, item in enumerate(pending) if not isinstance(item, tuple)), default=0)
+        for item in pending[:split]:
+            frame_queue.put_nowait(item)
+        frame_queue.put_nowait(start)
+        for encoded in frames:
+            frame_queue.put_nowait(encoded.data)
+        frame_queue.put_nowait(end)
+        for item in pending[split:]:
+            frame_queue.put_nowait(item)
+
     try:
-        response = requests.post(NOTIFY_API_URL)
-        if response.status_code == 200:
-            print(f"✓ 화재 알림 전송 성공")
-        else:
-            print(f"✗ 화재 알림 전송 실패: {response.status_code}")
+        # 이벤트 루프의 한 콜백 안에서 재배치하므로 중간에 라이브 프레임이 끼어들지 않음
+        websocket_loop.call_soon_threadsafe(enqueue)
+        return True
     except Exception as e:
-        print(f"✗ 화재 알림 오류: {e}")
+        print(f"WebSocket 큐 추가 오류: {e}")
+    return False
 
-# Gemini 분석을 수행하는 스레드 함수
-def run_gemini_analysis_thread(frame_bgr):
-    print(">>> Gemini 분석 스레드 진입")
-    try:
-        # OpenCV BGR -> PIL RGB 변환
-        frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(frame_rgb)
-        
-        print(">>> Gemini API 호출 중...")
-        # Gemini 분석 호출
-        result = analyze_frame_with_gemini(pil_image)
-        
-        # 결과 출력 및 로깅
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] Gemini 분석 결과: {result}"
-        print(f"\n>>> {log_message}\n")
-        
-        # TCP로 Gemini 결과 전송
-        gemini_data = {
-            "event_type": "gemini_analysis",
+
+# 화재 알림은 백그라운드 전송기로 보냄 (감지 루프는 대기하지 않음)
+notifier = NotificationDispatcher(
+    NOTIFY_API_URL,
+    timeout=NOTIFY_TIMEOUT,
+    max_retries=NOTIFY_MAX_RETRIES,
+    backoff=NOTIFY_BACKOFF,
+    dedupe_window=NOTIFY_DEDUPE_WINDOW,
+).start()
+
+
+def send_fire_notification():
+    """화재 감지 시 백엔드 서버에 POST 요청 (전송 큐에 넣고 바로 반환)"""
+    notifier.notify("fire")
+
+# Gemini 분석 결과 처리 (분석 워커 스레드에서 호출)
+def handle_gemini_result(job, result, ok):
+    # 결과 출력 및 로깅
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    source = " (캐시)" if job.cached else ""
+    log_message = f"[{timestamp}] Gemini 분석 결과{source} (cam{job.camera_id}): {result}"
+    print(f"\n>>> {log_message}\n")
+
+    # TCP로 Gemini 결과 전송 (타입: 0x04)
+    gemini_data = {
+        "event_type": "gemini_analysis",
+        "camera_id": job.camera_id,
+        "timestamp": datetime.now().isoformat(),
+        "result": result,
+        "cached": job.cached
+    }
+    tcp_server = detectors[job.camera_id].outputs.tcp_server
+    tcp_server.broadcast(MSG_TYPE_GEMINI_RESULT, pack_json_message(MSG_TYPE_GEMINI_RESULT, gemini_data))
+    # 저널에는 분석한 프레임의 캡처 시각으로 기록 (같은 시각의 화재 이벤트와 맞춰 보기 위해)
+    journal_event("gemini", {**gemini_data, "ok": ok}, ts=job.encoded.timestamp)
+
+
+gemini_executor = GeminiExecutor(
+    lambda jpeg_bytes, timeout: request_analysis(jpeg_part(jpeg_bytes), timeout),
+    max_in_flight=GEMINI_MAX_IN_FLIGHT,
+    deadline=GEMINI_DEADLINE,
+    failure_threshold=GEMINI_FAILURE_THRESHOLD,
+    cooldown=GEMINI_COOLDOWN,
+    cache=GeminiResultCache(
+        max_distance=GEMINI_CACHE_MAX_DISTANCE,
+        ttl=GEMINI_CACHE_TTL,
+        max_entries=GEMINI_CACHE_MAX_ENTRIES,
+    ) if GEMINI_CACHE_ENABLED else None,
+).start()
+
+
+class LiveOutputs(DetectorOutputs):
+    """
+    실시간 출력: 카메라별 TCP 브로드캐스트 서버 + (대표 카메라만) WebSocket 백업
+    """
+
+    def __init__(self, tcp_server, backup=False, preroll=None):
+        self.tcp_server = tcp_server
+        self.backup = backup  # 백업 서버는 한 영상 스트림만 저장하므로 대표 카메라만 전송
+        self.preroll = preroll  # 확정 전 프레임 링 버퍼 (백업 카메라만)
+
+    def wants_frame(self):
+        return (self.tcp_server.has_clients()
+                or self.preroll is not None
+                or (self.backup and (websocket_connected or backup_spool is not None)))
+
+    def send_frame(self, encoded):
+        if self.tcp_server.has_clients():
+            self.tcp_server.broadcast_frame(encoded)
+        if self.preroll is not None or self.backup:
+            backup = backup_variant(encoded)
+            if self.preroll is not None:
+                self.preroll.append(backup)
+            if self.backup:
+                backup_frame(backup)
+
+    def send_event(self, msg_type, event_data):
+        self.tcp_server.broadcast(msg_type, pack_json_message(msg_type, event_data))
+        journal_event(JOURNAL_KINDS.get(msg_type, "event"), event_data)
+
+    def notify_fire(self, camera_id):
+        send_fire_notification()
+        journal_event("fire_confirmed", {
+            "event_type": "fire_confirmed",
+            "camera_id": camera_id,
             "timestamp": datetime.now().isoformat(),
-            "result": result
-        }
-        send_gemini_result(client_socket, gemini_data)
-            
-    except Exception as e:
-        print(f"Gemini 스레드 오류: {e}")
+        })
+
+        # 확정 전 영상을 라이브 스트림보다 먼저 백업 서버로 전송
+        if self.preroll is not None:
+            frames = self.preroll.drain()
+            if not frames:
+                return
+            if websocket_connected:
+                print(f"✓ pre-roll {len(frames)}프레임 백업 전송 "
+                      f"({frames[-1].timestamp - frames[0].timestamp:.1f}초)")
+                send_preroll_via_websocket(frames)
+            elif backup_spool is not None:
+                # 연결이 끊긴 동안의 프레임은 이미 스풀에 기록되어 재연결 후 전송됨
+                print("✗ WebSocket 미연결: pre-roll 대신 스풀에 기록된 영상을 재연결 후 전송")
+            else:
+                print("✗ WebSocket 미연결로 pre-roll 전송 불가")
+
+    def request_gemini(self, camera_id, encoded, frame, force_refresh=False):
+        if gemini_executor.submit(camera_id, encoded, frame, handle_gemini_result, force_refresh):
+            if not HEADLESS:
+                snapshot_queue.put(frame)
+        else:
+            print("✗ Gemini 분석 일시 중단 중 (연속 실패), 요청 생략")
+
+
+# 멀티 프로세스 모드의 화재 워커는 단일 단계로 추론하므로 캐스케이드는 사용하지 않음
+fire_cascade = FireCascade(
+    TARGET_CLASS,
+    screen_imgsz=CASCADE_SCREEN_IMGSZ,
+    confirm_imgsz=CASCADE_CONFIRM_IMGSZ,
+    screen_conf=CASCADE_SCREEN_CONF,
+    confirm_conf=CASCADE_CONFIRM_CONF,
+    mode=FIRE_CASCADE_MODE,
+    tile_size=CASCADE_TILE_SIZE,
+) if FIRE_CASCADE and not PROCESS_MODE else None
 
 # 송신할 소켓 서버 설정
 HOST = os.getenv("BIND_ADDRESS")
 PORT = int(os.getenv("BIND_PORT"))
 
-server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-server_socket.bind((HOST, PORT))
-server_socket.listen(1)
-server_socket.settimeout(1)
+TCP_CLIENT_QUEUE_SIZE = 2  # 클라이언트별 대기 프레임 수 (초과 시 오래된 프레임부터 버림)
+# 설정 변경(0x07) 권한: 허용 주소 목록(쉼표 구분, 대역 / "*" 가능)에 있거나 공유 토큰을 보낸 클라이언트만
+# 다른 장비의 Settings 페이지는 CONTROL_TOKEN을 같은 값으로 설정하거나 주소를 CONTROL_ALLOWED_HOSTS에 추가
+control_access = ControlAccess(
+    os.getenv("CONTROL_ALLOWED_HOSTS", "127.0.0.1,::1").split(","),
+    os.getenv("CONTROL_TOKEN"),
+)
 
-client_socket = None
-print(f"✓ 소켓 서버 대기 중: {HOST}:{PORT}")
+# Gemini 스냅샷 표시용 (GUI 호출은 메인 스레드에서만)
+snapshot_queue = LatestQueue(1)
 
-try:
+# 종료 요청 ('q' 키 또는 SIGINT / SIGTERM) - 모든 루프가 확인
+stop_event = threading.Event()
+pacer = FramePacer(TARGET_FPS, stop_event)
+
+# 실행 중 변경 가능한 설정 (모든 카메라 공용): Settings 페이지가 TCP 제어 메시지(0x07)로 변경
+runtime_config = default_runtime_config(target_fps=TARGET_FPS)
+runtime_config.subscribe(lambda settings: pacer.set_fps(settings.target_fps))
+
+
+def handle_control_message(msg_type, payload, addr):
+    """
+    클라이언트 제어 메시지 처리 (TCP 서버 스레드에서 호출)
+    권한(control_access)이 없는 클라이언트는 현재 설정 조회만 가능
+    (응답의 writable로 변경 가능 여부를 알려 Settings 페이지가 미리 읽기 전용으로 표시)
+    Returns:
+        (응답 타입, 적용된 설정 패킷) - 요청한 클라이언트에만 전송
+    """
+    if msg_type != MSG_TYPE_CONTROL:
+        return None
+    writable = False
+    try:
+        request = json.loads(payload.decode("utf-8")) if payload else {}
+        changes = request.get("set") or {}
+        if not isinstance(changes, dict):
+            raise ValueError("set은 객체여야 합니다")
+        writable = control_access.allows(addr, request.get("token"))
+        if changes and not writable:
+            raise ValueError("설정 변경 권한이 없습니다 (CONTROL_TOKEN / CONTROL_ALLOWED_HOSTS)")
+    except (UnicodeDecodeError, ValueError, AttributeError) as e:
+        settings, applied, errors = runtime_config.current(), [], {"request": str(e)}
+    else:
+        settings, applied, errors = runtime_config.update(changes)
+    if applied:
+        print(f"✓ 설정 변경 (v{settings.version}): " + ", ".join(f"{name}={getattr(settings, name)}" for name in applied))
+    return MSG_TYPE_CONFIG, pack_json_message(MSG_TYPE_CONFIG, {
+        "version": settings.version,
+        "config": settings.as_dict(),
+        "applied": applied,
+        "errors": errors,
+        "writable": writable,
+    })
+
+# 카메라별 TCP 서버: i번째 카메라는 BIND_PORT + i 포트로 송신 (여러 클라이언트에 non-blocking 전송)
+# 모델을 기다리기 전에 열어 두어 뷰어 / Settings 페이지가 로딩 중에도 연결 가능
+tcp_servers = [
+    FrameBroadcastServer(
+        HOST, PORT + cam_index, TCP_CLIENT_QUEUE_SIZE, camera_id=cam_index,
+        on_message=handle_control_message,
+        quality_factory=(lambda: AdaptiveQuality(
+            min_quality=TCP_MIN_JPEG_QUALITY,
+            min_scale=TCP_MIN_SCALE,
+            high_backlog=TCP_CLIENT_QUEUE_SIZE,
+        )) if ADAPTIVE_QUALITY else None,
+    ).start()
+    for cam_index in range(len(CAMERA_SOURCES))
+]
+
+
+def register_metrics():
+    """
+    다른 모듈이 이미 세고 있는 값(카메라 / TCP / WebSocket / 스풀 / 화재 상태)을 수집 시점에 읽는 지표 등록
+    (단계별 시간 히스토그램은 각 모듈이 직접 기록)
+    """
+    def per_camera(value):
+        return lambda: {(str(i),): value(i, cam) for i, cam in enumerate(cameras.stats())}
+
+    REGISTRY.gauge("firedetector_capture_fps", "카메라 캡처 FPS", ("camera",),
+                   per_camera(lambda i, cam: cam["fps"]))
+    REGISTRY.counter("firedetector_frames_captured_total", "카메라에서 읽은 프레임 수", ("camera",),
+                     per_camera(lambda i, cam: cam["frames_read"]))
+    REGISTRY.counter("firedetector_capture_dropped_total", "감지 루프가 가져가기 전에 새 프레임으로 대체된 프레임 수",
+                     ("camera",), per_camera(lambda i, cam: cam["dropped"]))
+    REGISTRY.gauge("firedetector_frame_latency_seconds", "마지막 프레임의 캡처 ~ 전송 완료 지연", ("camera",),
+                   lambda: {(str(d.camera_id),): d.last_frame_latency for d in detectors})
+    REGISTRY.gauge("firedetector_fire_state", "화재 확정 상태 (현재 상태만 1)", ("camera", "state"),
+                   lambda: {(str(d.camera_id), state): int(d.fire_state.state() == state)
+                            for d in detectors for state in ("idle", "pending", "monitoring")})
+    REGISTRY.gauge("firedetector_tcp_clients", "TCP 클라이언트 수", ("camera",),
+                   lambda: {(str(server.camera_id),): server.client_count() for server in tcp_servers})
+    REGISTRY.gauge("firedetector_websocket_queue_depth", "백업 WebSocket 전송 대기 항목 수",
+                   function=frame_queue.qsize)
+    REGISTRY.gauge("firedetector_websocket_live_backlog", "백업 WebSocket 전송 대기 실시간 프레임 수",
+                   function=live_backlog)
+    REGISTRY.gauge("firedetector_websocket_connected", "백업 WebSocket 연결 여부",
+                   function=lambda: int(websocket_connected))
+    if backup_spool is not None:
+        REGISTRY.gauge("firedetector_spool_bytes", "백업 스풀 디스크 사용량",
+                       function=lambda: backup_spool.stats()["bytes"])
+        def spool_frames():
+            sp = backup_spool.stats()
+            return {("spooled",): sp["spooled"], ("replayed",): sp["replayed"]}
+
+        REGISTRY.counter("firedetector_spool_frames_total", "백업 스풀에 기록 / 재전송한 프레임 수",
+                         ("event",), spool_frames)
+    if event_journal is not None:
+        def journal_events():
+            js = event_journal.stats()
+            return {("written",): js["written"], ("dropped",): js["dropped"], ("error",): js["errors"]}
+
+        REGISTRY.counter("firedetector_journal_events_total", "이벤트 저널 기록 / 버림 / 오류 수",
+                         ("result",), journal_events)
+
+
+register_metrics()
+metrics_server = MetricsServer(HOST, METRICS_PORT).start() if METRICS_PORT else None
+timeline.mark("서버 / 출력 준비")
+
+# 감지 시작에 필요한 것은 화재 모델뿐: 여기서만 대기 (동물 모델은 계속 백그라운드에서 준비)
+if PROCESS_MODE:
+    model_names = inference_workers.wait_ready(("fire",))
+    fire_names, animal_names = model_names["fire"], model_names.get("animal")
+else:
+    fire_model = fire_loader.wait()
+    fire_names, animal_names = fire_model.names, None
+    runtime_config.set_model_names("fire_classes", fire_names)
+
+# 카메라별 감지기
+for cam_index, tcp_server in enumerate(tcp_servers):
+    motion_gate = MotionGate(
+        pixel_threshold=MOTION_PIXEL_THRESHOLD,
+        motion_ratio=MOTION_RATIO_THRESHOLD,
+        max_skip_interval=MOTION_MAX_SKIP_INTERVAL,
+    ) if MOTION_GATE_ENABLED else None
+    detectors.append(CameraDetector(
+        cam_index,
+        fire_names,
+        animal_names,
+        LiveOutputs(
+            tcp_server,
+            backup=(cam_index == 0),
+            preroll=PreEventBuffer(PREROLL_SECONDS, PREROLL_MAX_BYTES)
+            if cam_index == 0 and PREROLL_SECONDS > 0 else None,
+        ),
+        motion_gate=motion_gate,
+        config=runtime_config,
+    ))
+
+
+def attach_animal_model():
+    """
+    동물 모델이 준비되었으면 감지기에 연결 (추론 단계에서 호출)
+    준비 전에는 화재 감지만 실행, 로딩에 실패하면 계속 화재 감지만 실행
+    """
+    global animal_model
+    if animal_model is not None or animal_loader is None or not animal_loader.ready():
+        return
+    if animal_loader.error is not None:
+        return
+    animal_model = animal_loader.model
+    runtime_config.set_model_names("animal_classes", animal_model.names)
+    for detector in detectors:
+        detector.set_animal_names(animal_model.names)
+    print(f"✓ 동물 감지 시작 (시작 후 {timeline.elapsed():.1f}초)")
+
+
+attach_animal_model()
+timeline.mark("화재 감지 시작")
+REGISTRY.gauge("firedetector_startup_seconds", "프로세스 시작 ~ 화재 감지 시작 시간").set(timeline.elapsed())
+print(f"[시작 시간]\n{timeline.format()}")
+if animal_names is None and animal_model is None:
+    print("동물 모델은 준비되는 대로 감지에 추가됩니다.")
+print("--- 실시간 화재 + 동물 감지를 시작합니다 ---")
+
+
+# === 파이프라인 단계 함수 ===
+# 각 단계는 (감지기, ...) 튜플의 목록을 주고받음 - 카메라가 하나여도 동일
+def capture_frames():
+    """
+    1. 새 프레임이 있는 카메라들의 최신 프레임 가져오기 (캡처 단계)
+    목표 FPS의 다음 마감 시각까지 기다린 뒤 그 시점의 최신 프레임을 읽음
+    Returns:
+        목록, 종료 요청 또는 모든 카메라 실패 시 None
+    """
+    while pacer.wait():
+        batch = cameras.read_batch(timeout=CAPTURE_POLL_INTERVAL)
+        if batch is None:
+            return None
+        if batch:
+            return [(detectors[i], captured) for i, captured in batch]
+    return None
+
+
+def run_inference(batch):
+    """2. 카메라들의 프레임을 모델별로 묶어 한 번에 YOLO 추론 (추론 단계)"""
+    attach_animal_model()
+    return infer_batch(fire_model, animal_model, batch, fire_cascade)
+
+
+def process_detections(batch):
+    """3. 카메라별 결과 분석, 박스 그리기, 화재 확정, 인코딩 (후처리 단계)"""
+    return [
+        (detector, detector.process(captured, fire_result, animal_result, geometry))
+        for detector, captured, fire_result, animal_result, geometry in batch
+    ]
+
+
+def fan_out(batch):
+    """4. 카메라별 프레임과 이벤트 송신 (전송 단계)"""
+    for detector, item in batch:
+        detector.fan_out(item)
+    return batch
+
+
+def show_gemini_snapshot():
+    """Gemini 분석에 사용된 프레임 표시 (메인 스레드에서 호출)"""
+    snapshot = snapshot_queue.get_nowait()
+    if snapshot is not None:
+        cv2.imshow("Gemini Snapshot", snapshot)
+
+
+def poll_gui():
+    """GUI 이벤트 처리, 'q' 입력 시 종료 요청 (헤드리스 모드에서는 아무것도 하지 않음)"""
+    if HEADLESS:
+        return
+    show_gemini_snapshot()
+    if cv2.waitKey(1) & 0xFF == ord('q'):
+        stop_event.set()
+
+
+def request_shutdown(signum, frame):
+    """SIGINT / SIGTERM 처리: 루프를 빠져나와 finally에서 정리하도록 종료 요청만 표시"""
+    if not stop_event.is_set():
+        print(f"\n종료 신호 수신 ({signal.Signals(signum).name}). 시스템 종료 중...")
+    stop_event.set()
+
+
+def format_io_stats():
+    """카메라별(읽은/버려진 프레임, 지연, 움직임 게이트, TCP 클라이언트) 및 인코딩 통계"""
+    lines = []
+    for detector, cam in zip(detectors, cameras.stats()):
+        lines.append(f"  cam{detector.camera_id}         read {cam['frames_read']} | drop {cam['dropped']}"
+                     f" | latency {detector.last_frame_latency * 1000:.1f}ms")
+        if detector.motion_gate is not None:
+            m = detector.motion_gate.stats()
+            lines.append(f"  motion gate  motion {m['motion_runs']} | forced {m['forced_runs']}"
+                         f" | skip {m['skipped']} ({m['skip_ratio'] * 100:.0f}%)")
+        lines.append(detector.outputs.tcp_server.format_stats())
+        if detector.outputs.preroll is not None:
+            p = detector.outputs.preroll.stats()
+            lines.append(f"  pre-roll     {p['frames']} frames | {p['span_sec']:.1f}s | {p['bytes'] / 1024 / 1024:.1f}MB")
+    enc = encode_stats.snapshot()
+    if fire_cascade is not None:
+        lines.append(fire_cascade.format_stats())
+    if inference_workers is not None:
+        lines.append(inference_workers.format_stats())
+    if backup_quality is not None:
+        lines.append(f"  backup q     {backup_quality.format_state()}")
+    if backup_spool is not None:
+        sp = backup_spool.stats()
+        lines.append(f"  spool        {sp['segments']} segs | {sp['bytes'] / 1024 / 1024:.1f}MB"
+                     f" | spooled {sp['spooled']} | replayed {sp['replayed']} | evicted {sp['evicted']}")
+    elif websocket_backlog_dropped:
+        lines.append(f"  websocket    backlog drop {websocket_backlog_dropped}")
+    if pacer.enabled:
+        lines.append(pacer.format_stats())
+    lines.append(gemini_executor.format_stats())
+    lines.append(notifier.format_stats())
+    if event_journal is not None:
+        lines.append(event_journal.format_stats())
+    lines.append(f"  encode       avg {enc['avg_ms']:6.1f}ms | max {enc['max_ms']:6.1f}ms | n={enc['count']}")
+    return "\n".join(lines)
+
+
+def run_sequential():
+    """기존 방식: 모든 단계를 한 루프에서 순서대로 실행"""
+    last_stats_time = time.time()
     while True:
-        # 클라이언트 연결 시도
-        try:
-            if client_socket is None:
-                client_socket, addr = server_socket.accept()
-                print(f"✓ 클라이언트 연결됨: {addr}")
-        except socket.timeout:
-            pass
-
-        # 1. 카메라에서 프레임 읽기
-        ret, frame = cap.read()
-        if not ret:
-            print("카메라를 읽을 수 없습니다.")
+        batch = capture_frames()
+        if batch is None:
             break
 
-        # 2. YOLO 모델로 현재 프레임 추론 (화재 감지 - 매 프레임)
-        fire_results = fire_model(frame, stream=True, verbose=False)
-        
-        # 동물 감지는 성능 최적화를 위해 프레임 스킵
-        animal_results = None
-        if frame_count % ANIMAL_DETECTION_SKIP == 0:
-            animal_results = animal_model(frame, stream=True, verbose=False)
-        
-        frame_count += 1
-
-        fire_detected_in_frame = False
-        animal_detected_in_frame = False
-        detected_animals = []
-        max_fire_confidence = 0.0
-
-        # 3-1. 화재 감지 결과 분석 (매 프레임)
-        for r in fire_results:
-            boxes = r.boxes
-            for box in boxes:
-                cls_id = int(box.cls[0])
-                class_name = fire_model.names[cls_id]
-
-                if class_name.lower() in [t.lower() for t in TARGET_CLASS]:
-                    # 화재 이벤트 트리거
-                    fire_detected_in_frame = True
-                    
-                    x1, y1, x2, y2 = box.xyxy[0]
-                    x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                    
-                    # 화재 감지: 파란색 박스
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
+        fan_out(process_detections(run_inference(batch)))
+        poll_gui()
 
-                    conf = math.ceil(box.conf[0] * 100) / 100
-                    if conf > max_fire_confidence:
-                        max_fire_confidence = conf
-                        
-                    label = f"{class_name.upper()} {conf}"
-                    cv2.putText(frame, label, (x1, y1 - 10), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-
-        # === 화재 감지 확인 및 Gemini 호출 로직 (수정됨) ===
-        current_time = time.time()
-
-        # 화재 감지 시간 업데이트
-        if fire_detected_in_frame:
-            last_fire_detection_time = current_time
-
-        # 화재가 일정 시간 이상 감지되지 않으면 모니터링 종료
-        if is_monitoring_fire and (current_time - last_fire_detection_time > FIRE_RESET_INTERVAL):
-            print("--- 화재 소실 확인. 모니터링 종료 ---")
-            is_monitoring_fire = False
-            pending_fire_check_time = None
-
-        if fire_detected_in_frame:
-            if not is_monitoring_fire:
-                # Case 1: 새로운 화재 감지 (모니터링 시작 전)
-                if pending_fire_check_time is None:
-                    # 10초 타이머 시작
-                    pending_fire_check_time = current_time
-                    print(f"화재 최초 감지. {FIRE_CHECK_DELAY}초 뒤 재확인합니다.")
-                else:
-                    # 타이머 진행 중
-                    if current_time - pending_fire_check_time >= FIRE_CHECK_DELAY:
-                        # 10초 경과 후에도 화재가 감지됨 -> 확정
-                        print(f"--- 화재 확정. Gemini 분석 및 모니터링 시작 ---")
-                        is_monitoring_fire = True
-                        pending_fire_check_time = None
-                        
-                        # 백엔드에 화재 알림 전송
-                        send_fire_notification()
-                        
-                        # 즉시 Gemini 호출
-                        last_gemini_check_time = current_time
-                        cv2.imshow("Gemini Snapshot", frame)
-                        threading.Thread(target=run_gemini_analysis_thread, args=(frame.copy(),)).start()
-            else:
-                # Case 2: 이미 모니터링 중 (10분마다 재확인)
-                if current_time - last_gemini_check_time > GEMINI_CHECK_INTERVAL:
-                    print(f"--- 화재 모니터링 업데이트 (10분 경과) ---")
-                    last_gemini_check_time = current_time
-                    
-                    cv2.imshow("Gemini Snapshot", frame)
-                    threading.Thread(target=run_gemini_analysis_thread, args=(frame.copy(),)).start()
-                
-                # 모니터링 중에는 pending 타이머 불필요
-                pending_fire_check_time = None
+        if time.time() - last_stats_time >= PIPELINE_STATS_INTERVAL:
+            last_stats_time = time.time()
+            print(f"[입출력 통계]\n{format_io_stats()}")
 
-        else:
-            # 현재 프레임에서 화재 없음
-            if pending_fire_check_time is not None:
-                # 재확인 대기 중이었는데 화재가 사라짐 -> 취소
-                print(f"재확인 중 화재 소실. 대기 취소.")
-                pending_fire_check_time = None
-
-        # 3-2. 동물 감지 결과 분석 (스킵된 프레임에서만)
-        if animal_results is not None:
-            for r in animal_results:
-                boxes = r.boxes
-                for box in boxes:
-                    cls_id = int(box.cls[0])
-                    class_name = animal_model.names[cls_id]
-
-                    # 동물 클래스 확인
-                    if class_name.lower() in [c.lower() for c in ANIMAL_CLASSES]:
-                        animal_detected_in_frame = True
-                        detected_animals.append(class_name)
-                        
-                        x1, y1, x2, y2 = box.xyxy[0]
-                        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                        
-                        # 동물 감지: 초록색 박스
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-
-                        confidence = math.ceil(box.conf[0] * 100) / 100
-                        label = f"{class_name.upper()} {confidence}"
-                        cv2.putText(frame, label, (x1, y1 - 10), 
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-
-        # 4. 프레임을 연결된 클라이언트로 송신
-        if client_socket:
-            if not send_frame(client_socket, frame):
-                print("클라이언트 연결 해제됨")
-                client_socket = None
-        
-        if websocket_connected:
-            send_frame_via_websocket(frame)
-
-        # 5. 화재 감지 여부 및 알림 로직
-        current_time = time.time()
-        
-        # === 화재 감지 처리 ===
-        if fire_detected_in_frame:
-            # 로그 출력 간격 확인
-            if current_time - last_fire_log_time >= FIRE_LOG_INTERVAL:
-                last_fire_log_time = current_time
-                print(f"[{time.ctime()}] 🔥 화재 감지 !!!")
-                
-                fire_event_data = {
-                    "event_type": "fire_detected",
-                    "timestamp": datetime.now().isoformat(),
-                    "unix_timestamp": current_time,
-                    "confidence": max_fire_confidence,
-                    "message": "🔥 화재가 감지되었습니다!"
-                }
-                
-                # TCP로 화재 이벤트 전송
-                if client_socket:
-                    send_fire_event(client_socket, fire_event_data)
-                            
-            if (current_time - last_alert_time) > ALERT_COOLDOWN:
-                print(">>> 화재 알림 조건 충족!")
-                last_alert_time = current_time
-        
-        # === 동물 감지 처리 ===
-        if animal_detected_in_frame:
-            animal_list = ", ".join(set(detected_animals))  # 중복 제거
-            print(f"[{time.ctime()}] 🐾 동물 감지: {animal_list}")
-            
-            animal_event_data = {
-                "event_type": "animal_detected",
-                "timestamp": datetime.now().isoformat(),
-                "unix_timestamp": current_time,
-                "detected_animals": detected_animals,
-                "message": f"🐾 {animal_list}이(가) 감지되었습니다!"
-            }
-            
-            # TCP로 동물 이벤트 전송
-            if client_socket:
-                send_fire_event(client_socket, fire_event_data)
-
-        # GUI 이벤트 처리를 위해 waitKey 사용 (30ms 대기)
-        if cv2.waitKey(30) & 0xFF == ord('q'):
+
+def run_pipelined():
+    """파이프라인 방식: 각 단계를 별도 스레드로 실행하고 최신 프레임만 넘김"""
+    pipeline = Pipeline([
+        ("capture", capture_frames),
+        ("inference", run_inference),
+        ("postprocess", process_detections),
+        ("fanout", fan_out),
+    ], queue_size=PIPELINE_QUEUE_SIZE)
+    pipeline.start()
+    print("✓ 파이프라인 모드로 실행합니다.")
+
+    last_stats_time = time.time()
+    try:
+        while pipeline.is_running() and not stop_event.is_set():
+            if HEADLESS:
+                stop_event.wait(0.5)
+            else:
+                show_gemini_snapshot()
+                if cv2.waitKey(30) & 0xFF == ord('q'):
+                    break
+
+            # 단계별 처리 시간 출력
+            if time.time() - last_stats_time >= PIPELINE_STATS_INTERVAL:
+                last_stats_time = time.time()
+                print(f"[파이프라인 통계]\n{pipeline.format_stats()}\n{format_io_stats()}")
+    finally:
+        pipeline.stop()
+        pipeline.join(timeout=2)
+
+
+def run_multiprocess():
+    """멀티 프로세스 방식: 추론은 모델 워커 프로세스, 메인 프로세스는 캡처 / 후처리 / 전송"""
+    print("✓ 멀티 프로세스 모드로 실행합니다.")
+
+    last_stats_time = time.time()
+    while not stop_event.is_set():
+        # 목표 FPS 주기가 되었을 때만 새 프레임을 읽어 워커에 보냄
+        batch = cameras.read_batch(timeout=0.005) if pacer.ready() else []
+        if batch is None:
             break
 
+        for i, captured in batch:
+            # 화재 추론 중인 카메라의 프레임은 보내지 않음 (끝나면 그때의 최신 프레임을 보냄)
+            if inference_workers.busy(i):
+                continue
+            run_fire, run_animal = detectors[i].plan(captured)
+            inference_workers.submit(i, captured, run_fire, run_animal, runtime_config.current())
+
+        # 화재 결과가 도착한 프레임부터 후처리 / 전송 (동물 결과는 기다리지 않음)
+        for i, captured, fire_dets, animal_dets in inference_workers.poll(timeout=0.005):
+            detector = detectors[i]
+            detector.fan_out(detector.process(captured, fire_dets, animal_dets))
+
+        poll_gui()
+
+        if time.time() - last_stats_time >= PIPELINE_STATS_INTERVAL:
+            last_stats_time = time.time()
+            print(f"[멀티 프로세스 통계]\n{format_io_stats()}")
+
+
+# 모델 워커 프로세스를 만든 뒤에 등록 (워커가 종료 시그널 처리를 물려받지 않도록)
+signal.signal(signal.SIGINT, request_shutdown)
+signal.signal(signal.SIGTERM, request_shutdown)
+
+try:
+    if PROCESS_MODE:
+        run_multiprocess()
+    elif PIPELINE_MODE:
+        run_pipelined()
+    else:
+        run_sequential()
+
 except KeyboardInterrupt:
     print("\n시스템 종료 중...")
 
 finally:
-    if client_socket:
-        client_socket.close()
-    server_socket.close()
-    cap.release()
-    cv2.destroyAllWindows()
+    if inference_workers is not None:
+        inference_workers.close()
+    gemini_executor.close()
+    notifier.close()
+    if event_journal is not None:
+        event_journal.close()
+    if metrics_server is not None:
+        metrics_server.close()
+    if backup_spool is not None:
+        backup_spool.close()
+    for detector in detectors:
+        detector.outputs.tcp_server.close()
+    cameras.release()
+    if not HEADLESS:
+        cv2.destroyAllWindows()
     print("--- 감지 시스템을 종료합니다. ---")
@@ -0,0 +1,274 @@
+"""
+감지기 지표 (Prometheus 텍스트 / JSON, HTTP로 제공)
+
+stdout 통계만으로는 현장 장비가 왜 느린지(캡처, 추론, 인코딩, 전송 중 어디서 막히는지) 알기 어려워
+단계별 지표를 모아 HTTP로 제공합니다.
+- Counter: 누적 횟수 (inc 또는 수집 시점에 호출되는 함수)
+- Histogram: 소요 시간 분포 (observe, 구간별 누적 개수 + 합계)
+- Gauge: 현재 값 (set 또는 수집 시점에 호출되는 함수 - 기존 stats()를 그대로 노출할 때)
+
+각 모듈은 REGISTRY에서 이름으로 지표를 가져와(없으면 생성) 기록하고,
+MetricsServer가 GET /metrics(Prometheus 텍스트), GET /metrics.json(JSON)으로 응답합니다.
+"""
+import json
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 초 단위 소요 시간 구간 (1ms ~ 30s: 인코딩 ~ Gemini 호출까지)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 라벨은 {self.labelnames}이어야 합니다: {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels_dict(self, key):
+        return dict(zip(self.labelnames, key))
+
+
+class _ValueMetric(_Metric):
+    """
+    라벨별 값 하나를 갖는 지표 (Counter / Gauge 공통)
+    function이 있으면 수집할 때마다 호출해 값을 얻음 (이미 다른 곳에서 세고 있는 stats()를 노출할 때)
+    - 라벨이 없으면 값, 있으면 {라벨 값 튜플: 값}
+    """
+
+    def __init__(self, name, help_text, labelnames=(), function=None):
+        super().__init__(name, help_text, labelnames)
+        self.function = function
+        self._values = {}
+
+    def samples(self):
+        if self.function is None:
+            with self._lock:
+                return list(self._values.items())
+        try:
+            values = self.function()
+        except Exception as e:
+            print(f"지표 수집 오류 ({self.name}): {e}")
+            return []
+        if not self.labelnames:
+            return [((), values)]
+        return [(tuple(str(v) for v in key), value) for key, value in values.items()]
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in self.samples()]
+
+    def snapshot(self):
+        return [{"labels": self._labels_dict(key), "value": value} for key, value in self.samples()]
+
+
+class Counter(_ValueMetric):
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_ValueMetric):
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # 라벨 값 튜플 -> [구간별 개수(누적 아님) ..., +Inf 구간, 합계]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        """[(라벨 값 튜플, [(구간 상한, 누적 개수), ...], 합계, 개수), ...]"""
+        with self._lock:
+            series = [(key, list(values)) for key, values in self._series.items()]
+        result = []
+        for key, values in series:
+            cumulative = []
+            total = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                total += count
+                cumulative.append((bound, total))
+            result.append((key, cumulative, values[-1], total))
+        return result
+
+    def render(self):
+        lines = []
+        for key, cumulative, total_sum, count in self.samples():
+            for bound, cum in cumulative:
+                le = ("le", _format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cum}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def snapshot(self):
+        result = []
+        for key, cumulative, total_sum, count in self.samples():
+            result.append({
+                "labels": self._labels_dict(key),
+                "count": count,
+                "sum": total_sum,
+                "avg": total_sum / count if count else 0.0,
+                "p50": self._quantile(cumulative, count, 0.5),
+                "p95": self._quantile(cumulative, count, 0.95),
+                "buckets": {_format_value(bound): cum for bound, cum in cumulative},
+            })
+        return result
+
+    @staticmethod
+    def _quantile(cumulative, count, q):
+        """구간 상한 기준 분위수 추정 (해당 분위가 속한 구간의 상한)"""
+        if not count:
+            return None
+        target = q * count
+        for bound, cum in cumulative:
+            if cum >= target:
+                return bound if bound != float("inf") else None
+        return None
+
+
+class MetricsRegistry:
+    """지표 저장소 (같은 이름으로 다시 요청하면 기존 지표 반환)"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name}은(는) 이미 {metric.type_name}로 등록되어 있습니다")
+            return metric
+
+    def counter(self, name, help_text, labelnames=(), function=None):
+        counter = self._get_or_create(Counter, name, help_text, labelnames)
+        if function is not None:
+            counter.function = function
+        return counter
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets)
+
+    def gauge(self, name, help_text, labelnames=(), function=None):
+        gauge = self._get_or_create(Gauge, name, help_text, labelnames)
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    def _all(self):
+        with self._lock:
+            return sorted(self._metrics.values(), key=lambda m: m.name)
+
+    def render_prometheus(self):
+        """Prometheus 텍스트 형식 (version 0.0.4)"""
+        lines = []
+        for metric in self._all():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        return {
+            metric.name: {"type": metric.type_name, "help": metric.help, "samples": metric.snapshot()}
+            for metric in self._all()
+        }
+
+
+REGISTRY = MetricsRegistry()
+
+
+class MetricsServer:
+    """
+    지표 HTTP 서버 (백그라운드 스레드)
+    GET /metrics: Prometheus 텍스트, GET /metrics.json: JSON
+    """
+
+    def __init__(self, host, port, registry=REGISTRY):
+        self.host = host
+        self.port = port
+        self.registry = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body = registry.render_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body = json.dumps(registry.snapshot(), ensure_ascii=False).encode("utf-8")
+                    content_type = "application/json; charset=utf-8"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # 요청마다 stdout에 출력하지 않음
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        print(f"✓ 지표 서버 대기 중: http://{self.host}:{self.port}/metrics")
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
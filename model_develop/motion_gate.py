@@ -0,0 +1,88 @@
+"""
+움직임 기반 추론 게이트
+
+축소한 흑백 프레임을 마지막으로 추론한 프레임과 비교하여
+장면에 변화가 없으면 YOLO 추론을 건너뜁니다.
+천천히 퍼지는 연기를 놓치지 않도록 최소 추론 주기는 항상 보장합니다.
+"""
+import threading
+import time
+
+import cv2
+
+
+class MotionGate:
+    """
+    Args:
+        width: 비교용 축소 프레임 너비 (높이는 비율 유지)
+        pixel_threshold: 픽셀 밝기 차이가 이 값 이상이면 '변화'로 판단
+        motion_ratio: 변화 픽셀 비율이 이 값 이상이면 추론 실행
+        max_skip_interval: 이 시간(초) 동안 추론이 없었다면 변화가 없어도 강제로 실행
+    """
+
+    def __init__(self, width=160, pixel_threshold=25, motion_ratio=0.005, max_skip_interval=1.0):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.motion_ratio = motion_ratio
+        self.max_skip_interval = max_skip_interval
+
+        self._reference = None  # 마지막 추론 프레임 (축소 흑백)
+        self._last_infer_time = 0.0
+        self._lock = threading.Lock()
+
+        self.motion_runs = 0  # 변화 감지로 실행
+        self.forced_runs = 0  # 최소 추론 주기로 강제 실행
+        self.skipped = 0  # 추론 생략
+        self.last_score = 0.0
+
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        height = max(1, int(h * self.width / w))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def score(self, gray):
+        """기준 프레임 대비 변화한 픽셀 비율 (0.0 ~ 1.0)"""
+        if self._reference is None or self._reference.shape != gray.shape:
+            return 1.0
+        diff = cv2.absdiff(gray, self._reference)
+        changed = cv2.countNonZero(cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)[1])
+        return changed / diff.size
+
+    def should_infer(self, frame, now=None):
+        """
+        이번 프레임에서 추론을 실행해야 하는지 판단
+        Returns:
+            (실행 여부, 사유: "motion" | "forced" | "skip")
+        """
+        now = time.monotonic() if now is None else now
+        gray = self._prepare(frame)
+
+        with self._lock:
+            self.last_score = self.score(gray)
+            if self.last_score >= self.motion_ratio:
+                reason = "motion"
+                self.motion_runs += 1
+            elif now - self._last_infer_time >= self.max_skip_interval:
+                reason = "forced"
+                self.forced_runs += 1
+            else:
+                self.skipped += 1
+                return False, "skip"
+
+            # 추론한 프레임을 새 기준으로 사용 (천천히 변하는 장면도 누적 차이로 감지)
+            self._reference = gray
+            self._last_infer_time = now
+            return True, reason
+
+    def stats(self):
+        with self._lock:
+            total = self.motion_runs + self.forced_runs + self.skipped
+            return {
+                "motion_runs": self.motion_runs,
+                "forced_runs": self.forced_runs,
+                "skipped": self.skipped,
+                "skip_ratio": self.skipped / total if total else 0.0,
+                "last_score": self.last_score,
+            }
@@ -0,0 +1,522 @@
+"""
+멀티 프로세스 추론 (공유 메모리 프레임 링)
+
+한 프로세스에서는 화재 / 동물 모델 추론이 같은 인터프리터를 나눠 써야 하므로,
+모델마다 별도 워커 프로세스를 두어 각자 코어를 사용하게 합니다.
+- 메인 프로세스(캡처)가 프레임을 카메라별 공유 메모리 링의 빈 슬롯에 한 번 복사
+- 워커는 같은 공유 메모리를 numpy 배열로 바로 읽어(zero-copy) 추론하고 감지 레코드 배열만 돌려보냄
+- 화재 결과가 오면 동물 결과를 기다리지 않고 바로 후처리 (느린 동물 모델과 분리)
+  늦게 도착한 동물 결과는 해당 카메라의 다음 프레임 후처리에 반영
+- 두 워커가 동시에 모델을 불러오고, 화재 워커만 준비되면 감지를 시작 (동물 워커는 준비되는 대로 사용)
+- 워커는 스레드가 시작되기 전에 fork해 둔 런처 프로세스가 다시 fork해서 만듦
+  (감지 중인 메인 프로세스에서 fork하면 다른 스레드가 잡고 있던 잠금이 자식에서 영원히 잠긴 채로 남음)
+- 워커가 죽거나 응답이 없으면(하트비트 / 결과가 WORKER_HANG_TIMEOUT 동안 없음) 진행 중이던 요청을 정리하고
+  다시 시작 (WORKER_MAX_RESTARTS회 초과 시 화재 워커는 예외)
+- 워커마다 추론 스레드 수를 제한해 두 워커가 같은 코어를 두고 다투지 않게 함
+"""
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import signal
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from backends import load_model
+from detector import INFERENCE_SECONDS
+from pipeline import StageStats
+from postprocess import build_class_mask, extract_detections
+
+RING_SLOTS = 4  # 카메라별 슬롯 수 (쓰는 중 1 + 화재 추론 중 1 + 동물 추론 중 1 + 여유)
+WORKER_MAX_BATCH = 8  # 워커가 한 번에 모아 추론할 최대 요청 수 (카메라 여러 대)
+ROLES = ("fire", "animal")
+WORKER_MAX_RESTARTS = 3  # 역할별 워커 재시작 최대 횟수
+WORKER_START_TIMEOUT = 300.0  # 모델 로딩 + 워밍업 제한 시간 (초, 내보내기 포함)
+WORKER_HEARTBEAT_INTERVAL = 2.0  # 요청이 없을 때 워커가 살아 있음을 알리는 간격 (초)
+WORKER_HANG_TIMEOUT = 30.0  # 준비된 워커에서 이 시간 동안 아무 메시지도 없으면 멈춘 것으로 보고 종료 (초)
+
+
+def default_worker_threads(workers=len(ROLES)):
+    """워커 하나가 쓸 추론 스레드 수 (코어를 워커 수로 나눔)"""
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+class SharedFrameRing:
+    """
+    카메라 하나의 공유 메모리 프레임 링 (메인 프로세스가 생성, 쓰기 전용)
+    슬롯별 참조 수를 메인 프로세스에서만 관리하므로 별도의 프로세스 간 잠금이 필요 없음
+    """
+
+    def __init__(self, shape, slots=RING_SLOTS):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * int(np.prod(self.shape)))
+        self.frames = np.ndarray((slots, *self.shape), dtype=np.uint8, buffer=self.shm.buf)
+        self.refs = [0] * slots
+        self._next = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def acquire(self):
+        """참조가 없는 슬롯 번호 (없으면 None)"""
+        for n in range(self.slots):
+            slot = (self._next + n) % self.slots
+            if self.refs[slot] == 0:
+                self._next = (slot + 1) % self.slots
+                return slot
+        return None
+
+    def write(self, slot, frame):
+        np.copyto(self.frames[slot], frame)
+
+    def close(self):
+        self.frames = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _attach(name, shape, slots):
+    """워커 프로세스에서 메인 프로세스의 프레임 링 연결 (복사 없이 numpy 배열로 접근)"""
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray((slots, *shape), dtype=np.uint8, buffer=shm.buf)
+
+
+def model_worker(role, weights, backend, int8, calibration, target_classes, requests, results,
+                 warm_up_batch=1, threads=None, generation=0):
+    """
+    모델 워커 프로세스 본체
+    requests: (job_id, 링 이름, 프레임 shape, 슬롯 수, 슬롯, (신뢰도, 입력 크기, 대상 클래스)) 또는 종료 신호 None
+              추론 옵션은 실행 중 설정(RuntimeConfig) 값으로, None이면 시작 시 값 사용
+    results: ("ready", role, 클래스 이름, 로딩 시간, 워밍업 시간, generation) / ("error", role, 메시지, generation)
+             ("heartbeat", role, generation) / ("result", role, job_id, 감지 레코드 배열, 추론 시간)
+    warm_up_batch: 워밍업 배치 크기 (카메라 수)
+    threads: 추론 스레드 수 (None이면 라이브러리 기본값 - 워커마다 모든 코어를 쓰려고 해 서로 다툼)
+    generation: 재시작 횟수 (재시작 전 워커가 남긴 상태 메시지를 구분)
+    """
+    # Ctrl+C는 메인 프로세스가 받아 종료 신호를 보냄
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+    try:
+        start = time.perf_counter()
+        model = load_model(weights, backend, int8, calibration)
+        load_sec = time.perf_counter() - start
+        start = time.perf_counter()
+        # 워커는 공유 메모리 프레임(이미지 목록)으로 추론하므로 같은 형태로 워밍업
+        for _ in range(2):
+            model([np.zeros((480, 640, 3), dtype=np.uint8)] * warm_up_batch, verbose=False)
+        warm_sec = time.perf_counter() - start
+    except Exception as e:
+        results.put(("error", role, str(e), generation))
+        return
+    mask_classes = tuple(target_classes)
+    class_mask = build_class_mask(model.names, mask_classes)
+    results.put(("ready", role, model.names, load_sec, warm_sec, generation))
+
+    rings = {}
+    try:
+        while True:
+            try:
+                request = requests.get(timeout=WORKER_HEARTBEAT_INTERVAL)
+            except queue.Empty:
+                results.put(("heartbeat", role, generation))
+                continue
+            if request is None:
+                return
+
+            # 밀려 있는 요청(다른 카메라)을 모아 한 번에 추론
+            batch = [request]
+            stop = False
+            while len(batch) < WORKER_MAX_BATCH:
+                try:
+                    request = requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+
+            frames = []
+            for _, name, shape, slots, slot, _ in batch:
+                if name not in rings:
+                    rings[name] = _attach(name, shape, slots)
+                frames.append(rings[name][1][slot])
+
+            # 배치 안에서는 가장 먼저 들어온 요청의 옵션으로 추론
+            kwargs = {}
+            options = batch[0][5]
+            if options is not None:
+                conf, imgsz, classes = options
+                kwargs = {"conf": conf, "imgsz": imgsz}
+                if classes != mask_classes:
+                    mask_classes = classes
+                    class_mask = build_class_mask(model.names, classes)
+
+            start = time.perf_counter()
+            outputs = model(frames, verbose=False, **kwargs)
+            elapsed = time.perf_counter() - start
+            for (job_id, *_), result in zip(batch, outputs):
+                results.put(("result", role, job_id, extract_detections(result, class_mask), elapsed))
+
+            if stop:
+                return
+    finally:
+        for shm, _ in rings.values():
+            shm.close()
+
+
+def worker_launcher(conn, specs, request_queues, results, warm_up_batch, threads):
+    """
+    워커 런처 프로세스 본체 (메인 프로세스가 스레드를 시작하기 전에 fork)
+    conn으로 ("start", role, generation)을 받으면 자신을 fork해 모델 워커를 만들고
+    ("started", role, generation, pid) / ("exited", role, generation, exit code)를 알림, None이면 종료
+    런처는 스레드를 만들지 않으므로(mp.Queue에 넣지 않음) 언제 fork해도 안전
+    request_queues: {role: [세대별 요청 큐, ...]} (런처를 만들기 전에 모두 만들어 물려받음)
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    ctx = mp.get_context("fork")
+    children = {}  # (role, generation) -> Process
+    try:
+        while True:
+            if conn.poll(0.5):
+                command = conn.recv()
+                if command is None:
+                    return
+                _, role, generation = command
+                worker = ctx.Process(
+                    target=model_worker,
+                    args=(role, *specs[role], request_queues[role][generation], results,
+                          warm_up_batch, threads, generation),
+                    name=f"{role}-worker",
+                    daemon=True,
+                )
+                worker.start()
+                children[(role, generation)] = worker
+                conn.send(("started", role, generation, worker.pid))
+            for key, worker in list(children.items()):
+                if not worker.is_alive():  # 종료된 워커 회수
+                    del children[key]
+                    conn.send(("exited", *key, worker.exitcode))
+    except (EOFError, OSError):
+        return  # 메인 프로세스 종료
+    finally:
+        for worker in children.values():
+            worker.join(3.0)
+            if worker.is_alive():
+                worker.terminate()
+
+
+class _Job:
+    __slots__ = ("camera", "captured", "slot", "pending", "fire_dets", "animal_dets", "submitted")
+
+    def __init__(self, camera, captured, slot, pending):
+        self.camera = camera
+        self.captured = captured
+        self.slot = slot
+        self.pending = pending  # 아직 결과가 오지 않은 역할 {"fire", "animal"}
+        self.fire_dets = None
+        self.animal_dets = None
+        self.submitted = time.perf_counter()
+
+
+class MultiProcessInference:
+    """
+    화재 / 동물 모델 워커 프로세스와 카메라별 공유 메모리 링 관리
+    Args:
+        specs: {"fire": (weights, backend, int8, calibration, target_classes), "animal": (...)}
+        warm_up_batch: 워밍업 배치 크기 (카메라 수)
+        threads: 워커별 추론 스레드 수 (None이면 코어 수 / 워커 수)
+        on_ready: 워커 준비 시 on_ready(role, 클래스 이름, 로딩 시간, 워밍업 시간) 호출
+                  (늦게 준비된 동물 워커는 poll() 중에 호출됨)
+    """
+
+    def __init__(self, specs, slots=RING_SLOTS, warm_up_batch=1, on_ready=None, threads=None):
+        # main.py는 모듈 최상단에서 실행되는 스크립트라 spawn / forkserver 방식은 자식에서 main.py 전체를 다시 실행함
+        # 카메라 / 네트워크 스레드를 시작하기 전에 런처를 fork해 두고, 워커(재시작 포함)는 런처가 fork
+        ctx = mp.get_context("fork")
+        # 워커가 메인 프로세스의 resource tracker를 공유하도록 fork 전에 시작
+        # (워커마다 따로 생기면 워커 종료 시 공유 메모리를 먼저 지워버림)
+        resource_tracker.ensure_running()
+        self.slots = slots
+        self._results = ctx.Queue()
+        # 재시작한 워커는 새 요청 큐를 사용 (죽은 워커가 남긴 요청은 이미 정리한 슬롯을 가리킴)
+        self._request_queues = {role: [ctx.Queue() for _ in range(WORKER_MAX_RESTARTS + 1)] for role in ROLES}
+        self._launcher_conn, launcher_conn = ctx.Pipe()
+        self._launcher = ctx.Process(
+            target=worker_launcher,
+            args=(launcher_conn, specs, self._request_queues, self._results, warm_up_batch,
+                  threads or default_worker_threads()),
+            name="worker-launcher",
+        )
+        self._launcher.start()
+        launcher_conn.close()
+
+        self.restarts = {role: 0 for role in ROLES}  # 현재 워커의 세대 (재시작 횟수)
+        self._pids = {role: None for role in ROLES}
+        self._started_at = {}  # role -> 현재 워커 시작 요청 시각 (monotonic)
+        self._last_seen = {}  # role -> 현재 워커의 마지막 메시지 시각 (monotonic)
+        self._exited = {}  # role -> 현재 워커의 종료 코드 (런처가 알려줌)
+        self._given_up = set()  # 재시작 횟수를 넘어 더 이상 실행하지 않는 역할
+        self._closing = False
+        for role in ROLES:
+            self._start_worker(role)
+
+        self.on_ready = on_ready
+        self.names = {}  # 준비된 워커의 클래스 이름
+        self.rings = {}  # camera -> SharedFrameRing
+        self._jobs = {}  # job_id -> _Job
+        self._ids = itertools.count()
+        self._busy = {role: set() for role in ROLES}  # 역할별 추론 중인 카메라
+        self._late_animal = {}  # camera -> 화재 결과보다 늦게 도착한 동물 감지 결과
+        self._ready = []  # 추론 없이 바로 후처리할 항목
+
+        self.infer_stats = {role: StageStats(role) for role in ROLES}  # 워커 내 추론 시간
+        self.roundtrip_stats = {role: StageStats(role) for role in ROLES}  # 요청 ~ 결과 수신
+        self.dropped = 0
+
+    def _requests(self, role):
+        return self._request_queues[role][self.restarts[role]]
+
+    def _start_worker(self, role):
+        self._started_at[role] = time.monotonic()
+        self._pids[role] = None
+        self._launcher_conn.send(("start", role, self.restarts[role]))
+
+    def _read_launcher(self):
+        """런처가 알린 워커 시작(pid) / 종료 처리"""
+        while self._launcher_conn.poll():
+            kind, role, generation, value = self._launcher_conn.recv()
+            if generation != self.restarts[role]:
+                continue  # 이미 교체한 워커
+            if kind == "started":
+                self._pids[role] = value
+            else:
+                self._exited[role] = value
+
+    def _check_workers(self):
+        """
+        죽었거나 응답이 없는 워커 처리: 진행 중이던 요청과 슬롯 참조, busy 표시를 정리하고 워커를 다시 시작
+        (정리하지 않으면 busy가 풀리지 않아 해당 카메라의 감지가 조용히 멈춤)
+        Raises:
+            RuntimeError: 런처가 죽었거나 화재 워커가 WORKER_MAX_RESTARTS회를 넘어 죽은 경우
+        """
+        if self._closing:
+            return
+        if not self._launcher.is_alive():
+            raise RuntimeError(f"워커 런처 프로세스 종료됨 (exit code {self._launcher.exitcode})")
+        self._read_launcher()
+        now = time.monotonic()
+        for role in ROLES:
+            if role in self._given_up:
+                continue
+            if role in self._exited:
+                reason = f"exit code {self._exited[role]}"
+            elif role in self.names and now - self._last_seen.get(role, now) > WORKER_HANG_TIMEOUT:
+                reason = f"{WORKER_HANG_TIMEOUT:g}초 동안 응답 없음"
+            elif role not in self.names and now - self._started_at[role] > WORKER_START_TIMEOUT:
+                reason = f"{WORKER_START_TIMEOUT:g}초 내 준비되지 않음"
+            else:
+                continue
+            self._worker_lost(role, reason)
+
+    def _worker_lost(self, role, reason):
+        pid = self._pids[role]
+        print(f"✗ {role} 모델 워커 중단 (pid {pid}, {reason})")
+        if role not in self._exited and pid is not None:
+            try:
+                os.kill(pid, signal.SIGKILL)  # 멈춘 워커 (종료는 런처가 회수)
+            except ProcessLookupError:
+                pass
+        self._exited.pop(role, None)
+        self.names.pop(role, None)
+        self._busy[role].clear()
+        for job_id, job in list(self._jobs.items()):
+            if role not in job.pending:
+                continue
+            job.pending.discard(role)
+            self.rings[job.camera].refs[job.slot] -= 1
+            if not job.pending:
+                del self._jobs[job_id]
+
+        if self.restarts[role] >= WORKER_MAX_RESTARTS:
+            if role == "fire":
+                raise RuntimeError(f"화재 모델 워커가 {WORKER_MAX_RESTARTS}회 재시작 후에도 중단됨 ({reason})")
+            print("✗ 동물 모델 워커 재시작 횟수 초과 - 동물 감지 중단")
+            self._given_up.add(role)
+            return
+        self.restarts[role] += 1
+        print(f"  {role} 모델 워커 재시작 ({self.restarts[role]}/{WORKER_MAX_RESTARTS})")
+        self._start_worker(role)
+
+    def _handle_status(self, message):
+        """워커 준비 / 오류 / 하트비트 메시지 처리 (교체된 워커가 남긴 메시지는 무시)"""
+        kind, role, generation = message[0], message[1], message[-1]
+        if generation != self.restarts[role]:
+            return
+        self._last_seen[role] = time.monotonic()
+        if kind == "ready":
+            _, role, names, load_sec, warm_sec, _ = message
+            self.names[role] = names
+            if self.on_ready is not None:
+                self.on_ready(role, names, load_sec, warm_sec)
+        elif kind == "error":
+            print(f"✗ {role} 모델 워커 오류: {message[2]}")
+
+    def ready(self, role):
+        return role in self.names
+
+    def wait_ready(self, roles=ROLES, timeout=WORKER_START_TIMEOUT):
+        """
+        지정한 워커들의 모델 로딩이 끝날 때까지 대기하고 클래스 이름 수집
+        (나머지 워커의 준비 메시지는 poll()에서 처리)
+        """
+        deadline = time.monotonic() + timeout
+        while not all(role in self.names for role in roles):
+            try:
+                message = self._results.get(timeout=1.0)
+            except queue.Empty:
+                self._read_launcher()
+                dead = [role for role in roles if role in self._exited]
+                if dead or not self._launcher.is_alive() or time.monotonic() > deadline:
+                    raise RuntimeError(f"모델 워커 시작 실패: {', '.join(dead) or '시간 초과'}")
+                continue
+            if message[0] == "error" and message[1] in roles:
+                raise RuntimeError(f"{message[1]} 모델 워커 오류: {message[2]}")
+            self._handle_status(message)
+        return self.names
+
+    def busy(self, camera):
+        """
+        화재 추론이 진행 중인 카메라면 True (새 프레임은 버리고 최신 프레임만 보냄)
+        화재 워커가 재시작 중일 때도 True (직전 화재 결과를 재사용한 후처리를 막음)
+        """
+        return camera in self._busy["fire"] or "fire" not in self.names
+
+    def _ring_for(self, camera, shape):
+        ring = self.rings.get(camera)
+        if ring is not None and ring.shape != tuple(shape) and not any(ring.refs):
+            # 해상도가 바뀐 카메라: 워커가 쓰는 슬롯이 없을 때 링을 새로 만듦
+            ring.close()
+            ring = None
+        if ring is None:
+            ring = self.rings[camera] = SharedFrameRing(shape, self.slots)
+        return ring
+
+    def submit(self, camera, captured, run_fire, run_animal, settings=None):
+        """
+        프레임 추론 요청 (동물 모델이 아직 준비 중이거나 이전 프레임을 처리 중이면 동물 추론은 생략)
+        settings: 실행 중 설정 (DetectorSettings) - 신뢰도 / 입력 크기 / 대상 클래스를 워커에 전달
+        Returns:
+            요청 여부
+        """
+        if run_animal and ("animal" not in self.names or camera in self._busy["animal"]):
+            run_animal = False
+        if not run_fire and not run_animal:
+            self._ready.append((camera, captured, None, self._late_animal.pop(camera, None)))
+            return True
+
+        ring = self._ring_for(camera, captured.frame.shape)
+        slot = ring.acquire() if captured.frame.shape == ring.shape else None
+        if slot is None:
+            self.dropped += 1
+            return False
+        ring.write(slot, captured.frame)
+
+        pending = set()
+        if run_fire:
+            pending.add("fire")
+        if run_animal:
+            pending.add("animal")
+        job_id = next(self._ids)
+        self._jobs[job_id] = _Job(camera, captured, slot, pending)
+        ring.refs[slot] = len(pending)
+        for role in pending:
+            options = None
+            if settings is not None:
+                options = ((settings.fire_conf, settings.imgsz, settings.fire_classes) if role == "fire"
+                           else (settings.animal_conf, settings.imgsz, settings.animal_classes))
+            self._busy[role].add(camera)
+            self._requests(role).put((job_id, ring.name, ring.shape, ring.slots, slot, options))
+        return True
+
+    def poll(self, timeout=0.0):
+        """
+        도착한 결과를 모아 후처리할 항목 반환
+        Returns:
+            [(camera, CapturedFrame, 화재 감지 배열 또는 None, 동물 감지 배열 또는 None), ...]
+        """
+        self._check_workers()
+        ready, self._ready = self._ready, []
+        block = not ready and timeout > 0
+        while True:
+            try:
+                message = self._results.get(timeout=timeout) if block else self._results.get_nowait()
+            except queue.Empty:
+                break
+            block = False
+            if message[0] != "result":
+                self._handle_status(message)
+                continue
+
+            _, role, job_id, dets, elapsed = message
+            job = self._jobs.get(job_id)
+            if job is None or role not in job.pending:
+                continue  # 워커가 죽기 직전에 보낸 결과 (이미 정리한 요청)
+            job.pending.discard(role)
+            self._last_seen[role] = time.monotonic()
+            self._busy[role].discard(job.camera)
+            self.infer_stats[role].record(elapsed)
+            INFERENCE_SECONDS.observe(elapsed, model=role)
+            self.roundtrip_stats[role].record(time.perf_counter() - job.submitted)
+            self.rings[job.camera].refs[job.slot] -= 1
+
+            if role == "animal":
+                if "fire" in job.pending:
+                    job.animal_dets = dets
+                else:
+                    # 화재 결과로 이미 후처리된 프레임: 다음 프레임에 반영
+                    self._late_animal[job.camera] = dets
+            else:
+                animal = job.animal_dets
+                if animal is None:
+                    animal = self._late_animal.pop(job.camera, None)
+                ready.append((job.camera, job.captured, dets, animal))
+
+            if not job.pending:
+                del self._jobs[job_id]
+        return ready
+
+    def format_stats(self):
+        lines = []
+        for role in ROLES:
+            infer = self.infer_stats[role].snapshot()
+            trip = self.roundtrip_stats[role].snapshot()
+            state = "DEAD" if role in self._given_up else "ready" if role in self.names else "starting"
+            lines.append(f"  {role:<12} infer {infer['avg_ms']:6.1f}ms | roundtrip {trip['avg_ms']:6.1f}ms"
+                         f" | n={infer['count']} | pid {self._pids[role]} ({state})"
+                         f" | restarts {self.restarts[role]}")
+        lines.append(f"  shm ring     {len(self.rings)} cams x {self.slots} slots | busy drop {self.dropped}")
+        return "\n".join(lines)
+
+    def close(self, timeout=3.0):
+        self._closing = True
+        for role in ROLES:
+            self._requests(role).put(None)
+        # 런처가 워커 종료를 기다린 뒤(남아 있으면 강제 종료) 끝남
+        try:
+            self._launcher_conn.send(None)
+        except OSError:
+            pass
+        self._launcher.join(timeout + 3.0)
+        if self._launcher.is_alive():
+            self._launcher.terminate()
+        for ring in self.rings.values():
+            ring.close()
+        self.rings.clear()
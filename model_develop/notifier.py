@@ -0,0 +1,161 @@
+"""
+화재 알림 전송기 (백그라운드 스레드)
+
+감지 루프에서 백엔드 알림 API를 직접 호출하지 않고 큐에 넣기만 합니다.
+전송 스레드가 연결을 재사용하는 HTTP 세션으로 제한 시간 / 재시도(지수 백오프)를 적용해 전송하며,
+같은 알림이 짧은 시간 안에 반복되면 한 번만 보냅니다.
+(중복 판단 기준은 전송에 성공한 시각 - 전송 중에는 같은 알림을 다시 접수하지 않고, 최종 실패하면 바로 다시 접수)
+"""
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from pipeline import StageStats
+
+
+class NotificationDispatcher:
+    """
+    Args:
+        url: 알림 API 주소 (POST)
+        timeout: (연결, 응답) 제한 시간 (초)
+        max_retries: 실패 시 재시도 횟수
+        backoff: 첫 재시도 대기 시간 (초), 재시도마다 2배
+        dedupe_window: 같은 key의 알림을 다시 보내지 않는 시간 (초)
+        max_queue: 대기 알림 수 상한 (초과 시 버림)
+    """
+
+    def __init__(self, url, timeout=(3.05, 5.0), max_retries=3, backoff=1.0,
+                 dedupe_window=30.0, max_queue=16):
+        self.url = url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.dedupe_window = dedupe_window
+
+        # 연결을 재사용하는 세션 (알림마다 TCP 연결을 새로 맺지 않음)
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+        self._queue = queue.Queue(max_queue)
+        self._last_sent = {}  # key -> 마지막으로 전송에 성공한 시각, 전송 중이면 접수 시각 (monotonic)
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = None
+
+        self.latency = StageStats("notify")  # 접수부터 전송 완료까지
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.deduped = 0
+        self.dropped = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+        self._thread.start()
+        return self
+
+    def notify(self, key="fire"):
+        """
+        알림 전송 요청 (감지 루프에서 호출, 대기하지 않음)
+        Returns:
+            접수 여부 (중복 / 큐 초과 / 종료 시 False)
+        """
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_sent.get(key)
+            if last is not None and now - last < self.dedupe_window:
+                self.deduped += 1
+                return False
+            self._last_sent[key] = now
+
+        if self._closed.is_set():
+            self._release(key, now)
+            return False
+        try:
+            self._queue.put_nowait((key, now))
+        except queue.Full:
+            self.dropped += 1
+            self._release(key, now)
+            return False
+        return True
+
+    def _release(self, key, queued_at):
+        """보내지 못한 알림의 중복 방지 기록 삭제 (다음 알림을 바로 접수하도록)"""
+        with self._lock:
+            if self._last_sent.get(key) == queued_at:
+                del self._last_sent[key]
+
+    def _post(self):
+        """한 번 전송 시도. Returns: (성공 여부, 재시도 가치 여부, 설명)"""
+        try:
+            response = self.session.post(self.url, timeout=self.timeout)
+        except requests.RequestException as e:
+            return False, True, str(e)
+        if response.status_code == 200:
+            return True, False, "200"
+        # 4xx는 다시 보내도 같은 결과이므로 재시도하지 않음
+        return False, response.status_code >= 500, str(response.status_code)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            key, queued_at = item
+
+            for attempt in range(self.max_retries + 1):
+                ok, retryable, detail = self._post()
+                if ok:
+                    with self._lock:
+                        self._last_sent[key] = time.monotonic()
+                    self.sent += 1
+                    self.latency.record(time.monotonic() - queued_at)
+                    print(f"✓ 화재 알림 전송 성공 ({key})")
+                    break
+                if not retryable or attempt == self.max_retries or self._closed.is_set():
+                    self.failed += 1
+                    self.latency.errors += 1
+                    self._release(key, queued_at)
+                    print(f"✗ 화재 알림 전송 실패 ({key}): {detail}")
+                    break
+                self.retries += 1
+                delay = self.backoff * (2 ** attempt)
+                print(f"✗ 화재 알림 전송 실패 ({key}): {detail}, {delay:g}초 후 재시도")
+                if self._closed.wait(delay):
+                    self.failed += 1
+                    self._release(key, queued_at)
+                    break
+
+    def stats(self):
+        lat = self.latency.snapshot()
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "deduped": self.deduped,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "avg_ms": lat["avg_ms"],
+            "max_ms": lat["max_ms"],
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"  notify       avg {s['avg_ms']:6.0f}ms | max {s['max_ms']:6.0f}ms"
+                f" | sent {s['sent']} | fail {s['failed']} | retry {s['retries']}"
+                f" | dedupe {s['deduped']} | queued {s['queued']}")
+
+    def close(self, timeout=2.0):
+        """대기 중인 알림을 timeout 동안 마저 보내고 종료"""
+        self._closed.set()
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.session.close()
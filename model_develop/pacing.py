@@ -0,0 +1,97 @@
+"""
+목표 FPS 프레임 페이싱
+
+cv2.waitKey(30) 같은 고정 대기 대신 monotonic 시계 기준 마감 시각(deadline)으로 루프 간격을 맞춥니다.
+처리에 쓴 시간만큼 대기가 줄어들고, 늦어진 경우에는 밀린 프레임을 몰아서 처리하지 않고 기준을 다시 잡습니다.
+대기는 종료 이벤트로 깨울 수 있어 종료 신호가 오면 바로 반환합니다.
+"""
+import threading
+import time
+
+SPIN_MARGIN = 0.001  # 마감 직전 이 시간은 sleep 대신 짧게 양보하며 대기 (타이머 오차 보정)
+
+
+class FramePacer:
+    """
+    Args:
+        fps: 목표 FPS (0 이하이면 제한 없음 - 대기하지 않음)
+        stop_event: set 되면 대기를 즉시 중단하는 threading.Event
+    """
+
+    def __init__(self, fps=0.0, stop_event=None):
+        self.period = 1.0 / fps if fps > 0 else 0.0
+        self.stop_event = stop_event or threading.Event()
+        self._deadline = None
+        self._lock = threading.Lock()
+
+        self.ticks = 0
+        self.late = 0  # 마감 시각을 한 주기 이상 넘겨 기준을 다시 잡은 횟수
+        self._started = None
+
+    @property
+    def enabled(self):
+        return self.period > 0
+
+    def set_fps(self, fps):
+        """실행 중 목표 FPS 변경 (다음 대기부터 적용, 통계는 새로 시작)"""
+        with self._lock:
+            self.period = 1.0 / fps if fps > 0 else 0.0
+            self._deadline = None
+            self._started = None
+            self.ticks = 0
+            self.late = 0
+
+    def _advance(self, now):
+        """다음 마감 시각 계산 (한 주기 이상 밀렸으면 현재 시각 기준으로 재설정)"""
+        self.ticks += 1
+        if self._started is None:
+            self._started = now
+        if self._deadline is None or now - self._deadline > self.period:
+            if self._deadline is not None:
+                self.late += 1
+            self._deadline = now + self.period
+        else:
+            self._deadline += self.period
+
+    def ready(self):
+        """
+        대기 없이 마감 시각이 지났는지 확인 (지났으면 다음 주기로 넘어감)
+        폴링 루프에서 사용
+        """
+        if not self.enabled:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if self._deadline is not None and now < self._deadline:
+                return False
+            self._advance(now)
+            return True
+
+    def wait(self):
+        """
+        다음 마감 시각까지 대기
+        Returns:
+            종료 요청이 들어왔으면 False
+        """
+        if not self.enabled:
+            return not self.stop_event.is_set()
+        with self._lock:
+            deadline = self._deadline
+
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining > SPIN_MARGIN and self.stop_event.wait(remaining - SPIN_MARGIN):
+                return False
+            while time.monotonic() < deadline:
+                time.sleep(0)
+
+        with self._lock:
+            self._advance(time.monotonic())
+        return not self.stop_event.is_set()
+
+    def format_stats(self):
+        with self._lock:
+            elapsed = time.monotonic() - self._started if self._started is not None else 0.0
+            actual = (self.ticks - 1) / elapsed if elapsed > 0 else 0.0
+            return (f"  pacing       target {1.0 / self.period:5.1f}fps | actual {actual:5.1f}fps"
+                    f" | late {self.late}")
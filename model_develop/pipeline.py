@@ -0,0 +1,209 @@
+"""
+캡처 → 추론 → 후처리 → 전송 단계를 분리 실행하는 파이프라인
+
+각 단계는 별도 스레드에서 실행되고, 단계 사이는 크기가 제한된 큐로 연결됩니다.
+큐가 가득 차면 가장 오래된 항목을 버리므로(latest-frame-wins) 느린 단계가
+앞 단계를 막지 않고, 항상 최신 프레임을 처리합니다.
+"""
+import threading
+import time
+from collections import deque
+
+
+class QueueClosed(Exception):
+    """닫힌 큐에서 항목을 꺼내려 할 때 발생"""
+
+    pass
+
+
+class LatestQueue:
+    """
+    최신 항목 우선 bounded 큐 (thread-safe)
+    가득 찬 상태에서 put 하면 가장 오래된 항목을 버리고 dropped 카운트를 올립니다.
+    """
+
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, item):
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """
+        항목 하나를 꺼냄. timeout 동안 항목이 없으면 None 반환
+        큐가 닫혔고 비어있으면 QueueClosed 발생
+        """
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if self._items:
+                return self._items.popleft()
+            if self._closed:
+                raise QueueClosed()
+            return None
+
+    def get_nowait(self):
+        """대기 없이 꺼냄. 비어있으면 None"""
+        with self._cond:
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class StageStats:
+    """단계별 처리 시간 통계"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+        self.avg_time = 0.0  # 지수 이동 평균
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed):
+        with self._lock:
+            self.count += 1
+            self.total_time += elapsed
+            self.last_time = elapsed
+            self.max_time = max(self.max_time, elapsed)
+            if self.count == 1:
+                self.avg_time = elapsed
+            else:
+                self.avg_time = self.avg_time * 0.9 + elapsed * 0.1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "count": self.count,
+                "avg_ms": self.avg_time * 1000,
+                "max_ms": self.max_time * 1000,
+                "last_ms": self.last_time * 1000,
+                "errors": self.errors,
+            }
+
+
+class PipelineStage(threading.Thread):
+    """
+    파이프라인 단계 하나를 실행하는 스레드
+    - in_queue가 None이면 소스 단계: func()를 반복 호출
+    - 그 외: in_queue에서 꺼낸 항목으로 func(item) 호출
+    func가 None을 반환하면 다음 단계로 넘기지 않으며, 소스 단계에서는 파이프라인 종료 신호로 간주합니다.
+    """
+
+    def __init__(self, name, func, in_queue, out_queue, stop_event):
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.func = func
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stop_event = stop_event
+        self.stats = StageStats(name)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            item = None
+            if self.in_queue is not None:
+                try:
+                    item = self.in_queue.get(timeout=0.1)
+                except QueueClosed:
+                    break
+                if item is None:
+                    continue
+
+            start = time.perf_counter()
+            try:
+                result = self.func() if self.in_queue is None else self.func(item)
+            except Exception as e:
+                self.stats.errors += 1
+                print(f"[{self.stats.name}] 단계 오류: {e}")
+                continue
+            self.stats.record(time.perf_counter() - start)
+
+            if result is None:
+                if self.in_queue is None:
+                    # 소스 단계 종료 -> 파이프라인 전체 종료
+                    self.stop_event.set()
+                    break
+                continue
+            if self.out_queue is not None:
+                self.out_queue.put(result)
+
+        if self.out_queue is not None:
+            self.out_queue.close()
+
+
+class Pipeline:
+    """
+    단계 목록을 받아 스레드 파이프라인 구성
+    stages: [(이름, 함수), ...] - 첫 단계는 인자 없는 소스 함수
+    """
+
+    def __init__(self, stages, queue_size=1):
+        self.stop_event = threading.Event()
+        self.queues = []
+        self.stages = []
+
+        in_queue = None
+        for i, (name, func) in enumerate(stages):
+            out_queue = None
+            if i < len(stages) - 1:
+                out_queue = LatestQueue(queue_size)
+                self.queues.append(out_queue)
+            self.stages.append(
+                PipelineStage(name, func, in_queue, out_queue, self.stop_event)
+            )
+            in_queue = out_queue
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        self.stop_event.set()
+        for q in self.queues:
+            q.close()
+
+    def join(self, timeout=None):
+        for stage in self.stages:
+            stage.join(timeout)
+
+    def is_running(self):
+        return not self.stop_event.is_set()
+
+    def stats(self):
+        """단계별 통계 + 단계 입력 큐에서 버려진 프레임 수"""
+        result = {}
+        for i, stage in enumerate(self.stages):
+            snap = stage.stats.snapshot()
+            snap["dropped"] = self.queues[i - 1].dropped if i > 0 else 0
+            result[stage.stats.name] = snap
+        return result
+
+    def format_stats(self):
+        lines = []
+        for name, s in self.stats().items():
+            lines.append(
+                f"  {name:<12} avg {s['avg_ms']:6.1f}ms | max {s['max_ms']:6.1f}ms"
+                f" | n={s['count']} | drop={s['dropped']} | err={s['errors']}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,131 @@
+"""
+감지 결과 후처리 (NumPy 벡터화)
+
+YOLO 결과의 boxes 전체(cls / conf / xyxy)를 한 번에 NumPy 배열로 변환하고,
+미리 계산한 클래스 마스크로 대상 클래스만 걸러 compact한 레코드 배열로 만듭니다.
+박스 그리기, 이벤트 생성, 추적이 모두 같은 레코드 배열을 사용합니다.
+"""
+import cv2
+import numpy as np
+
+from preprocess import scale_boxes
+
+# 감지 레코드: 클래스 id, 신뢰도, 박스 좌표(원본 프레임 기준 정수 픽셀)
+DETECTION_DTYPE = np.dtype([
+    ("cls", np.int32),
+    ("conf", np.float32),
+    ("x1", np.int32),
+    ("y1", np.int32),
+    ("x2", np.int32),
+    ("y2", np.int32),
+])
+
+EMPTY_DETECTIONS = np.zeros(0, dtype=DETECTION_DTYPE)
+
+
+def build_class_mask(names, targets):
+    """
+    클래스 id -> 대상 여부 bool 배열 (대소문자 무시)
+    Args:
+        names: 모델의 클래스 이름 (dict{id: name} 또는 list)
+        targets: 대상 클래스 이름 목록
+    """
+    if isinstance(names, dict):
+        items = names.items()
+    else:
+        items = enumerate(names)
+    items = list(items)
+    targets = {t.lower() for t in targets}
+    mask = np.zeros(max((i for i, _ in items), default=-1) + 1, dtype=bool)
+    for i, name in items:
+        mask[i] = name.lower() in targets
+    return mask
+
+
+def build_label_table(names):
+    """클래스 id -> 표시용 대문자 라벨 목록"""
+    if isinstance(names, dict):
+        size = max(names, default=-1) + 1
+        return [names.get(i, str(i)).upper() for i in range(size)]
+    return [n.upper() for n in names]
+
+
+def _to_numpy(data):
+    # torch.Tensor (GPU/CPU) 또는 numpy 배열 모두 지원
+    if hasattr(data, "cpu"):
+        data = data.cpu().numpy()
+    return np.asarray(data)
+
+
+def extract_detections(result, class_mask, geometry=None):
+    """
+    YOLO 결과 하나에서 대상 클래스 감지 레코드 배열 추출
+    geometry: 공유 전처리 텐서로 추론한 경우 박스를 원본 프레임 좌표로 변환 (preprocess.FrameGeometry)
+    result가 이미 원본 좌표의 감지 레코드 배열이면(캐스케이드 결과) 대상 클래스만 걸러 반환
+    Returns:
+        DETECTION_DTYPE 구조체 배열 (대상 클래스가 없으면 길이 0)
+    """
+    if isinstance(result, np.ndarray):
+        if len(result) == 0:
+            return EMPTY_DETECTIONS
+        cls = result["cls"]
+        return result[(cls < len(class_mask)) & class_mask[np.minimum(cls, len(class_mask) - 1)]]
+
+    if result is None or result.boxes is None or len(result.boxes) == 0:
+        return EMPTY_DETECTIONS
+
+    # boxes.data: [N, 6] = x1, y1, x2, y2, conf, cls (추적 사용 시 track id 포함 7열)
+    data = _to_numpy(result.boxes.data)
+    cls = data[:, -1].astype(np.int32)
+
+    # 마스크 범위를 벗어난 클래스 id는 대상 아님
+    valid = cls < len(class_mask)
+    keep = np.zeros(len(cls), dtype=bool)
+    keep[valid] = class_mask[cls[valid]]
+    if not keep.any():
+        return EMPTY_DETECTIONS
+
+    data = data[keep]
+    dets = np.empty(len(data), dtype=DETECTION_DTYPE)
+    dets["cls"] = cls[keep]
+    dets["conf"] = data[:, -2]
+    xyxy = data[:, :4]
+    if geometry is not None:
+        xyxy = scale_boxes(xyxy, geometry)
+    xyxy = xyxy.astype(np.int32)
+    dets["x1"], dets["y1"], dets["x2"], dets["y2"] = xyxy.T
+    return dets
+
+
+def box_iou(a, b):
+    """감지 레코드 배열 a[N], b[M] 사이의 IoU 행렬 [N, M]"""
+    ax1, ay1, ax2, ay2 = (a[k][:, None].astype(np.float32) for k in ("x1", "y1", "x2", "y2"))
+    bx1, by1, bx2, by2 = (b[k][None, :].astype(np.float32) for k in ("x1", "y1", "x2", "y2"))
+    iw = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    ih = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    inter = iw * ih
+    union = (ax2 - ax1) * (ay2 - ay1) + (bx2 - bx1) * (by2 - by1) - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+def round_confidence(conf):
+    """신뢰도를 소수 둘째 자리로 올림 (기존 math.ceil(conf * 100) / 100 과 동일)"""
+    return np.ceil(np.asarray(conf, dtype=np.float64) * 100) / 100
+
+
+def draw_detections(frame, dets, labels, color, track_ids=None):
+    """
+    감지 레코드 배열의 박스와 라벨을 프레임에 그림
+    track_ids: 추적 id 목록 (있으면 라벨에 #id 표시)
+    """
+    if len(dets) == 0:
+        return
+    confs = round_confidence(dets["conf"])
+    if track_ids is None:
+        track_ids = [None] * len(dets)
+    for det, conf, track_id in zip(dets.tolist(), confs.tolist(), track_ids):
+        cls_id, _, x1, y1, x2, y2 = det
+        label = labels[cls_id] if track_id is None else f"{labels[cls_id]} #{track_id}"
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(frame, f"{label} {conf}", (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
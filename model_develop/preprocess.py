@@ -0,0 +1,78 @@
+"""
+YOLO 입력 전처리 공유 (프레임당 1회)
+
+화재 모델과 동물 모델에 같은 프레임을 각각 넘기면 ultralytics가 리사이즈 / 레터박스 /
+정규화 / 텐서 변환을 모델마다 반복합니다. 여기서 배치 입력 텐서를 한 번만 만들어 두 모델에 같이 넘기고,
+감지 박스를 원본 프레임 좌표로 되돌리는 변환도 감지 레코드 배열에 한 번만 적용합니다.
+"""
+import cv2
+import numpy as np
+import torch
+
+DEFAULT_IMGSZ = 640
+STRIDE = 32  # YOLO 입력 크기는 stride의 배수여야 함
+PAD_VALUE = 114  # ultralytics 레터박스와 같은 회색 패딩
+
+
+class FrameGeometry:
+    """원본 프레임 -> 입력 텐서 변환 정보 (박스 좌표 복원용)"""
+
+    __slots__ = ("scale", "pad_x", "pad_y", "width", "height")
+
+    def __init__(self, scale, pad_x, pad_y, width, height):
+        self.scale = scale
+        self.pad_x = pad_x
+        self.pad_y = pad_y
+        self.width = width  # 원본 프레임 크기
+        self.height = height
+
+
+def _ceil_to_stride(value):
+    return int(np.ceil(value / STRIDE) * STRIDE)
+
+
+def letterbox_batch(frames, imgsz=DEFAULT_IMGSZ):
+    """
+    BGR 프레임 목록을 YOLO 배치 입력 텐서로 변환 (비율 유지 리사이즈 + 패딩)
+    ultralytics와 같이 긴 변을 imgsz에 맞추고 짧은 변은 stride 배수까지만 패딩 (정사각형 아님)
+    Returns:
+        (torch.Tensor [B, 3, H, W] float32 RGB 0~1, [FrameGeometry, ...])
+    """
+    sizes = []
+    for frame in frames:
+        h, w = frame.shape[:2]
+        scale = min(imgsz / h, imgsz / w)
+        sizes.append((scale, int(round(w * scale)), int(round(h * scale))))
+
+    # 배치 안의 프레임 크기가 달라도(카메라별 해상도) 한 텐서에 담을 수 있는 크기
+    canvas_h = max(_ceil_to_stride(new_h) for _, _, new_h in sizes)
+    canvas_w = max(_ceil_to_stride(new_w) for _, new_w, _ in sizes)
+
+    batch = np.full((len(frames), canvas_h, canvas_w, 3), PAD_VALUE, dtype=np.uint8)
+    geometries = []
+    for i, (frame, (scale, new_w, new_h)) in enumerate(zip(frames, sizes)):
+        pad_x = (canvas_w - new_w) // 2
+        pad_y = (canvas_h - new_h) // 2
+        h, w = frame.shape[:2]
+        if (new_w, new_h) != (w, h):
+            frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        batch[i, pad_y:pad_y + new_h, pad_x:pad_x + new_w] = frame
+        geometries.append(FrameGeometry(scale, pad_x, pad_y, w, h))
+
+    # BGR(HWC) -> RGB(CHW), 0~1 정규화
+    tensor = np.ascontiguousarray(batch[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32)
+    tensor *= 1.0 / 255.0
+    return torch.from_numpy(tensor), geometries
+
+
+def scale_boxes(xyxy, geometry):
+    """
+    입력 텐서 좌표의 박스 [N, 4] (x1, y1, x2, y2)를 원본 프레임 좌표로 변환 (새 배열 반환)
+    """
+    xyxy = xyxy.astype(np.float32, copy=True)
+    xyxy[:, [0, 2]] -= geometry.pad_x
+    xyxy[:, [1, 3]] -= geometry.pad_y
+    xyxy /= geometry.scale
+    xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, geometry.width)
+    xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, geometry.height)
+    return xyxy
@@ -0,0 +1,60 @@
+"""
+화재 확정 전(pre-roll) 프레임 링 버퍼
+
+이미 인코딩된 JPEG 프레임(EncodedFrame)을 최근 N초 / 최대 바이트 한도 안에서 보관합니다.
+화재가 확정되면 버퍼 내용을 백업 서버로 먼저 보내 발화 직전 장면을 증거 영상에 포함시킵니다.
+전송용으로 인코딩한 프레임을 그대로 보관하므로 추가 인코딩 비용이 없습니다.
+"""
+import threading
+from collections import deque
+
+
+class PreEventBuffer:
+    """
+    Args:
+        max_seconds: 보관할 최대 시간 (가장 최근 프레임의 캡처 시각 기준)
+        max_bytes: 보관할 JPEG 데이터 총량 상한
+    """
+
+    def __init__(self, max_seconds=15.0, max_bytes=32 * 1024 * 1024):
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self._frames = deque()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.flushes = 0
+
+    def append(self, encoded):
+        with self._lock:
+            self._frames.append(encoded)
+            self._bytes += len(encoded)
+
+            # 시간/용량 한도를 넘는 오래된 프레임 제거
+            newest = encoded.timestamp
+            while self._frames and (
+                newest - self._frames[0].timestamp > self.max_seconds or self._bytes > self.max_bytes
+            ):
+                old = self._frames.popleft()
+                self._bytes -= len(old)
+                self.evicted += 1
+
+    def drain(self):
+        """보관 중인 프레임을 캡처 순서대로 꺼내고 버퍼를 비움"""
+        with self._lock:
+            frames = list(self._frames)
+            self._frames.clear()
+            self._bytes = 0
+            self.flushes += 1
+            return frames
+
+    def stats(self):
+        with self._lock:
+            span = self._frames[-1].timestamp - self._frames[0].timestamp if self._frames else 0.0
+            return {
+                "frames": len(self._frames),
+                "bytes": self._bytes,
+                "span_sec": span,
+                "evicted": self.evicted,
+                "flushes": self.flushes,
+            }
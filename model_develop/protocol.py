@@ -0,0 +1,132 @@
+"""
+감지기 TCP 프로토콜 (main.py <-> frontend/helpers.py)
+
+Protocol: [4 bytes: size of payload][1 byte: type][payload]
+ - 0x01: 이미지 프레임(JPEG)
+ - 0x02: 화재 이벤트 (JSON)
+ - 0x03: 동물 이벤트 (JSON)
+ - 0x04: Gemini 분석 결과 (JSON)
+ - 0x05: v2 협상 응답 (JSON, v2 클라이언트에만 전송)
+ - 0x06: v2 프레임 (v2 클라이언트에만 전송)
+ - 0x07: 설정 변경 요청 (클라이언트 -> 서버, JSON {"set": {항목: 값, ...}} - 빈 요청은 현재 설정 조회)
+ - 0x08: 적용된 설정 응답 (서버 -> 요청한 클라이언트, JSON {"version", "config", "applied", "errors"})
+
+v2 협상: 클라이언트가 연결 직후 HELLO_V2(4 bytes)를 보내면 서버가 0x05로 응답하고,
+이후 프레임을 0x01 대신 0x06으로 보냅니다. 아무것도 보내지 않는 v1 클라이언트는 기존과 동일하게 받습니다.
+(응답 전에 이미 큐에 들어간 프레임은 0x01로 도착할 수 있음)
+클라이언트 -> 서버 메시지(0x07)는 버전과 관계없이 같은 [size][type][payload] 형식입니다.
+
+v2 프레임 payload: [FRAME_V2_HEADER][감지 레코드 x N (DETECTION_V2_DTYPE)][JPEG]
+ - seq: 서버(카메라)별 송신 순번 - 클라이언트는 건너뛴 번호로 손실 프레임 수를 알 수 있음
+ - capture_ts / capture_monotonic: 캡처 시각 (time.time() / 감지기 호스트의 time.monotonic())
+"""
+import json
+import struct
+
+import numpy as np
+
+MSG_TYPE_FRAME = 0x01
+MSG_TYPE_FIRE_EVENT = 0x02
+MSG_TYPE_ANIMAL_EVENT = 0x03
+MSG_TYPE_GEMINI_RESULT = 0x04
+MSG_TYPE_HELLO = 0x05
+MSG_TYPE_FRAME_V2 = 0x06
+MSG_TYPE_CONTROL = 0x07
+MSG_TYPE_CONFIG = 0x08
+
+MAX_CONTROL_SIZE = 64 * 1024  # 클라이언트 -> 서버 메시지 최대 크기
+
+# 큐가 가득 찼을 때 버려도 되는 프레임 메시지
+FRAME_MSG_TYPES = (MSG_TYPE_FRAME, MSG_TYPE_FRAME_V2)
+
+HEADER = struct.Struct('>IB')
+
+PROTOCOL_VERSION = 2
+HELLO_V2 = b"FDP" + bytes([PROTOCOL_VERSION])  # 클라이언트 -> 서버 v2 요청
+
+# version, camera_id, seq, frame_id, capture_ts, capture_monotonic, width, height, 감지 수
+FRAME_V2_HEADER = struct.Struct('>BBIIddHHH')
+
+# 감지 레코드 (big-endian): 종류(화재 0 / 동물 1), 클래스 id, 신뢰도, 트랙 id(없으면 -1), 박스 좌표(원본 픽셀)
+DETECTION_KIND_FIRE = 0
+DETECTION_KIND_ANIMAL = 1
+DETECTION_V2_DTYPE = np.dtype([
+    ("kind", "u1"),
+    ("cls", ">u2"),
+    ("conf", ">f4"),
+    ("track_id", ">i4"),
+    ("x1", ">i2"),
+    ("y1", ">i2"),
+    ("x2", ">i2"),
+    ("y2", ">i2"),
+])
+
+
+def pack_message(msg_type: int, payload: bytes) -> bytes:
+    """헤더를 붙인 TCP 패킷 생성"""
+    return HEADER.pack(len(payload), msg_type) + payload
+
+
+def pack_json_message(msg_type: int, data: dict) -> bytes:
+    """JSON 이벤트 패킷 생성"""
+    return pack_message(msg_type, json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+
+def pack_detections(fire_dets=None, animal_dets=None, track_ids=None):
+    """
+    화재 / 동물 감지 레코드 배열(postprocess.DETECTION_DTYPE)을 v2 감지 블록으로 변환
+    Returns:
+        DETECTION_V2_DTYPE 구조체 배열
+    """
+    groups = [(kind, dets, ids) for kind, dets, ids in ((DETECTION_KIND_FIRE, fire_dets, None),
+                                                        (DETECTION_KIND_ANIMAL, animal_dets, track_ids))
+              if dets is not None and len(dets) > 0]
+    # 바이트 순서가 유지되도록 한 배열에 바로 채움 (concatenate는 native 순서로 바꿀 수 있음)
+    block = np.empty(sum(len(dets) for _, dets, _ in groups), dtype=DETECTION_V2_DTYPE)
+    start = 0
+    for kind, dets, ids in groups:
+        rows = block[start:start + len(dets)]
+        rows["kind"] = kind
+        rows["track_id"] = -1 if ids is None else ids
+        for name in ("cls", "conf", "x1", "y1", "x2", "y2"):
+            rows[name] = dets[name]
+        start += len(dets)
+    return block
+
+
+def pack_frame_v2(camera_id: int, seq: int, encoded) -> bytes:
+    """
+    인코딩된 프레임(EncodedFrame)으로 v2 프레임 패킷 생성
+    감지 블록은 encoded.detections (없으면 빈 블록)
+    """
+    detections = encoded.detections if encoded.detections is not None else pack_detections()
+    header = FRAME_V2_HEADER.pack(
+        PROTOCOL_VERSION, camera_id, seq & 0xFFFFFFFF, encoded.frame_id & 0xFFFFFFFF,
+        encoded.timestamp, encoded.monotonic or 0.0,
+        encoded.width, encoded.height, len(detections),
+    )
+    return pack_message(MSG_TYPE_FRAME_V2, header + detections.tobytes() + encoded.data)
+
+
+def unpack_frame_v2(payload: bytes):
+    """
+    v2 프레임 payload 해석
+    Returns:
+        (헤더 dict, DETECTION_V2_DTYPE 배열, JPEG 바이트)
+    """
+    (version, camera_id, seq, frame_id, capture_ts, capture_monotonic,
+     width, height, count) = FRAME_V2_HEADER.unpack_from(payload)
+    offset = FRAME_V2_HEADER.size
+    detections = np.frombuffer(payload, dtype=DETECTION_V2_DTYPE, count=count, offset=offset)
+    offset += count * DETECTION_V2_DTYPE.itemsize
+    header = {
+        "version": version,
+        "camera_id": camera_id,
+        "seq": seq,
+        "frame_id": frame_id,
+        "capture_ts": capture_ts,
+        "capture_monotonic": capture_monotonic,
+        "width": width,
+        "height": height,
+    }
+    return header, detections, payload[offset:]
@@ -0,0 +1,304 @@
+"""
+오프라인 리플레이 / 벤치마크
+
+웹캠과 Gemini 키 없이 동영상 파일 또는 이미지 폴더를 main.py와 같은
+감지 → 화재 확정 → 전송 로직(detector.py)에 통과시켜 성능을 측정합니다.
+화재 알림(notify)은 횟수만 기록하고, Gemini 분석은 main.py와 같은 GeminiExecutor
+(대기 요청 대체, 동시 호출 제한, 제한 시간, 서킷 브레이커, 결과 캐시)를 거쳐 API 대신 로컬 스텁을 호출합니다.
+
+사용 예:
+    python replay.py fire_test.mp4                 # 최대 속도
+    python replay.py fire_test.mp4 --realtime      # 실제 영상 속도
+    python replay.py frames_dir/ --fps 15 --json result.json
+    python replay.py fire_test.mp4 --gemini-latency 3 --gemini-cache
+"""
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from backends import BACKENDS, load_model, warm_up
+from camera import CapturedFrame
+from cascade import CASCADE_MODES, FireCascade
+from detector import TARGET_CLASS, CameraDetector, DetectorOutputs, infer_batch
+from encoding import encode_stats
+from gemini_cache import GeminiResultCache
+from gemini_executor import GeminiExecutor
+from motion_gate import MotionGate
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class LatencyRecorder:
+    """단계별 처리 시간 샘플 수집 및 백분위수 계산"""
+
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, stage, elapsed):
+        self.samples.setdefault(stage, []).append(elapsed)
+
+    def summary(self):
+        result = {}
+        for stage, values in self.samples.items():
+            arr = np.asarray(values) * 1000
+            result[stage] = {
+                "count": len(values),
+                "mean_ms": float(arr.mean()),
+                "p50_ms": float(np.percentile(arr, 50)),
+                "p90_ms": float(np.percentile(arr, 90)),
+                "p99_ms": float(np.percentile(arr, 99)),
+                "max_ms": float(arr.max()),
+            }
+        return result
+
+
+def stub_gemini_analyzer(latency=0.0):
+    """
+    Gemini API 대신 사용하는 분석 함수 (GeminiExecutor의 analyze와 같은 형태)
+    latency: 응답까지 걸리는 시간 (초), executor의 제한 시간보다 길면 타임아웃으로 처리됨
+    """
+    def analyze(jpeg_bytes, timeout):
+        if latency > 0:
+            time.sleep(latency)
+        return f"리플레이 스텁 분석 ({len(jpeg_bytes)} bytes)"
+    return analyze
+
+
+class ReplayOutputs(DetectorOutputs):
+    """
+    전송 / 알림은 기록만 하는 스텁 출력
+    Gemini 요청은 main.py와 같이 GeminiExecutor로 보냄 (executor가 스텁 분석 함수를 호출)
+    """
+
+    def __init__(self, gemini_executor):
+        self.gemini_executor = gemini_executor
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.events = []
+        self.notifications = 0
+        self.gemini_requests = 0
+        self.gemini_results = []  # [(ok, 캐시 여부), ...] (분석 워커 스레드에서 추가)
+
+    def wants_frame(self):
+        # 실제 운영처럼 인코딩 비용까지 측정
+        return True
+
+    def send_frame(self, encoded):
+        self.frames_sent += 1
+        self.bytes_sent += len(encoded)
+
+    def send_event(self, msg_type, event_data):
+        self.events.append((msg_type, event_data))
+
+    def notify_fire(self, camera_id):
+        self.notifications += 1
+
+    def request_gemini(self, camera_id, encoded, frame, force_refresh=False):
+        self.gemini_requests += 1
+        self.gemini_executor.submit(camera_id, encoded, frame, self._gemini_result, force_refresh)
+
+    def _gemini_result(self, job, result, ok):
+        self.gemini_results.append((ok, job.cached))
+
+
+def drain_gemini(executor, timeout):
+    """대기 / 진행 중인 Gemini 요청이 끝날 때까지 최대 timeout초 대기"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        s = executor.stats()
+        if not s["pending"] and not s["in_flight"]:
+            return
+        time.sleep(0.05)
+
+
+def iter_source(path, fps):
+    """
+    동영상 파일 또는 이미지 폴더에서 (영상 내 시각, 프레임) 순회
+    영상 내 시각은 프레임 번호 / FPS 로 계산
+    """
+    if os.path.isdir(path):
+        files = sorted(f for f in os.listdir(path) if f.lower().endswith(IMAGE_EXTENSIONS))
+        for i, name in enumerate(files):
+            frame = cv2.imread(os.path.join(path, name))
+            if frame is not None:
+                yield i / fps, frame
+        return
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"영상을 열 수 없습니다: {path}")
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or fps
+    index = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield index / video_fps, frame
+            index += 1
+    finally:
+        cap.release()
+
+
+def replay(args):
+    fire_model = load_model(args.fire_model, args.backend, args.int8, args.calibration)
+    animal_model = load_model(args.animal_model, args.backend, args.int8, args.calibration)
+    warm_up(fire_model)
+    warm_up(animal_model)
+
+    gemini_executor = GeminiExecutor(
+        stub_gemini_analyzer(args.gemini_latency),
+        deadline=args.gemini_deadline,
+        cache=GeminiResultCache() if args.gemini_cache else None,
+    ).start()
+    outputs = ReplayOutputs(gemini_executor)
+    motion_gate = MotionGate() if args.motion_gate else None
+    cascade = FireCascade(TARGET_CLASS, mode=args.cascade) if args.cascade else None
+    detector = CameraDetector(0, fire_model.names, animal_model.names, outputs, motion_gate=motion_gate)
+    latency = LatencyRecorder()
+
+    # 영상 내 시각을 실제 시각처럼 사용 (화재 확정 타이머가 영상 시간 기준으로 동작)
+    base_ts = time.time()
+    first_fire_ts = None
+    confirmed_ts = None
+    frames = 0
+
+    start_wall = time.perf_counter()
+    source = iter_source(args.source, args.fps)
+    while True:
+        t0 = time.perf_counter()
+        try:
+            video_ts, frame = next(source)
+        except StopIteration:
+            break
+        t1 = time.perf_counter()
+
+        if args.realtime:
+            # 영상 속도에 맞춰 대기
+            delay = video_ts - (t1 - start_wall)
+            if delay > 0:
+                time.sleep(delay)
+
+        frames += 1
+        captured = CapturedFrame(frame, base_ts + video_ts, time.monotonic(), frames, 0)
+
+        t2 = time.perf_counter()
+        [(_, _, fire_result, animal_result, geometry)] = infer_batch(
+            fire_model, animal_model, [(detector, captured)], cascade)
+        t3 = time.perf_counter()
+        item = detector.process(captured, fire_result, animal_result, geometry)
+        t4 = time.perf_counter()
+        detector.fan_out(item)
+        t5 = time.perf_counter()
+
+        latency.add("capture", t1 - t0)
+        latency.add("inference", t3 - t2)
+        latency.add("postprocess", t4 - t3)
+        latency.add("fanout", t5 - t4)
+        latency.add("total", (t1 - t0) + (t5 - t2))
+
+        # 화재 확정까지 걸린 시간 (영상 시간 기준)
+        state = detector.fire_state
+        if first_fire_ts is None and state.pending_fire_check_time is not None:
+            first_fire_ts = video_ts
+        if confirmed_ts is None and state.is_monitoring_fire:
+            confirmed_ts = video_ts
+
+    elapsed = time.perf_counter() - start_wall
+    # 마지막 요청의 결과까지 집계 (처리 시간에는 포함하지 않음)
+    drain_gemini(gemini_executor, args.gemini_deadline)
+    gemini = gemini_executor.stats()
+    gemini_executor.close()
+    enc = encode_stats.snapshot()
+    return {
+        "source": args.source,
+        "backend": f"{args.backend}{'-int8' if args.int8 else ''}",
+        "frames": frames,
+        "elapsed_sec": elapsed,
+        "fps": frames / elapsed if elapsed > 0 else 0.0,
+        "stages": latency.summary(),
+        "encode_avg_ms": enc["avg_ms"],
+        "fire_first_detected_sec": first_fire_ts,
+        "fire_confirmed_sec": confirmed_ts,
+        "fire_confirmation_delay_sec": (
+            confirmed_ts - first_fire_ts if first_fire_ts is not None and confirmed_ts is not None else None
+        ),
+        "notifications": outputs.notifications,
+        "gemini_requests": outputs.gemini_requests,
+        "gemini": {
+            "results": len(outputs.gemini_results),
+            "cached": sum(1 for _, cached in outputs.gemini_results if cached),
+            **{key: gemini[key] for key in ("succeeded", "failed", "timeouts", "coalesced", "rejected",
+                                            "avg_ms", "max_ms")},
+        },
+        "events": len(outputs.events),
+        "bytes_sent": outputs.bytes_sent,
+        "motion_gate": motion_gate.stats() if motion_gate is not None else None,
+        "cascade": cascade.stats() if cascade is not None else None,
+    }
+
+
+def print_report(report):
+    print("=" * 60)
+    print(f"리플레이 결과: {report['source']} ({report['backend']})")
+    print("=" * 60)
+    print(f"프레임: {report['frames']}  |  소요: {report['elapsed_sec']:.1f}초  |  FPS: {report['fps']:.1f}")
+    print(f"{'stage':<12} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  (ms)")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<12} {s['p50_ms']:8.1f} {s['p90_ms']:8.1f} {s['p99_ms']:8.1f} {s['max_ms']:8.1f}")
+    print(f"JPEG 인코딩 평균: {report['encode_avg_ms']:.1f}ms")
+
+    if report["fire_confirmed_sec"] is not None:
+        print(f"🔥 최초 감지 {report['fire_first_detected_sec']:.1f}초 -> 확정 {report['fire_confirmed_sec']:.1f}초"
+              f" (확정까지 {report['fire_confirmation_delay_sec']:.1f}초)")
+    elif report["fire_first_detected_sec"] is not None:
+        print(f"🔥 최초 감지 {report['fire_first_detected_sec']:.1f}초, 확정되지 않음")
+    else:
+        print("화재 감지 없음")
+    print(f"알림 {report['notifications']}회 | Gemini 요청 {report['gemini_requests']}회 | 이벤트 {report['events']}건")
+    g = report["gemini"]
+    print(f"Gemini (스텁): 결과 {g['results']} (캐시 {g['cached']}) | 성공 {g['succeeded']} | 실패 {g['failed']}"
+          f" (타임아웃 {g['timeouts']}) | 대체 {g['coalesced']} | 거절 {g['rejected']} | 평균 {g['avg_ms']:.0f}ms")
+    if report["motion_gate"] is not None:
+        m = report["motion_gate"]
+        print(f"움직임 게이트: 추론 생략 {m['skipped']}회 ({m['skip_ratio'] * 100:.0f}%)")
+    if report["cascade"] is not None:
+        c = report["cascade"]
+        print(f"캐스케이드({c['mode']}): 선별 평균 {c['screen_avg_ms']:.1f}ms, 확인 평균 {c['confirm_avg_ms']:.1f}ms"
+              f" | 후보 {c['candidates']}/{c['frames']} ({c['candidate_ratio'] * 100:.0f}%)"
+              f" | 확인 {c['confirmed']} ({c['confirm_ratio'] * 100:.0f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="감지 루프 오프라인 리플레이 / 벤치마크")
+    parser.add_argument("source", help="동영상 파일 또는 이미지 폴더 경로")
+    parser.add_argument("--realtime", action="store_true", help="영상 속도에 맞춰 재생 (기본: 최대 속도)")
+    parser.add_argument("--fps", type=float, default=30.0, help="이미지 폴더 또는 FPS 정보가 없는 영상의 FPS")
+    parser.add_argument("--fire-model", default="fireModel/best.pt")
+    parser.add_argument("--animal-model", default="fireModel/yolov8s.pt")
+    parser.add_argument("--backend", choices=BACKENDS, default="pytorch", help="추론 백엔드")
+    parser.add_argument("--int8", action="store_true", help="INT8 양자화 모델 사용 (onnx / openvino)")
+    parser.add_argument("--calibration", help="INT8 보정 이미지 폴더")
+    parser.add_argument("--cascade", choices=CASCADE_MODES, help="화재 감지 캐스케이드 사용 (full / tile)")
+    parser.add_argument("--motion-gate", action="store_true", help="움직임 게이트 사용")
+    parser.add_argument("--gemini-latency", type=float, default=0.0, help="스텁 Gemini 분석 응답 시간 (초)")
+    parser.add_argument("--gemini-deadline", type=float, default=15.0, help="Gemini 호출 제한 시간 (초)")
+    parser.add_argument("--gemini-cache", action="store_true", help="Gemini 결과 캐시 사용")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    report = replay(args)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
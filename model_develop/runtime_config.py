@@ -0,0 +1,161 @@
+"""
+실행 중 변경 가능한 감지 설정
+
+Settings 페이지가 TCP 제어 메시지(0x07)로 보낸 값을 재시작 / 모델 재로딩 없이 감지 루프에 반영합니다.
+설정은 불변 스냅샷(DetectorSettings)을 통째로 교체하는 방식이라, 읽는 쪽은 잠금 없이
+current()를 한 번 읽어 프레임 하나를 처리하는 동안 같은 값을 사용합니다.
+"""
+import threading
+
+STRIDE = 32  # 입력 크기는 YOLO stride의 배수로 맞춤
+
+
+def _float_range(low, high):
+    def parse(value):
+        value = float(value)
+        if not low <= value <= high:
+            raise ValueError(f"{low} ~ {high} 범위여야 합니다")
+        return value
+    return parse
+
+
+def _int_range(low, high):
+    def parse(value):
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError("정수여야 합니다")
+        value = int(value)
+        if not low <= value <= high:
+            raise ValueError(f"{low} ~ {high} 범위여야 합니다")
+        return value
+    return parse
+
+
+def _imgsz(value):
+    value = _int_range(STRIDE, 1920)(value)
+    return max(STRIDE, int(round(value / STRIDE)) * STRIDE)
+
+
+def _classes(value):
+    if isinstance(value, str):
+        value = value.split(",")
+    names = tuple(str(name).strip() for name in value if str(name).strip())
+    if not names:
+        raise ValueError("클래스가 하나 이상 필요합니다")
+    return names
+
+
+# 변경 가능한 항목과 검증 함수
+FIELDS = {
+    "fire_conf": _float_range(0.01, 1.0),  # 화재 모델 신뢰도 기준
+    "animal_conf": _float_range(0.01, 1.0),  # 동물 모델 신뢰도 기준
+    "fire_classes": _classes,  # 화재로 볼 클래스
+    "animal_classes": _classes,  # 동물로 볼 클래스
+    "imgsz": _imgsz,  # 모델 입력 크기 (32의 배수로 반올림)
+    "animal_skip": _int_range(1, 300),  # 동물 감지 간격 (프레임)
+    "jpeg_quality": _int_range(10, 100),  # 전송 JPEG 품질
+    "target_fps": _float_range(0.0, 120.0),  # 감지 루프 목표 FPS (0이면 제한 없음)
+    "alert_cooldown": _float_range(0.0, 3600.0),  # 화재 알림 조건 재충족 간격 (초)
+}
+
+
+class DetectorSettings:
+    """설정 스냅샷 (읽기 전용으로 공유)"""
+
+    __slots__ = ("version", *FIELDS)
+
+    def __init__(self, version, **values):
+        self.version = version  # 변경될 때마다 1씩 증가
+        for name in FIELDS:
+            setattr(self, name, values[name])
+
+    def as_dict(self):
+        values = {name: getattr(self, name) for name in FIELDS}
+        values["fire_classes"] = list(self.fire_classes)
+        values["animal_classes"] = list(self.animal_classes)
+        return values
+
+
+class RuntimeConfig:
+    """
+    감지 설정 저장소 (thread-safe)
+    Args:
+        fire_classes, animal_classes, animal_skip, alert_cooldown 등: FIELDS의 초기값
+    """
+
+    def __init__(self, fire_classes, animal_classes, fire_conf=0.25, animal_conf=0.25, imgsz=640,
+                 animal_skip=6, jpeg_quality=80, target_fps=0.0, alert_cooldown=30.0):
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._model_names = {}  # 클래스 항목 -> 모델이 가진 클래스 이름 (소문자, 모델 로딩 후 등록)
+        self._settings = DetectorSettings(
+            0,
+            fire_conf=fire_conf,
+            animal_conf=animal_conf,
+            fire_classes=tuple(fire_classes),
+            animal_classes=tuple(animal_classes),
+            imgsz=imgsz,
+            animal_skip=animal_skip,
+            jpeg_quality=jpeg_quality,
+            target_fps=target_fps,
+            alert_cooldown=alert_cooldown,
+        )
+
+    def current(self):
+        return self._settings
+
+    def set_model_names(self, field, names):
+        """
+        클래스 항목(fire_classes / animal_classes)에 허용할 모델의 클래스 이름 등록
+        등록 후에는 모델에 없는 이름이 섞인 변경을 거부 (마스크가 모두 False가 되어 감지가 조용히 멈추지 않도록)
+        names: 모델의 클래스 이름 (dict{id: name} 또는 list)
+        """
+        values = names.values() if isinstance(names, dict) else names
+        self._model_names[field] = {str(name).lower() for name in values}
+
+    def _check_classes(self, field, classes):
+        known = self._model_names.get(field)
+        if known is None:
+            return
+        unknown = [name for name in classes if name.lower() not in known]
+        if unknown:
+            raise ValueError(f"모델에 없는 클래스: {', '.join(unknown)}")
+
+    def subscribe(self, callback):
+        """설정이 바뀔 때마다 callback(DetectorSettings) 호출 (예: 목표 FPS 반영)"""
+        self._listeners.append(callback)
+
+    def update(self, changes):
+        """
+        설정 일부 변경 (검증에 실패한 항목은 적용하지 않음)
+        Returns:
+            (새 DetectorSettings, 적용된 항목 목록, {항목: 오류 메시지})
+        """
+        errors = {}
+        parsed = {}
+        for name, value in changes.items():
+            parse = FIELDS.get(name)
+            if parse is None:
+                errors[name] = "알 수 없는 설정"
+                continue
+            try:
+                value = parse(value)
+                self._check_classes(name, value)
+                parsed[name] = value
+            except (TypeError, ValueError) as e:
+                errors[name] = str(e)
+
+        with self._lock:
+            old = self._settings
+            applied = [name for name, value in parsed.items() if getattr(old, name) != value]
+            if not applied:
+                return old, [], errors
+            values = {name: getattr(old, name) for name in FIELDS}
+            values.update(parsed)
+            self._settings = settings = DetectorSettings(old.version + 1, **values)
+
+        for callback in self._listeners:
+            try:
+                callback(settings)
+            except Exception as e:
+                print(f"설정 반영 오류: {e}")
+        return settings, applied, errors
@@ -0,0 +1,195 @@
+"""
+백업 프레임 디스크 스풀 (store-and-forward)
+
+백업 서버(WebSocket)가 끊겼거나 전송이 밀릴 때 인코딩된 JPEG 프레임을
+append-only 세그먼트 파일에 캡처 시각과 함께 기록합니다.
+연결이 돌아오면 오래된 세그먼트부터 읽어 원래 캡처 시각을 붙여 다시 보내고, 전송이 끝난 세그먼트는 삭제합니다.
+전체 크기가 상한을 넘으면 가장 오래된 세그먼트부터 버립니다.
+
+세그먼트 파일 레코드: [8 bytes: 캡처 시각(double)][8 bytes: frame_id][4 bytes: JPEG 크기][JPEG]
+(모두 little-endian, 기록 중 종료되어 잘린 마지막 레코드는 읽을 때 무시)
+"""
+import os
+import struct
+import threading
+
+RECORD_HEADER = struct.Struct("<dqI")
+SEGMENT_SUFFIX = ".spool"
+
+
+class SpooledFrame:
+    """스풀에서 읽은 프레임"""
+
+    __slots__ = ("data", "timestamp", "frame_id")
+
+    def __init__(self, data, timestamp, frame_id):
+        self.data = data
+        self.timestamp = timestamp  # 원래 캡처 시각 (unix timestamp)
+        self.frame_id = frame_id
+
+
+class SpoolSegment:
+    """전송 대기 중인 세그먼트 하나 (read_oldest 결과)"""
+
+    __slots__ = ("path", "frames", "size")
+
+    def __init__(self, path, frames, size):
+        self.path = path
+        self.frames = frames
+        self.size = size
+
+    @property
+    def seq(self):
+        """세그먼트 번호 (파일 이름, 재시작해도 계속 증가)"""
+        return int(os.path.basename(self.path)[:-len(SEGMENT_SUFFIX)])
+
+
+def read_segment(path):
+    """세그먼트 파일의 프레임 목록 (잘린 마지막 레코드는 무시)"""
+    frames = []
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(data):
+        timestamp, frame_id, length = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        if start + length > len(data):
+            break
+        frames.append(SpooledFrame(data[start:start + length], timestamp, frame_id))
+        offset = start + length
+    return frames
+
+
+class FrameSpool:
+    """
+    Args:
+        directory: 세그먼트 파일 저장 폴더 (재시작 후 남아 있는 세그먼트도 이어서 전송)
+        max_bytes: 스풀 전체 크기 상한 (넘으면 가장 오래된 세그먼트 삭제)
+        segment_bytes: 세그먼트 하나의 최대 크기 (다시 보낼 때 한 번에 보내는 단위)
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, segment_bytes=4 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._segments = []  # [(경로, 크기), ...] 오래된 순, 마지막이 기록 중인 세그먼트일 수 있음
+        self._file = None  # 기록 중인 세그먼트
+        self._file_size = 0
+        self._next_seq = 0
+
+        self.spooled = 0
+        self.replayed = 0
+        self.evicted = 0  # 용량 초과로 버린 세그먼트 수
+        self.errors = 0
+
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(SEGMENT_SUFFIX):
+                continue
+            path = os.path.join(directory, name)
+            self._segments.append((path, os.path.getsize(path)))
+            try:
+                self._next_seq = max(self._next_seq, int(name[:-len(SEGMENT_SUFFIX)]) + 1)
+            except ValueError:
+                pass
+
+    def _total_bytes(self):
+        return sum(size for _, size in self._segments)
+
+    def _seal(self):
+        """기록 중인 세그먼트를 닫아 전송 가능 상태로 만듦"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._file_size = 0
+
+    def append(self, encoded):
+        """
+        인코딩된 프레임(EncodedFrame)을 스풀에 기록 (여러 스레드에서 호출 가능)
+        Returns:
+            기록 성공 여부
+        """
+        record = RECORD_HEADER.pack(encoded.timestamp, encoded.frame_id, len(encoded.data))
+        with self._lock:
+            try:
+                if self._file is not None and self._file_size >= self.segment_bytes:
+                    self._seal()
+                if self._file is None:
+                    path = os.path.join(self.directory, f"{self._next_seq:010d}{SEGMENT_SUFFIX}")
+                    self._next_seq += 1
+                    self._file = open(path, "ab")
+                    self._segments.append((path, 0))
+                self._file.write(record)
+                self._file.write(encoded.data)
+                self._file.flush()
+            except OSError as e:
+                self.errors += 1
+                print(f"스풀 기록 오류: {e}")
+                return False
+
+            self._file_size += len(record) + len(encoded.data)
+            path, _ = self._segments[-1]
+            self._segments[-1] = (path, self._file_size)
+            self.spooled += 1
+
+            # 용량 초과: 기록 중인 세그먼트는 남기고 오래된 세그먼트부터 삭제
+            while len(self._segments) > 1 and self._total_bytes() > self.max_bytes:
+                old_path, _ = self._segments.pop(0)
+                self.evicted += 1
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+            return True
+
+    def pending(self):
+        with self._lock:
+            return bool(self._segments)
+
+    def read_oldest(self):
+        """
+        가장 오래된 세그먼트 읽기 (기록 중인 세그먼트뿐이면 닫고 읽음)
+        전송을 마치면 remove()로 삭제해야 다음 세그먼트로 넘어감
+        Returns:
+            SpoolSegment, 비어 있으면 None
+        """
+        with self._lock:
+            if not self._segments:
+                return None
+            path, size = self._segments[0]
+            if len(self._segments) == 1:
+                self._seal()
+        try:
+            frames = read_segment(path)
+        except OSError as e:
+            self.errors += 1
+            print(f"스풀 읽기 오류: {e}")
+            frames = []
+        return SpoolSegment(path, frames, size)
+
+    def remove(self, segment):
+        """전송을 마친 세그먼트 삭제"""
+        with self._lock:
+            self._segments = [(p, s) for p, s in self._segments if p != segment.path]
+            self.replayed += len(segment.frames)
+        try:
+            os.remove(segment.path)
+        except OSError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "segments": len(self._segments),
+                "bytes": self._total_bytes(),
+                "spooled": self.spooled,
+                "replayed": self.replayed,
+                "evicted": self.evicted,
+                "errors": self.errors,
+            }
+
+    def close(self):
+        with self._lock:
+            self._seal()
@@ -0,0 +1,113 @@
+"""
+감지기 시작 단계 병렬화 / 시간 측정
+
+재시작에 걸리는 시간은 곧 화재 감지가 멈춰 있는 시간이므로,
+화재 / 동물 모델 로딩 + 워밍업을 각자 백그라운드 스레드에서 동시에 진행하고
+그동안 카메라 열기, 서버 시작 등 나머지 준비를 진행합니다.
+감지 루프는 화재 모델만 준비되면 시작하고, 동물 모델은 준비되는 대로 붙입니다.
+"""
+import threading
+import time
+
+from backends import load_model, warm_up
+
+
+class StartupTimeline:
+    """
+    시작 단계별 소요 시간 기록 (프로세스 시작 기준 경과 시간)
+    여러 스레드에서 mark() 가능
+    """
+
+    def __init__(self, origin=None):
+        self.origin = time.monotonic() if origin is None else origin
+        self._marks = []  # [(단계 이름, 경과 시간, 소요 시간 또는 None), ...]
+        self._lock = threading.Lock()
+
+    def elapsed(self):
+        return time.monotonic() - self.origin
+
+    def mark(self, name, duration=None):
+        """단계 완료 기록 (duration: 그 단계에만 걸린 시간, 없으면 경과 시간만 표시)"""
+        with self._lock:
+            self._marks.append((name, self.elapsed(), duration))
+
+    def format(self):
+        with self._lock:
+            marks = sorted(self._marks, key=lambda m: m[1])
+        lines = []
+        for name, at, duration in marks:
+            took = f" ({duration:.2f}s)" if duration is not None else ""
+            lines.append(f"  +{at:6.2f}s  {name}{took}")
+        return "\n".join(lines)
+
+
+class ModelLoader:
+    """
+    백그라운드 스레드에서 모델 로딩 + 워밍업
+    Args:
+        role: 로그 / 시간 기록 이름 ("fire", "animal")
+        weights, backend, int8, calibration: load_model 인자
+        warm_up_batch: 워밍업 배치 크기 (카메라 수, 감지 루프와 같은 입력 형태로 워밍업)
+        imgsz: 워밍업 입력 크기
+        timeline: 완료 시 시간을 기록할 StartupTimeline
+    """
+
+    def __init__(self, role, weights, backend="pytorch", int8=False, calibration=None,
+                 warm_up_batch=1, imgsz=640, timeline=None):
+        self.role = role
+        self.weights = weights
+        self.backend = backend
+        self.int8 = int8
+        self.calibration = calibration
+        self.warm_up_batch = warm_up_batch
+        self.imgsz = imgsz
+        self.timeline = timeline
+
+        self.model = None
+        self.error = None
+        self.load_sec = 0.0
+        self.warm_up_sec = 0.0
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._load, name=f"{self.role}-loader", daemon=True)
+        self._thread.start()
+        return self
+
+    def _load(self):
+        try:
+            start = time.perf_counter()
+            model = load_model(self.weights, self.backend, self.int8, self.calibration)
+            self.load_sec = time.perf_counter() - start
+
+            start = time.perf_counter()
+            warm_up(model, batch=self.warm_up_batch, imgsz=self.imgsz)
+            self.warm_up_sec = time.perf_counter() - start
+            self.model = model
+        except Exception as e:
+            self.error = e
+            print(f"✗ {self.role} 모델 로딩 실패: {e}")
+        finally:
+            if self.timeline is not None and self.error is None:
+                self.timeline.mark(f"{self.role} 모델 준비 (로딩 {self.load_sec:.2f}s"
+                                   f" + 워밍업 {self.warm_up_sec:.2f}s)")
+            self._done.set()
+
+    def ready(self):
+        """대기 없이 준비 여부 확인 (실패한 경우도 True - error 확인)"""
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        로딩이 끝날 때까지 대기
+        Returns:
+            모델, 시간 초과 시 None
+        Raises:
+            로딩 중 발생한 예외
+        """
+        if not self._done.wait(timeout):
+            return None
+        if self.error is not None:
+            raise self.error
+        return self.model
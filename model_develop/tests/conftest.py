@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# model_develop 모듈은 같은 디렉터리 기준으로 import (main.py 실행 방식과 동일)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,34 @@
+from broadcast import ControlAccess
+
+
+def test_default_allows_only_loopback():
+    access = ControlAccess()
+    assert access.allows(("127.0.0.1", 5000))
+    assert access.allows(("::ffff:127.0.0.1", 5000, 0, 0))
+    assert access.allows(("::1", 5000, 0, 0))
+    assert not access.allows(("192.168.0.10", 5000))
+
+
+def test_allowed_hosts_accept_networks():
+    access = ControlAccess(["192.168.0.0/24", " 10.0.0.5 "])
+    assert access.allows(("192.168.0.77", 1))
+    assert access.allows(("10.0.0.5", 1))
+    assert not access.allows(("10.0.0.6", 1))
+    assert not access.allows(("127.0.0.1", 1))
+
+
+def test_token_allows_any_address():
+    access = ControlAccess(["127.0.0.1"], token="s3cret")
+    assert access.allows(("192.168.0.10", 1), "s3cret")
+    assert not access.allows(("192.168.0.10", 1), "wrong")
+    assert not access.allows(("192.168.0.10", 1), None)
+    assert not access.allows(("192.168.0.10", 1), 1234)
+
+
+def test_empty_token_never_matches():
+    access = ControlAccess(["127.0.0.1"], token="")
+    assert not access.allows(("192.168.0.10", 1), "")
+
+
+def test_wildcard_allows_all():
+    assert ControlAccess(["*"]).allows(("203.0.113.9", 1))
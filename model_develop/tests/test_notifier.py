@@ -0,0 +1,57 @@
+import threading
+import time
+
+from notifier import NotificationDispatcher
+
+
+class _FakePost:
+    """_post 대체: 정해진 결과를 순서대로 반환하고 호출될 때마다 알림"""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = threading.Semaphore(0)
+
+    def __call__(self):
+        result = self.results.pop(0) if self.results else (True, False, "200")
+        self.calls.release()
+        return result
+
+
+def _dispatcher(results):
+    dispatcher = NotificationDispatcher("http://notify.invalid", max_retries=0, dedupe_window=30.0)
+    dispatcher._post = _FakePost(results)
+    return dispatcher.start()
+
+
+def _wait_done(dispatcher, count):
+    for _ in range(count):
+        assert dispatcher._post.calls.acquire(timeout=2.0)
+    dispatcher.close()
+
+
+def test_failed_delivery_does_not_suppress_next_alert():
+    dispatcher = _dispatcher([(False, False, "400")])
+    assert dispatcher.notify("fire")
+    deadline = time.monotonic() + 2.0
+    while dispatcher.failed == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert dispatcher.notify("fire")  # 실패했으므로 중복으로 보지 않음
+    _wait_done(dispatcher, 2)
+    assert (dispatcher.failed, dispatcher.sent, dispatcher.deduped) == (1, 1, 0)
+
+
+def test_successful_delivery_is_deduped():
+    dispatcher = _dispatcher([])
+    assert dispatcher.notify("fire")
+    _wait_done(dispatcher, 1)
+
+    assert not dispatcher.notify("fire")
+    assert dispatcher.deduped == 1
+
+
+def test_in_flight_alert_is_not_queued_twice():
+    dispatcher = NotificationDispatcher("http://notify.invalid")  # 전송 스레드 없이 접수만
+    assert dispatcher.notify("fire")
+    assert not dispatcher.notify("fire")
+    assert dispatcher.notify("other")
@@ -0,0 +1,42 @@
+from runtime_config import RuntimeConfig
+
+
+def _config():
+    config = RuntimeConfig(["fire", "smoke"], ["dog", "cat"])
+    config.set_model_names("fire_classes", {0: "Fire", 1: "smoke"})
+    config.set_model_names("animal_classes", ["dog", "cat", "bird"])
+    return config
+
+
+def test_unknown_class_is_rejected_per_field():
+    config = _config()
+    settings, applied, errors = config.update({"fire_classes": ["fire", "flame"], "fire_conf": 0.4})
+
+    assert applied == ["fire_conf"]
+    assert settings.fire_classes == ("fire", "smoke")
+    assert "flame" in errors["fire_classes"]
+
+
+def test_empty_fire_classes_are_rejected():
+    config = _config()
+    for value in ([], "", " , "):
+        _, applied, errors = config.update({"fire_classes": value})
+        assert applied == []
+        assert "fire_classes" in errors
+    assert config.current().fire_classes == ("fire", "smoke")
+
+
+def test_known_classes_are_case_insensitive():
+    config = _config()
+    settings, applied, errors = config.update({"fire_classes": "FIRE", "animal_classes": ["Bird"]})
+
+    assert sorted(applied) == ["animal_classes", "fire_classes"]
+    assert errors == {}
+    assert settings.fire_classes == ("FIRE",)
+    assert settings.animal_classes == ("Bird",)
+
+
+def test_classes_are_not_checked_before_model_names_are_known():
+    config = RuntimeConfig(["fire"], ["dog"])
+    _, applied, errors = config.update({"animal_classes": ["anything"]})
+    assert applied == ["animal_classes"] and errors == {}
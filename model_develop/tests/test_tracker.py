@@ -0,0 +1,54 @@
+import numpy as np
+
+from postprocess import DETECTION_DTYPE, EMPTY_DETECTIONS
+from tracker import IoUTracker
+
+
+def _dets(*boxes, cls=0, conf=0.9):
+    dets = np.zeros(len(boxes), dtype=DETECTION_DTYPE)
+    for i, (x1, y1, x2, y2) in enumerate(boxes):
+        dets[i] = (cls, conf, x1, y1, x2, y2)
+    return dets
+
+
+def test_track_survives_detection_interval_longer_than_a_second():
+    # animal_skip 150 @ 30fps -> 감지 간격 5초
+    tracker = IoUTracker(iou_threshold=0.3, max_misses=2)
+    interval = 5.0
+
+    new = tracker.update(_dets((100, 100, 200, 200)), 0.0)
+    assert len(new) == 1
+    track_id = new[0].track_id
+
+    for i in range(1, 5):
+        now = i * interval
+        # 감지 사이 프레임에서도 트랙이 계속 표시됨
+        dets, ids = tracker.active(now - 0.1)
+        assert ids == [track_id]
+        assert tracker.update(_dets((100 + i, 100, 200 + i, 200)), now) == []  # 새 이벤트 없음
+
+    assert [t.track_id for t in tracker.tracks] == [track_id]
+
+
+def test_track_expires_after_missed_detections():
+    tracker = IoUTracker(max_misses=2)
+    tracker.update(_dets((0, 0, 50, 50)), 0.0)
+
+    tracker.update(EMPTY_DETECTIONS, 5.0)
+    tracker.update(EMPTY_DETECTIONS, 10.0)
+    _, ids = tracker.active(12.0)
+    assert len(ids) == 1  # 놓친 횟수가 max_misses 이하면 마지막 위치에 유지
+
+    tracker.update(EMPTY_DETECTIONS, 15.0)
+    _, ids = tracker.active(15.0)
+    assert ids == []
+
+
+def test_missed_track_stops_extrapolating():
+    tracker = IoUTracker(max_misses=2)
+    tracker.update(_dets((0, 0, 50, 50)), 0.0)
+    tracker.update(_dets((10, 0, 60, 50)), 1.0)  # 초당 10px 이동
+    tracker.update(EMPTY_DETECTIONS, 2.0)
+
+    dets, _ = tracker.active(30.0)
+    assert (dets["x1"][0], dets["x2"][0]) == (10, 60)
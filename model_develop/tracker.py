@@ -0,0 +1,133 @@
+"""
+동물 감지 추적 (IoU 매칭 + 등속 예측)
+
+동물 모델은 몇 프레임마다 한 번만 실행하므로, 추론하지 않은 프레임에서는
+마지막 감지 박스를 이동 속도로 예측해 이어 그립니다.
+감지마다 기존 트랙과 IoU로 매칭해 같은 개체에 안정적인 트랙 id를 부여하고,
+이벤트는 프레임마다가 아니라 새 트랙이 생길 때 한 번만 보냅니다.
+"""
+import itertools
+
+import numpy as np
+
+from postprocess import DETECTION_DTYPE, EMPTY_DETECTIONS, box_iou
+
+VELOCITY_SMOOTHING = 0.5  # 속도 지수 이동 평균 가중치 (새 관측 비율)
+
+
+class Track:
+    """추적 중인 개체 하나 (박스는 원본 프레임 좌표, 속도는 초당 픽셀)"""
+
+    __slots__ = ("track_id", "cls", "conf", "box", "velocity", "hits", "misses",
+                 "first_seen", "last_seen", "reported")
+
+    def __init__(self, track_id, det, now):
+        self.track_id = track_id
+        self.cls = int(det["cls"])
+        self.conf = float(det["conf"])
+        self.box = np.array([det["x1"], det["y1"], det["x2"], det["y2"]], dtype=np.float32)
+        self.velocity = np.zeros(4, dtype=np.float32)
+        self.hits = 1
+        self.misses = 0  # 연속으로 매칭되지 않은 감지 횟수
+        self.first_seen = now
+        self.last_seen = now
+        self.reported = False  # 이벤트 전송 여부
+
+    def predict(self, now):
+        return self.box + self.velocity * (now - self.last_seen)
+
+    def update(self, det, now):
+        box = np.array([det["x1"], det["y1"], det["x2"], det["y2"]], dtype=np.float32)
+        dt = now - self.last_seen
+        if dt > 0:
+            observed = (box - self.box) / dt
+            self.velocity = VELOCITY_SMOOTHING * observed + (1 - VELOCITY_SMOOTHING) * self.velocity
+        self.box = box
+        self.conf = float(det["conf"])
+        self.hits += 1
+        self.misses = 0
+        self.last_seen = now
+
+    def miss(self):
+        """이번 감지에서 매칭되지 않음 - 다시 감지될 때까지 마지막 위치에 멈춰 표시"""
+        self.misses += 1
+        self.velocity[:] = 0
+
+
+class IoUTracker:
+    """
+    Args:
+        iou_threshold: 감지와 트랙을 같은 개체로 볼 최소 IoU (예측 위치 기준)
+        max_misses: 연속으로 이 횟수보다 많이 감지되지 않으면 트랙 종료
+            (시간이 아니라 감지 횟수 기준이므로 감지 간격(animal_skip)이나 FPS가 바뀌어도
+            감지 사이에 트랙이 끊기지 않음)
+        min_hits: 이벤트를 보내기 전 필요한 감지 횟수 (1이면 처음 감지 시 바로 전송)
+    """
+
+    def __init__(self, iou_threshold=0.3, max_misses=2, min_hits=1):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    @staticmethod
+    def _to_detections(tracks, now):
+        """트랙의 현재 예측 박스를 감지 레코드 배열로 변환"""
+        if not tracks:
+            return EMPTY_DETECTIONS
+        dets = np.empty(len(tracks), dtype=DETECTION_DTYPE)
+        boxes = np.stack([t.predict(now) for t in tracks]).astype(np.int32)
+        dets["cls"] = [t.cls for t in tracks]
+        dets["conf"] = [t.conf for t in tracks]
+        dets["x1"], dets["y1"], dets["x2"], dets["y2"] = boxes.T
+        return dets
+
+    def update(self, dets, now):
+        """
+        새 감지 결과로 트랙 갱신 (동물 모델을 실행한 프레임에서 호출)
+        Returns:
+            이번에 이벤트 조건을 처음 만족한 트랙 목록
+        """
+        predicted = self._to_detections(self.tracks, now)
+        matched_tracks = set()
+        matched_dets = set()
+
+        if len(dets) > 0 and len(predicted) > 0:
+            iou = box_iou(predicted, dets)
+            iou = np.where(predicted["cls"][:, None] == dets["cls"][None, :], iou, 0.0)
+            # IoU가 큰 쌍부터 탐욕적으로 매칭
+            for flat in np.argsort(iou, axis=None)[::-1]:
+                t, d = np.unravel_index(flat, iou.shape)
+                if iou[t, d] < self.iou_threshold:
+                    break
+                if t in matched_tracks or d in matched_dets:
+                    continue
+                self.tracks[t].update(dets[d], now)
+                matched_tracks.add(t)
+                matched_dets.add(d)
+
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.miss()
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+
+        for d in range(len(dets)):
+            if d not in matched_dets:
+                self.tracks.append(Track(next(self._ids), dets[d], now))
+
+        confirmed = []
+        for track in self.tracks:
+            if not track.reported and track.hits >= self.min_hits:
+                track.reported = True
+                confirmed.append(track)
+        return confirmed
+
+    def active(self, now):
+        """
+        현재 표시할 트랙 (추론하지 않은 프레임은 예측 위치)
+        Returns:
+            (감지 레코드 배열, 트랙 id 목록)
+        """
+        tracks = [t for t in self.tracks if t.hits >= self.min_hits]
+        return self._to_detections(tracks, now), [t.track_id for t in tracks]